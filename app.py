@@ -3,8 +3,13 @@ import os
 from flask import Flask
 import requests
 
-from mlrvalidator.validators.error_validator import ErrorValidator
-from mlrvalidator.validators.warning_validator import WarningValidator
+from mlrvalidator import metrics
+from mlrvalidator.validators.location_validator import LocationValidator
+from mlrvalidator.validators.mapped_reference import load_mapped_store
+from mlrvalidator.validators.reference import GeographyIndex
+from mlrvalidator.validators.reference_snapshot import load_snapshot
+from mlrvalidator.validators.reloader import ReloadingLocationValidator
+from mlrvalidator.validators.result_cache import CachedLocationValidator
 
 application = Flask(__name__)
 
@@ -19,8 +24,35 @@ if application.config.get('AUTH_TOKEN_KEY_URL'):
     application.config['JWT_PUBLIC_KEY'] = resp.json()['value']
     application.config['JWT_ALGORITHM'] = 'RS256'
 
-error_validator = ErrorValidator(application.config['SCHEMA_DIR'], application.config['REFERENCE_FILE_DIR'])
-warning_validator = WarningValidator(application.config['SCHEMA_DIR'], application.config['REFERENCE_FILE_DIR'])
+GeographyIndex.max_shards = application.config['REFERENCE_SHARD_CACHE_SIZE']
+load_snapshot(application.config['REFERENCE_SNAPSHOT'], application.config['REFERENCE_FILE_DIR'])
+load_mapped_store(application.config['REFERENCE_STORE'], application.config['REFERENCE_FILE_DIR'])
+
+if application.config['METRICS_ENABLED']:
+    metrics.enable()
+
+
+def create_location_validator():
+    validator = LocationValidator(application.config['SCHEMA_DIR'], application.config['REFERENCE_FILE_DIR'],
+                                  single_field_engine=application.config['SINGLE_FIELD_ENGINE'],
+                                  code_cache_dir=application.config['CODE_CACHE_DIR'])
+    metrics.instrument(validator)
+    return validator
+
+
+if application.config['REFERENCE_RELOAD_INTERVAL'] > 0:
+    # Polling starts on the first request in each process, so that workers forked after this module is imported
+    # (for example by gunicorn --preload) each run their own reloader thread
+    location_validator = ReloadingLocationValidator(create_location_validator, application.config['REFERENCE_FILE_DIR'],
+                                                    interval=application.config['REFERENCE_RELOAD_INTERVAL'],
+                                                    start_on_first_use=True)
+else:
+    location_validator = create_location_validator()
+
+if application.config['RESULT_CACHE_SIZE'] > 0:
+    location_validator = CachedLocationValidator(location_validator,
+                                                 max_size=application.config['RESULT_CACHE_SIZE'],
+                                                 ttl=application.config['RESULT_CACHE_TTL'])
 
 
 from mlrvalidator.services import *
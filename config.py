@@ -5,6 +5,38 @@ REFERENCE_FILE_DIR = os.path.join(PROJECT_DIR, 'mlrvalidator/references')
 SCHEMA_DIR = os.path.join(PROJECT_DIR, 'mlrvalidator/schemas')
 DEBUG = False
 
+# Snapshot of the indexed reference files written by mlr-build-reference-snapshot. If the file does not exist or was
+# built from different reference files, the references are loaded from the JSON files.
+REFERENCE_SNAPSHOT = os.getenv('reference_snapshot', os.path.join(PROJECT_DIR, 'reference_snapshot.pickle'))
+
+# Memory mapped store of the geography reference files written by mlr-build-mapped-reference-store. When it exists
+# and was built from the current reference files, workers share it rather than each holding the geography index.
+REFERENCE_STORE = os.getenv('reference_store', os.path.join(PROJECT_DIR, 'reference_store.map'))
+
+# Number of huc.json and mcd.json shards, one for each country and state, kept loaded by each worker. Only used when
+# the shards have been built with mlr-build-reference-shards
+REFERENCE_SHARD_CACHE_SIZE = int(os.getenv('reference_shard_cache_size', '64'))
+
+# Seconds between checks for changes to the reference files. Changed files are loaded without restarting the
+# service. Each worker process starts checking when it handles its first request. Set to 0 to disable reloading
+REFERENCE_RELOAD_INTERVAL = float(os.getenv('reference_reload_interval', '0'))
+
+# Set to 'compiled' to validate the single field rules with the compiled validation plan or to 'generated' to
+# validate them with code generated from the schemas rather than with Cerberus
+SINGLE_FIELD_ENGINE = os.getenv('single_field_engine', 'cerberus')
+
+# Number of validation results to cache. Set to 0 to disable the cache
+RESULT_CACHE_SIZE = int(os.getenv('result_cache_size', '0'))
+
+# Seconds a validation result is cached
+RESULT_CACHE_TTL = float(os.getenv('result_cache_ttl', '300'))
+
+# Set to true to record validator and request timings and expose them at /metrics
+METRICS_ENABLED = os.getenv('metrics_enabled', 'false').lower() == 'true'
+
+# Directory where the code generated for the 'generated' engine is cached. If not set, it is compiled at each startup
+CODE_CACHE_DIR = os.getenv('code_cache_dir')
+
 # The following four variables configure authentication
 
 # If using a public key, set the environment variable AUTH_TOKEN_KEY_URL to the url where it can be retrieved
@@ -0,0 +1,184 @@
+'''
+Times the validators against a generated workload and reports throughput and latency percentiles as JSON. Usage:
+
+    python -m mlrvalidator.benchmarks --iterations 1000 --output results.json
+    python -m mlrvalidator.benchmarks --compare baseline.json
+
+Each benchmark validates the same seeded workload, so results from runs with the same arguments can be compared.
+'''
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+
+import config
+from mlrvalidator.validators.compiled_single_field_validator import CERBERUS_ENGINE, COMPILED_ENGINE, \
+    GENERATED_ENGINE
+from mlrvalidator.validators.location_validator import LocationValidator
+from mlrvalidator.validators.validation_context import ValidationContext
+from .workload import WorkloadGenerator
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values, percent):
+    '''
+    :param list sorted_values: values in ascending order
+    :param int percent:
+    :return: the nearest rank percentile of sorted_values
+    '''
+    index = max(int(round(percent / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def summarize(durations):
+    '''
+    :param list of float durations: seconds taken by each call
+    :return: dict - throughput and latency statistics. Latencies are in milliseconds.
+    '''
+    sorted_durations = sorted(durations)
+    total = sum(sorted_durations)
+    summary = {
+        'count': len(sorted_durations),
+        'total_seconds': total,
+        'throughput_per_second': len(sorted_durations) / total if total else None,
+        'mean_ms': total / len(sorted_durations) * 1000,
+        'max_ms': sorted_durations[-1] * 1000
+    }
+    for percent in PERCENTILES:
+        summary['p{0}_ms'.format(percent)] = percentile(sorted_durations, percent) * 1000
+    return summary
+
+
+def time_calls(func, args_list, warmup=20):
+    '''
+    :param function func:
+    :param list of tuple args_list: positional arguments for each call
+    :param int warmup: number of untimed calls made first
+    :return: list of float - seconds taken by each call
+    '''
+    for args in args_list[:warmup]:
+        func(*args)
+
+    durations = []
+    perf_counter = time.perf_counter
+    for args in args_list:
+        start = perf_counter()
+        func(*args)
+        durations.append(perf_counter() - start)
+    return durations
+
+
+def run_benchmarks(schema_dir, reference_dir, iterations=500, seed=1, invalid_rate=0.2,
+                   single_field_engine=CERBERUS_ENGINE):
+    '''
+    :param str schema_dir:
+    :param str reference_dir:
+    :param int iterations: number of add and of update transactions
+    :param int seed: seed for the workload
+    :param float invalid_rate: fraction of the generated locations which have an invalid value
+    :param str single_field_engine: engine used by the validators for the single field rules
+    :return: dict - metadata describing the run and the summary of each benchmark keyed by name
+    '''
+    generator = WorkloadGenerator(reference_dir, seed=seed, invalid_rate=invalid_rate)
+    adds = [generator.add_transaction() for _ in range(iterations)]
+    updates = [generator.update_transaction() for _ in range(iterations)]
+
+    validator = LocationValidator(schema_dir, reference_dir, single_field_engine=single_field_engine)
+    error_validator = validator.error_validator
+    warning_validator = validator.warning_validator
+
+    def contexts(transactions):
+        return [(ValidationContext(ddot, existing),) for ddot, existing, update in transactions]
+
+    add_contexts = contexts(adds)
+    update_contexts = contexts(updates)
+    documents = [(ddot, update) for ddot, existing, update in adds + updates]
+
+    benchmarks = {
+        'end_to_end.add': (validator.validate, adds),
+        'end_to_end.update': (validator.validate, updates),
+        'errors.add': (error_validator.get_errors, adds),
+        'errors.update': (error_validator.get_errors, updates),
+        'warnings.add': (warning_validator.get_warnings, adds),
+        'warnings.update': (warning_validator.get_warnings, updates),
+        'error_validators.single_field': (error_validator.single_field_validator.get_errors, documents),
+        'error_validators.cross_field': (error_validator.cross_field_validator.get_errors,
+                                         add_contexts + update_contexts),
+        'error_validators.cross_field_ref': (error_validator.cross_field_ref_validator.get_errors,
+                                             add_contexts + update_contexts),
+        'error_validators.transition': (error_validator.transition_validator.get_errors,
+                                        [(ddot, existing) for ddot, existing, update in updates]),
+        'warning_validators.single_field': (warning_validator.single_field_validator.get_errors, documents),
+        'warning_validators.cross_field': (warning_validator.cross_field_validator.get_errors,
+                                           add_contexts + update_contexts),
+        'warning_validators.cross_field_ref': (warning_validator.cross_field_ref_validator.get_errors,
+                                               add_contexts + update_contexts)
+    }
+
+    results = dict((name, summarize(time_calls(func, args_list)))
+                   for name, (func, args_list) in sorted(benchmarks.items()))
+    return {
+        'metadata': {
+            'timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'single_field_engine': single_field_engine,
+            'iterations': iterations,
+            'seed': seed,
+            'invalid_rate': invalid_rate
+        },
+        'results': results
+    }
+
+
+def compare(baseline, current):
+    '''
+    :param dict baseline: output of run_benchmarks
+    :param dict current: output of run_benchmarks
+    :return: dict - for each benchmark in both, the ratio of current to baseline mean and p95 latency.
+        A ratio above 1 means the current run is slower.
+    '''
+    comparison = {}
+    for name, current_summary in current['results'].items():
+        baseline_summary = baseline['results'].get(name)
+        if baseline_summary and baseline_summary['mean_ms'] and baseline_summary['p95_ms']:
+            comparison[name] = dict((key, current_summary[key] / baseline_summary[key]) for key in ('mean_ms', 'p95_ms'))
+    return comparison
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the location validators')
+    parser.add_argument('--iterations', type=int, default=500, help='Number of add and of update transactions')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--invalid-rate', type=float, default=0.2,
+                        help='Fraction of the generated locations which have an invalid value')
+    parser.add_argument('--single-field-engine', choices=(CERBERUS_ENGINE, COMPILED_ENGINE, GENERATED_ENGINE),
+                        default=config.SINGLE_FIELD_ENGINE)
+    parser.add_argument('--output', help='File to write the results to. Defaults to stdout')
+    parser.add_argument('--compare', help='Results file from an earlier run. The ratios to it are written to stderr')
+    parser.add_argument('--schema-dir', default=config.SCHEMA_DIR)
+    parser.add_argument('--reference-dir', default=config.REFERENCE_FILE_DIR)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    results = run_benchmarks(args.schema_dir, args.reference_dir, iterations=args.iterations, seed=args.seed,
+                             invalid_rate=args.invalid_rate, single_field_engine=args.single_field_engine)
+
+    if args.output:
+        with open(args.output, 'w') as fd:
+            json.dump(results, fd, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+
+    if args.compare:
+        with open(args.compare) as fd:
+            baseline = json.load(fd)
+        for name, ratios in sorted(compare(baseline, results).items()):
+            sys.stderr.write('{0}: mean x{1:.2f}, p95 x{2:.2f}\n'.format(name, ratios['mean_ms'], ratios['p95_ms']))
+    return 0
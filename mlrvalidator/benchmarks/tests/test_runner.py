@@ -0,0 +1,41 @@
+from unittest import TestCase
+
+from app import application
+from ..runner import percentile, summarize, compare, run_benchmarks
+
+
+class PercentileTestCase(TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([5], 95), 5)
+
+    def test_summarize(self):
+        summary = summarize([0.002, 0.001, 0.003, 0.004])
+        self.assertEqual(summary['count'], 4)
+        self.assertAlmostEqual(summary['mean_ms'], 2.5)
+        self.assertAlmostEqual(summary['p50_ms'], 2)
+        self.assertAlmostEqual(summary['max_ms'], 4)
+        self.assertAlmostEqual(summary['throughput_per_second'], 400)
+
+
+class CompareTestCase(TestCase):
+
+    def test_compare(self):
+        baseline = {'results': {'a': {'mean_ms': 2.0, 'p95_ms': 4.0}, 'b': {'mean_ms': 1.0, 'p95_ms': 1.0}}}
+        current = {'results': {'a': {'mean_ms': 1.0, 'p95_ms': 6.0}, 'c': {'mean_ms': 1.0, 'p95_ms': 1.0}}}
+        self.assertEqual(compare(baseline, current), {'a': {'mean_ms': 0.5, 'p95_ms': 1.5}})
+
+
+class RunBenchmarksTestCase(TestCase):
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(application.config['SCHEMA_DIR'], application.config['REFERENCE_FILE_DIR'],
+                                 iterations=5)
+        self.assertEqual(results['metadata']['iterations'], 5)
+        self.assertIn('end_to_end.add', results['results'])
+        self.assertIn('warning_validators.cross_field_ref', results['results'])
+        self.assertEqual(results['results']['end_to_end.update']['count'], 5)
+        self.assertEqual(results['results']['error_validators.single_field']['count'], 10)
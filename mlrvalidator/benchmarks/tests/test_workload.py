@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from app import application
+from ..workload import WorkloadGenerator
+
+REFERENCE_FILE_DIR = application.config['REFERENCE_FILE_DIR']
+
+
+class WorkloadGeneratorTestCase(TestCase):
+
+    def test_seeded_workload_is_repeatable(self):
+        first = WorkloadGenerator(REFERENCE_FILE_DIR, seed=3).transactions(20)
+        second = WorkloadGenerator(REFERENCE_FILE_DIR, seed=3).transactions(20)
+        self.assertEqual(first, second)
+
+    def test_valid_locations_use_reference_codes(self):
+        generator = WorkloadGenerator(REFERENCE_FILE_DIR, seed=3, invalid_rate=0)
+        for _ in range(50):
+            location = generator.location()
+            self.assertIn(location['agencyCode'], generator.reference_lists['agencyCode'])
+            self.assertIn((location['countryCode'], location['stateFipsCode'], location['countyCode']),
+                          [(country, state, county['countyCode']) for country, state, county in generator.counties])
+            self.assertEqual(len(location['latitude']), 7)
+            self.assertEqual(len(location['longitude']), 8)
+
+    def test_update_transaction(self):
+        ddot_location, existing_location, update = WorkloadGenerator(REFERENCE_FILE_DIR, seed=3).update_transaction()
+        self.assertTrue(update)
+        self.assertEqual(ddot_location['agencyCode'], existing_location['agencyCode'])
+        self.assertEqual(ddot_location['siteNumber'], existing_location['siteNumber'])
+        self.assertEqual(len(ddot_location), 5)
+
+    def test_add_transaction(self):
+        ddot_location, existing_location, update = WorkloadGenerator(REFERENCE_FILE_DIR, seed=3).add_transaction()
+        self.assertFalse(update)
+        self.assertEqual(existing_location, {})
+        self.assertIn('siteNumber', ddot_location)
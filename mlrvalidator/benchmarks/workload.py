@@ -0,0 +1,178 @@
+'''
+Generates ddot and existing location pairs for the benchmarks. Codes are sampled from the files in the reference
+directory so that the cross field reference validators do the same lookups that they do for real transactions.
+'''
+import os
+import random
+
+from mlrvalidator.validators.reference import ReferenceInfo
+
+# Fields whose values are sampled from reference_lists.json
+REFERENCE_LIST_FIELDS = [
+    'agencyCode', 'coordinateAccuracyCode', 'coordinateDatumCode', 'coordinateMethodCode', 'altitudeDatumCode',
+    'altitudeMethodCode', 'districtCode', 'timeZoneCode', 'siteWebReadyCode', 'agencyUseCode', 'dataReliabilityCode',
+    'topographicCode', 'primaryUseOfWaterCode'
+]
+
+# Invalid values substituted for a field's value in invalid locations
+INVALID_VALUES = {
+    'agencyCode': 'ZZZZZ',
+    'siteNumber': '12345A',
+    'stationName': 'Bad#Name',
+    'siteTypeCode': 'ZZ',
+    'latitude': ' 995960',
+    'longitude': '-1999999',
+    'altitude': '12.345',
+    'countryCode': 'ZZ',
+    'stateFipsCode': '99',
+    'countyCode': '999',
+    'hydrologicUnitCode': '99999998',
+    'aquiferCode': 'ZZZZZZZ',
+    'firstConstructionDate': '20011332',
+    'daylightSavingsTimeFlag': 'X',
+    'wellDepth': '-12.5'
+}
+
+
+def _is_dms(county, coordinate, length):
+    return all(len(county.get(key, '')) == length and county[key].isdigit()
+               for key in ('county_min_{0}_va'.format(coordinate), 'county_max_{0}_va'.format(coordinate)))
+
+
+def _to_seconds(dms, degree_digits):
+    return int(dms[:degree_digits]) * 3600 + int(dms[degree_digits:degree_digits + 2]) * 60 + \
+        int(dms[degree_digits + 2:degree_digits + 4])
+
+
+def _to_dms(seconds, degree_digits):
+    return '{0:0{1}d}{2:02d}{3:02d}'.format(seconds // 3600, degree_digits, seconds % 3600 // 60, seconds % 60)
+
+
+class WorkloadGenerator:
+    '''
+    Generates ddot locations from the reference files. A seeded generator always produces the same workload.
+    '''
+
+    def __init__(self, reference_dir, seed=None, invalid_rate=0.2):
+        '''
+        :param str reference_dir: directory containing the reference files
+        :param int seed: seed for the random number generator
+        :param float invalid_rate: fraction of locations which are given an invalid value
+        '''
+        self.random = random.Random(seed)
+        self.invalid_rate = invalid_rate
+
+        def load(filename):
+            return ReferenceInfo(os.path.join(reference_dir, filename)).get_reference_info()
+
+        self.reference_lists = load('reference_lists.json')
+        self.site_types = load('site_type_cross_field.json')['siteTypeCodes']
+
+        # (country, state, county attributes) for every county with unsigned DMS lat/long ranges
+        self.counties = []
+        for country in load('county.json')['countries']:
+            for state in country['states']:
+                for county in state.get('counties', []):
+                    if _is_dms(county, 'lat', 6) and _is_dms(county, 'long', 7):
+                        self.counties.append((country['countryCode'], state['stateFipsCode'], county))
+
+        self.hucs = self._codes_by_state(load('huc.json'), 'hydrologicUnitCodes')
+        self.aquifers = self._codes_by_state(load('aquifer.json'), 'aquiferCodes')
+        self.national_aquifers = self._codes_by_state(load('national_aquifer.json'), 'nationalAquiferCodes')
+        self.mcds = {}
+        for country in load('mcd.json')['countries']:
+            for state in country['states']:
+                for county in state.get('counties', []):
+                    self.mcds[(country['countryCode'], state['stateFipsCode'], county['countyCode'])] = \
+                        county['minorCivilDivisionCodes']
+
+    @staticmethod
+    def _codes_by_state(reference, list_key):
+        codes = {}
+        for country in reference['countries']:
+            for state in country['states']:
+                codes[(country['countryCode'], state['stateFipsCode'])] = state.get(list_key, [])
+        return codes
+
+    def _coordinate(self, min_dms, max_dms, degree_digits, sign):
+        min_seconds = _to_seconds(min_dms, degree_digits)
+        max_seconds = max(_to_seconds(max_dms, degree_digits) - 1, min_seconds)
+        return sign + _to_dms(self.random.randint(min_seconds, max_seconds), degree_digits)
+
+    def location(self):
+        '''
+        :return: dict - a complete ddot location
+        '''
+        rand = self.random
+        country, state, county = rand.choice(self.counties)
+        site_type = rand.choice(self.site_types)
+
+        location = dict((field, rand.choice(self.reference_lists[field])) for field in REFERENCE_LIST_FIELDS)
+        location.update({
+            'siteNumber': '{0:015d}'.format(rand.randrange(10 ** 15)),
+            'stationName': 'Benchmark station {0}'.format(rand.randrange(10 ** 6)),
+            'siteTypeCode': site_type['siteTypeCode'],
+            'countryCode': country,
+            'stateFipsCode': state,
+            'countyCode': county['countyCode'],
+            'latitude': self._coordinate(county['county_min_lat_va'], county['county_max_lat_va'], 2, ' '),
+            'longitude': self._coordinate(county['county_min_long_va'], county['county_max_long_va'], 3, ' '),
+            'altitude': '{0}.{1:02d}'.format(rand.randrange(10, 2000), rand.randrange(100)),
+            'daylightSavingsTimeFlag': rand.choice(['Y', 'N']),
+            'siteEstablishmentDate': '{0}{1:02d}'.format(rand.randrange(1900, 2018), rand.randrange(1, 13)),
+            'remarks': 'Generated for benchmarking'
+        })
+
+        hucs = self.hucs.get((country, state))
+        if hucs:
+            location['hydrologicUnitCode'] = rand.choice(hucs)
+        mcds = self.mcds.get((country, state, county['countyCode']))
+        if mcds:
+            location['minorCivilDivisionCode'] = rand.choice(mcds)
+
+        null_attrs = set(site_type.get('nullAttrs', []))
+        if 'aquiferCode' not in null_attrs:
+            aquifers = self.aquifers.get((country, state))
+            if aquifers:
+                location['aquiferCode'] = rand.choice(aquifers)
+            national_aquifers = self.national_aquifers.get((country, state))
+            if national_aquifers:
+                location['nationalAquiferCode'] = rand.choice(national_aquifers)
+        if 'wellDepth' not in null_attrs:
+            location['holeDepth'] = str(rand.randrange(100, 1000))
+            location['wellDepth'] = '{0}.{1}'.format(rand.randrange(10, 100), rand.randrange(10))
+
+        if rand.random() < self.invalid_rate:
+            field = rand.choice(sorted(INVALID_VALUES))
+            location[field] = INVALID_VALUES[field]
+        return location
+
+    def add_transaction(self):
+        '''
+        :return: tuple - ddot location, an empty existing location and update set to False
+        '''
+        return self.location(), {}, False
+
+    def update_transaction(self):
+        '''
+        :return: tuple - ddot location containing the keys and a few changed fields, the existing location and
+            update set to True
+        '''
+        existing_location = self.location()
+        changes = self.location()
+        ddot_location = {
+            'agencyCode': existing_location['agencyCode'],
+            'siteNumber': existing_location['siteNumber']
+        }
+        for field in self.random.sample(sorted(set(changes) - set(ddot_location)), 3):
+            ddot_location[field] = changes[field]
+        return ddot_location, existing_location, True
+
+    def transactions(self, count, update_rate=0.5):
+        '''
+        :param int count: number of transactions
+        :param float update_rate: fraction of the transactions which are updates
+        :return: list of tuples - see add_transaction and update_transaction
+        '''
+        return [self.update_transaction() if self.random.random() < update_rate else self.add_transaction()
+                for _ in range(count)]
@@ -0,0 +1,261 @@
+'''
+Validates files of ddot locations without running the service. Usage:
+
+    mlr-validate ddot_locations.csv --existing existing_locations.ndjson --output report.ndjson
+
+Input files may be CSV, with a header row of location field names, or newline delimited JSON with one location
+object per line. Locations are validated across a pool of processes and the report is written in input order.
+A summary of the counts is written to stderr. Lines of a newline delimited JSON file which are not location objects
+are reported with an error_message and the status invalid.
+'''
+import argparse
+import csv
+import json
+from multiprocessing import Pool
+import os
+import sys
+
+import config
+from mlrvalidator.validators.compiled_single_field_validator import CERBERUS_ENGINE, COMPILED_ENGINE, GENERATED_ENGINE
+from mlrvalidator.validators.location_validator import LocationValidator
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+FORMATS = (CSV, NDJSON)
+
+REPORT_FIELDS = ['line', 'agencyCode', 'siteNumber', 'status', 'fatal_errors', 'warnings', 'error_message']
+
+# Each worker process builds its own validator when the pool starts.
+_location_validator = None
+
+
+class InvalidLine:
+    '''
+    Read in place of the location for a line which is not a location object
+    '''
+    __slots__ = ('message',)
+
+    def __init__(self, message):
+        '''
+        :param str message: why the line could not be read
+        '''
+        self.message = message
+
+
+def _init_worker(schema_dir, reference_dir, single_field_engine):
+    global _location_validator
+    _location_validator = LocationValidator(schema_dir, reference_dir, single_field_engine=single_field_engine,
+                                            code_cache_dir=config.CODE_CACHE_DIR)
+
+
+def _validate_transaction(transaction):
+    '''
+    :param tuple transaction: line number, ddot location, existing location and update flag
+    :return: dict - report record for the transaction
+    '''
+    line, ddot_location, existing_location, update = transaction
+    if isinstance(ddot_location, InvalidLine):
+        return {
+            'line': line,
+            'status': 'invalid',
+            'error_message': 'Line {0} is not a valid location: {1}'.format(line, ddot_location.message)
+        }
+    result = _location_validator.validate(ddot_location, existing_location, update=update)
+    if result.errors:
+        status = 'error'
+    elif result.warnings:
+        status = 'warning'
+    else:
+        status = 'passed'
+    return {
+        'line': line,
+        'agencyCode': ddot_location.get('agencyCode', existing_location.get('agencyCode', '')),
+        'siteNumber': ddot_location.get('siteNumber', existing_location.get('siteNumber', '')),
+        'status': status,
+        'fatal_errors': dict(result.errors),
+        'warnings': dict(result.warnings)
+    }
+
+
+def _get_format(path, file_format):
+    if file_format:
+        return file_format
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    if extension in ('json', 'jsonl'):
+        return NDJSON
+    return extension if extension in FORMATS else NDJSON
+
+
+def read_locations(fd, file_format):
+    '''
+    Generator which yields the line number and location for each location in fd. A newline delimited JSON line
+    which is not a JSON object is yielded as an InvalidLine, so the lines after it are still read.
+    :param fd: open text file
+    :param str file_format: CSV or NDJSON
+    '''
+    if file_format == CSV:
+        reader = csv.DictReader(fd)
+        for location in reader:
+            yield reader.line_num, location
+    else:
+        for line_number, line in enumerate(fd, start=1):
+            if line.strip():
+                try:
+                    location = json.loads(line)
+                except ValueError as error:
+                    yield line_number, InvalidLine(str(error))
+                    continue
+                if isinstance(location, dict):
+                    yield line_number, location
+                else:
+                    yield line_number, InvalidLine('expected a JSON object')
+
+
+def _location_key(location):
+    return location.get('agencyCode', '').strip(), location.get('siteNumber', '').strip()
+
+
+def read_existing_locations(path, file_format):
+    '''
+    :return: dict - existing locations keyed by agencyCode and siteNumber
+    :raises ValueError: if a line is not a location. Validating against an incomplete set of existing locations
+        would report wrong results, so the file must be fixed.
+    '''
+    existing_locations = {}
+    with open(path, newline='') as fd:
+        for line_number, location in read_locations(fd, file_format):
+            if isinstance(location, InvalidLine):
+                raise ValueError('Line {0} of {1} is not a valid location: {2}'.format(line_number, path,
+                                                                                        location.message))
+            existing_locations[_location_key(location)] = location
+    return existing_locations
+
+
+class ReportWriter:
+
+    def __init__(self, fd, file_format):
+        self.fd = fd
+        self.file_format = file_format
+        if file_format == CSV:
+            self.csv_writer = csv.DictWriter(fd, REPORT_FIELDS)
+            self.csv_writer.writeheader()
+
+    def write(self, record):
+        if self.file_format == CSV:
+            row = dict(record)
+            row['fatal_errors'] = json.dumps(record['fatal_errors']) if record.get('fatal_errors') else ''
+            row['warnings'] = json.dumps(record['warnings']) if record.get('warnings') else ''
+            self.csv_writer.writerow(row)
+        else:
+            self.fd.write(json.dumps(record) + '\n')
+
+
+def validate_file(ddot_fd, ddot_format, report_writer, existing_locations=None, update=False, processes=None,
+                  chunksize=50, schema_dir=config.SCHEMA_DIR, reference_dir=config.REFERENCE_FILE_DIR,
+                  single_field_engine=config.SINGLE_FIELD_ENGINE):
+    '''
+    Validate each location in ddot_fd and write its report record to report_writer in input order.
+    :param ddot_fd: open text file containing the ddot locations
+    :param str ddot_format: CSV or NDJSON
+    :param ReportWriter report_writer:
+    :param dict existing_locations: existing locations keyed by agencyCode and siteNumber
+    :param boolean update: if True the ddot locations are validated as updates, otherwise as adds
+    :param int processes: number of worker processes. If 1, locations are validated in this process.
+    :param int chunksize: number of locations sent to a worker at a time
+    :param str single_field_engine: the engine used to validate the single field rules
+    :return: dict - summary counts
+    '''
+    existing_locations = existing_locations or {}
+    transactions = ((line, location,
+                     {} if isinstance(location, InvalidLine) else existing_locations.get(_location_key(location), {}),
+                     update)
+                    for line, location in read_locations(ddot_fd, ddot_format))
+
+    summary = {'total': 0, 'passed': 0, 'errors': 0, 'warnings': 0, 'invalid': 0}
+    pool = None
+    if processes == 1:
+        _init_worker(schema_dir, reference_dir, single_field_engine)
+        records = map(_validate_transaction, transactions)
+    else:
+        pool = Pool(processes, initializer=_init_worker, initargs=(schema_dir, reference_dir, single_field_engine))
+        records = pool.imap(_validate_transaction, transactions, chunksize)
+
+    try:
+        for record in records:
+            summary['total'] += 1
+            if record['status'] == 'invalid':
+                summary['invalid'] += 1
+            elif record['fatal_errors']:
+                summary['errors'] += 1
+            if record.get('warnings'):
+                summary['warnings'] += 1
+            if record['status'] == 'passed':
+                summary['passed'] += 1
+            report_writer.write(record)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return summary
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description='Validate a file of ddot locations')
+    parser.add_argument('ddot_file', help='CSV or newline delimited JSON file of ddot locations')
+    parser.add_argument('--existing', help='CSV or newline delimited JSON file of existing locations. '
+                                           'Matched to ddot locations by agencyCode and siteNumber')
+    parser.add_argument('--update', action='store_true', help='Validate the ddot locations as updates rather than adds')
+    parser.add_argument('--format', choices=FORMATS, help='Format of the input files. Defaults to the file extension')
+    parser.add_argument('--output', help='Report file. Defaults to stdout')
+    parser.add_argument('--output-format', choices=FORMATS,
+                        help='Format of the report. Defaults to the output file extension or ndjson')
+    parser.add_argument('--processes', type=int, help='Number of worker processes. Defaults to the number of CPUs')
+    parser.add_argument('--chunksize', type=int, default=50, help='Number of locations sent to a worker at a time')
+    parser.add_argument('--schema-dir', default=config.SCHEMA_DIR)
+    parser.add_argument('--reference-dir', default=config.REFERENCE_FILE_DIR)
+    parser.add_argument('--single-field-engine', choices=(CERBERUS_ENGINE, COMPILED_ENGINE, GENERATED_ENGINE),
+                        default=config.SINGLE_FIELD_ENGINE)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    '''
+    Entry point for the mlr-validate console script
+    :return: int - exit status. 1 if any location has fatal errors or any line is not a location, 2 if the existing
+        locations can not be read
+    '''
+    args = _parse_args(argv)
+
+    existing_locations = {}
+    if args.existing:
+        try:
+            existing_locations = read_existing_locations(args.existing, _get_format(args.existing, args.format))
+        except ValueError as error:
+            sys.stderr.write('{0}\n'.format(error))
+            return 2
+
+    output_format = args.output_format or (_get_format(args.output, None) if args.output else NDJSON)
+    output_fd = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        with open(args.ddot_file, newline='') as ddot_fd:
+            summary = validate_file(ddot_fd, _get_format(args.ddot_file, args.format),
+                                    ReportWriter(output_fd, output_format),
+                                    existing_locations=existing_locations,
+                                    update=args.update,
+                                    processes=args.processes,
+                                    chunksize=args.chunksize,
+                                    schema_dir=args.schema_dir,
+                                    reference_dir=args.reference_dir,
+                                    single_field_engine=args.single_field_engine)
+    finally:
+        if output_fd is not sys.stdout:
+            output_fd.close()
+
+    sys.stderr.write('Validated {total} locations: {passed} passed, {errors} with fatal errors, '
+                     '{warnings} with warnings, {invalid} invalid\n'.format(**summary))
+    return 1 if summary['errors'] or summary['invalid'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
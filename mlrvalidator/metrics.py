@@ -0,0 +1,232 @@
+'''
+Opt in instrumentation for the validators and the validation requests, exposed in the Prometheus text format.
+Nothing is recorded until enable is called. Validators are timed by replacing their methods on the instance when
+instrument is called, so validators which are not instrumented run their methods unchanged.
+'''
+from bisect import bisect_left
+from functools import wraps
+import threading
+import time
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds, in seconds, of the latency histogram buckets. Most rules take well under a millisecond.
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0)
+
+VALIDATOR_METHODS = ('get_errors', 'get_warnings', 'validate')
+
+_enabled = False
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def _format_labels(label_names, label_values, extra=''):
+    labels = ['{0}="{1}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+              for name, value in zip(label_names, label_values)]
+    if extra:
+        labels.append(extra)
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+
+    def __init__(self, name, description, label_names=()):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, label_values=()):
+        return self._values.get(label_values, 0)
+
+    def clear(self):
+        with self._lock:
+            self._values = {}
+
+    def render(self):
+        lines = ['# HELP {0} {1}'.format(self.name, self.description), '# TYPE {0} counter'.format(self.name)]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append('{0}{1} {2}'.format(self.name, _format_labels(self.label_names, label_values),
+                                             _format_value(value)))
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name, description, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        # label values -> [count in each bucket, with the last for values above all buckets, sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def get_count(self, label_values=()):
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def clear(self):
+        with self._lock:
+            self._series = {}
+
+    def render(self):
+        lines = ['# HELP {0} {1}'.format(self.name, self.description), '# TYPE {0} histogram'.format(self.name)]
+        with self._lock:
+            all_series = sorted((label_values, (list(series[0]), series[1], series[2]))
+                                for label_values, series in self._series.items())
+        for label_values, (bucket_counts, total, count) in all_series:
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets + ('+Inf',), bucket_counts):
+                cumulative += bucket_count
+                le = 'le="{0}"'.format(upper_bound if upper_bound == '+Inf' else repr(upper_bound))
+                lines.append('{0}_bucket{1} {2}'.format(self.name, _format_labels(self.label_names, label_values, le),
+                                                        cumulative))
+            labels = _format_labels(self.label_names, label_values)
+            lines.append('{0}_sum{1} {2}'.format(self.name, labels, _format_value(total)))
+            lines.append('{0}_count{1} {2}'.format(self.name, labels, count))
+        return lines
+
+
+VALIDATOR_DURATION = Histogram('mlr_validator_validator_duration_seconds',
+                               'Time spent in each validator',
+                               ('validator', 'instance'))
+RULE_DURATION = Histogram('mlr_validator_rule_duration_seconds',
+                          'Time spent in each _validate_ rule of a validator',
+                          ('validator', 'instance', 'rule'))
+REQUEST_DURATION = Histogram('mlr_validator_request_duration_seconds',
+                             'Time spent handling an authorized request',
+                             ('endpoint',))
+VALIDATION_DURATION = Histogram('mlr_validator_validation_duration_seconds',
+                                'Time spent validating the locations in a request',
+                                ('endpoint',))
+REQUESTS = Counter('mlr_validator_requests_total',
+                   'Validation requests by endpoint and result',
+                   ('endpoint', 'result'))
+RESULT_CACHE = Counter('mlr_validator_result_cache_total',
+                       'Validation result cache lookups by outcome',
+                       ('outcome',))
+REFERENCE_SHARDS = Counter('mlr_validator_reference_shards_total',
+                           'Geography reference shards loaded and evicted',
+                           ('event',))
+REFERENCE_LOOKUPS = Counter('mlr_validator_reference_lookups_total',
+                            'Reference lookups made by the cross field rules. A hit is a lookup already made for '
+                            'the same request, whose result was reused',
+                            ('outcome',))
+
+ALL_METRICS = (REQUESTS, RESULT_CACHE, REFERENCE_SHARDS, REFERENCE_LOOKUPS, REQUEST_DURATION, VALIDATION_DURATION, VALIDATOR_DURATION, RULE_DURATION)
+
+
+def render():
+    '''
+    :return: str - all metrics in the Prometheus text exposition format
+    '''
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def clear():
+    for metric in ALL_METRICS:
+        metric.clear()
+
+
+def _timed(method, histogram, label_values):
+    perf_counter = time.perf_counter
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            histogram.observe(label_values, perf_counter() - start)
+    return wrapper
+
+
+def instrument(validator, instance=None, _seen=None):
+    '''
+    Times validator's get_errors, get_warnings or validate method and each of its _validate_ rules, then does
+    the same for the validators it holds in its attributes. Does nothing unless metrics are enabled.
+    :param validator:
+    :param str instance: name of the validator in the metric labels. Nested validators are named with the path of
+        attributes from the validator first instrumented.
+    '''
+    if not _enabled:
+        return
+    seen = set() if _seen is None else _seen
+    if id(validator) in seen:
+        return
+    seen.add(id(validator))
+
+    class_name = type(validator).__name__
+    instance = instance or class_name
+    for method_name in VALIDATOR_METHODS:
+        if callable(getattr(validator, method_name, None)):
+            setattr(validator, method_name, _timed(getattr(validator, method_name), VALIDATOR_DURATION,
+                                                   (class_name, instance)))
+            break
+
+    for rule_name in dir(type(validator)):
+        if rule_name.startswith('_validate_') and rule_name != '_validate_rules':
+            rule = getattr(validator, rule_name)
+            if callable(rule):
+                setattr(validator, rule_name, _timed(rule, RULE_DURATION, (class_name, instance, rule_name)))
+
+    for attribute, value in sorted(vars(validator).items()):
+        if not isinstance(value, type) and any(callable(getattr(value, name, None)) for name in VALIDATOR_METHODS):
+            instrument(value, instance='{0}.{1}'.format(instance, attribute), _seen=seen)
+
+
+def time_request(endpoint):
+    '''
+    Decorator which records the duration of a request to endpoint when metrics are enabled
+    :param str endpoint:
+    '''
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return view(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                REQUEST_DURATION.observe((endpoint,), time.perf_counter() - start)
+        return wrapper
+    return decorator
@@ -1,13 +1,19 @@
 
+import json
+import logging
+import time
+
 import pkg_resources
 
-from flask import request
+from flask import request, Response, stream_with_context
 from flask_restplus import Api, Resource, fields
 from werkzeug.exceptions import BadRequest
 
-from app import application, error_validator, warning_validator
+from app import application, location_validator
+from . import metrics
 from .flask_restplus_jwt import JWTRestplusManager, jwt_required
 
+logger = logging.getLogger(__name__)
 
 # This will add the Authorize button to the swagger docs
 authorizations = {
@@ -100,40 +106,130 @@ validate_location_model = api.model('ValidateLocationModel', {
     'existingLocation': fields.Nested(location_model)
 })
 
+batch_location_model = api.clone('BatchLocationModel', validate_location_model, {
+    'update': fields.Boolean(default=False, description='True if ddotLocation is an update to existingLocation')
+})
+
 validation_model = api.model('SuccessModel', {'validation_passed_message': fields.String(),
                                               'warning_message': fields.String(),
                                               'fatal_error_message': fields.String()})
 
+fail_fast_params = {
+    'failFast': 'If true, validation of a location stops at the first fatal error found. Only that error is '
+                'returned and the warnings are not checked for locations with fatal errors.'
+}
+
+
+def _is_fail_fast():
+    return request.args.get('failFast', '').lower() == 'true'
+
+
+def _check_location_request(req_json):
+    if not isinstance(req_json, dict) or not isinstance(req_json.get('ddotLocation'), dict) or \
+            not isinstance(req_json.get('existingLocation'), dict):
+        raise BadRequest
+
 
-def _validate_response(req_json, update=False):
-    if 'ddotLocation' not in req_json or 'existingLocation' not in req_json:
+def _get_update(req_json):
+    # Only a JSON boolean is accepted, so that strings such as "false" are not taken as an update
+    update = req_json.get('update', False)
+    if not isinstance(update, bool):
         raise BadRequest
+    return update
+
+
+def _validate_location(req_json, update=False, fail_fast=False):
+    _check_location_request(req_json)
     ddot_location = req_json.get('ddotLocation')
     existing_location = req_json.get('existingLocation')
-    no_errors = error_validator.validate(ddot_location, existing_location, update=update)
-    no_warnings = warning_validator.validate(ddot_location, existing_location)
+    result = location_validator.validate(ddot_location, existing_location, update=update, fail_fast=fail_fast)
 
     response = {}
-    if not no_errors:
-        response["fatal_error_message"] = 'Fatal Errors: {0}'.format(dict(error_validator.errors))
-    if not no_warnings:
-        response["warning_message"] = 'Validation Warnings: {0}'.format(dict(warning_validator.warnings))
-    if no_errors and no_warnings:
+    if result.errors:
+        response["fatal_error_message"] = 'Fatal Errors: {0}'.format(dict(result.errors))
+    if result.warnings:
+        response["warning_message"] = 'Validation Warnings: {0}'.format(dict(result.warnings))
+    if result.passed:
         response["validation_passed_message"] = 'Validations Passed'
 
+    return response
+
+
+def _result_label(response):
+    if 'fatal_error_message' in response:
+        return 'errors'
+    elif 'warning_message' in response:
+        return 'warnings'
+    else:
+        return 'passed'
+
+
+def _validate_response(req_json, update=False, fail_fast=False):
+    if not metrics.is_enabled():
+        return _validate_location(req_json, update=update, fail_fast=fail_fast), 200
+
+    endpoint = 'update' if update else 'add'
+    start = time.perf_counter()
+    response = _validate_location(req_json, update=update, fail_fast=fail_fast)
+    metrics.VALIDATION_DURATION.observe((endpoint,), time.perf_counter() - start)
+    metrics.REQUESTS.inc((endpoint, _result_label(response)))
     return response, 200
 
 
+def _validate_batch_response(req_json, fail_fast=False):
+    if not isinstance(req_json, list):
+        raise BadRequest
+    updates = []
+    for item in req_json:
+        _check_location_request(item)
+        updates.append(_get_update(item))
+    return [_validate_location(item, update=update, fail_fast=fail_fast)
+            for item, update in zip(req_json, updates)], 200
+
+
+def _validate_ndjson_stream(stream, fail_fast=False):
+    '''
+    Generator which reads one location transaction per line from stream and yields its validation result as a line
+    of JSON as soon as it has been validated. Lines which are not valid transactions, or which can not be validated,
+    produce an error_message rather than ending the stream, since the response has already started. The request
+    duration is recorded when the last line has been written.
+    :param stream: file like object containing newline delimited JSON
+    :param boolean fail_fast: if True, validation of each location stops at its first fatal error
+    '''
+    start = time.perf_counter()
+    try:
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                req_json = json.loads(line.decode('utf-8'))
+                _check_location_request(req_json)
+                update = _get_update(req_json)
+            except (ValueError, BadRequest):
+                response = {'error_message': 'Line {0} is not a valid location transaction'.format(line_number)}
+            else:
+                try:
+                    response = _validate_location(req_json, update=update, fail_fast=fail_fast)
+                except Exception:
+                    logger.exception('Unable to validate line %d of the stream', line_number)
+                    response = {'error_message': 'Line {0} could not be validated'.format(line_number)}
+            yield json.dumps(response) + '\n'
+    finally:
+        if metrics.is_enabled():
+            metrics.REQUEST_DURATION.observe(('stream',), time.perf_counter() - start)
+
+
 @api.route('/validators/add')
 class AddValidator(Resource):
 
     @api.response(200, 'Successfully validated', validation_model)
     @api.response(401, 'Not authorized')
-    @api.doc(security='apikey')
+    @api.doc(security='apikey', params=fail_fast_params)
     @api.expect(validate_location_model)
     @jwt_required
+    @metrics.time_request('add')
     def post(self):
-        return _validate_response(request.get_json())
+        return _validate_response(request.get_json(), fail_fast=_is_fail_fast())
 
 
 @api.route('/validators/update')
@@ -141,11 +237,53 @@ class UpdateValidator(Resource):
 
     @api.response(200, 'Successfully validated', validation_model)
     @api.response(401, 'Not authorized')
-    @api.doc(security='apikey')
+    @api.doc(security='apikey', params=fail_fast_params)
     @api.expect(validate_location_model)
     @jwt_required
+    @metrics.time_request('update')
+    def post(self):
+        return _validate_response(request.get_json(), update=True, fail_fast=_is_fail_fast())
+
+
+@api.route('/validators/batch')
+class BatchValidator(Resource):
+
+    @api.response(200, 'Successfully validated. The results are in the same order as the locations', [validation_model])
+    @api.response(401, 'Not authorized')
+    @api.doc(security='apikey', params=fail_fast_params)
+    @api.expect([batch_location_model])
+    @jwt_required
+    @metrics.time_request('batch')
     def post(self):
-        return _validate_response(request.get_json(), update=True)
+        return _validate_batch_response(request.get_json(), fail_fast=_is_fail_fast())
+
+
+@api.route('/validators/stream')
+class StreamValidator(Resource):
+
+    @api.doc(description='Expects newline delimited JSON (application/x-ndjson), one batch location per line. '
+                         'Each line of the response is the result for the corresponding location, written as soon '
+                         'as it has been validated',
+             security='apikey', params=fail_fast_params)
+    @api.response(200, 'Newline delimited validation results, in the same order as the locations', validation_model)
+    @api.response(401, 'Not authorized')
+    @jwt_required
+    def post(self):
+        return Response(stream_with_context(_validate_ndjson_stream(request.stream, fail_fast=_is_fail_fast())),
+                        mimetype='application/x-ndjson')
+
+
+@api.route('/metrics')
+class Metrics(Resource):
+
+    @api.doc(description='Validator and request timings in the Prometheus text format. Only available when '
+                         'metrics are enabled')
+    @api.response(200, 'Success')
+    @api.response(404, 'Metrics are not enabled')
+    def get(self):
+        if not metrics.is_enabled():
+            api.abort(404, 'Metrics are not enabled')
+        return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 
 version_model = api.model('VersionModel', {
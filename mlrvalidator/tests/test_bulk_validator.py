@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from ..bulk_validator import main, read_locations, validate_file, InvalidLine, ReportWriter, CSV, NDJSON
+
+GOOD_LOCATION = {'agencyCode': 'USGS ', 'siteNumber': '12345678'}
+BAD_LOCATION = {'agencyCode': 'XYZ', 'siteNumber': '1234567a'}
+
+
+class ReadLocationsTestCase(TestCase):
+
+    def test_csv(self):
+        fd = io.StringIO('agencyCode,siteNumber\nUSGS ,12345678\nXYZ,1234567a\n')
+        self.assertEqual(list(read_locations(fd, CSV)), [(2, GOOD_LOCATION), (3, BAD_LOCATION)])
+
+    def test_ndjson_skips_blank_lines(self):
+        fd = io.StringIO(json.dumps(GOOD_LOCATION) + '\n\n' + json.dumps(BAD_LOCATION) + '\n')
+        self.assertEqual(list(read_locations(fd, NDJSON)), [(1, GOOD_LOCATION), (3, BAD_LOCATION)])
+
+    def test_ndjson_invalid_lines(self):
+        fd = io.StringIO(json.dumps(GOOD_LOCATION) + '\n{"agencyCode": \n[1, 2]\n' + json.dumps(BAD_LOCATION) + '\n')
+        locations = list(read_locations(fd, NDJSON))
+        self.assertEqual([line for line, location in locations], [1, 2, 3, 4])
+        self.assertIsInstance(locations[1][1], InvalidLine)
+        self.assertIsInstance(locations[2][1], InvalidLine)
+        self.assertEqual(locations[2][1].message, 'expected a JSON object')
+        self.assertEqual(locations[3], (4, BAD_LOCATION))
+
+
+class ValidateFileTestCase(TestCase):
+
+    def _ndjson(self, locations):
+        return io.StringIO(''.join(json.dumps(location) + '\n' for location in locations))
+
+    def test_report_is_in_input_order(self):
+        output = io.StringIO()
+        summary = validate_file(self._ndjson([GOOD_LOCATION, BAD_LOCATION, GOOD_LOCATION]), NDJSON,
+                                ReportWriter(output, NDJSON), update=True, processes=1)
+
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([record['line'] for record in records], [1, 2, 3])
+        self.assertEqual([record['status'] for record in records], ['passed', 'error', 'passed'])
+        self.assertEqual(set(records[1]['fatal_errors']), {'agencyCode', 'siteNumber'})
+        self.assertEqual(summary, {'total': 3, 'passed': 2, 'errors': 1, 'warnings': 0, 'invalid': 0})
+
+    def test_invalid_line_is_reported(self):
+        ddot_fd = io.StringIO(json.dumps(GOOD_LOCATION) + '\nnot json\n' + json.dumps(BAD_LOCATION) + '\n')
+        for processes in (1, 2):
+            ddot_fd.seek(0)
+            output = io.StringIO()
+            summary = validate_file(ddot_fd, NDJSON, ReportWriter(output, NDJSON), update=True, processes=processes)
+
+            records = [json.loads(line) for line in output.getvalue().splitlines()]
+            self.assertEqual([record['line'] for record in records], [1, 2, 3])
+            self.assertEqual([record['status'] for record in records], ['passed', 'invalid', 'error'])
+            self.assertTrue(records[1]['error_message'].startswith('Line 2 is not a valid location: '))
+            self.assertEqual(summary, {'total': 3, 'passed': 1, 'errors': 1, 'warnings': 0, 'invalid': 1})
+
+    def test_invalid_line_csv_report(self):
+        output = io.StringIO()
+        validate_file(io.StringIO('not json\n'), NDJSON, ReportWriter(output, CSV), processes=1)
+
+        rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+        self.assertEqual(rows[0]['status'], 'invalid')
+        self.assertEqual(rows[0]['fatal_errors'], '')
+        self.assertTrue(rows[0]['error_message'].startswith('Line 1 is not a valid location: '))
+
+    def test_existing_location_is_matched(self):
+        output = io.StringIO()
+        existing_locations = {('USGS', '12345678'): GOOD_LOCATION}
+        summary = validate_file(self._ndjson([GOOD_LOCATION]), NDJSON, ReportWriter(output, NDJSON),
+                                existing_locations=existing_locations, processes=1)
+
+        record = json.loads(output.getvalue())
+        self.assertIn('duplicate_site', record['fatal_errors'])
+        self.assertEqual(summary['errors'], 1)
+
+    def test_csv_report(self):
+        output = io.StringIO()
+        validate_file(self._ndjson([GOOD_LOCATION, BAD_LOCATION]), NDJSON, ReportWriter(output, CSV), update=True,
+                      processes=1)
+
+        rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+        self.assertEqual([row['status'] for row in rows], ['passed', 'error'])
+        self.assertEqual(rows[0]['fatal_errors'], '')
+        self.assertIn('siteNumber', json.loads(rows[1]['fatal_errors']))
+
+    def test_process_pool(self):
+        locations = [GOOD_LOCATION, BAD_LOCATION] * 10
+        pool_output = io.StringIO()
+        in_process_output = io.StringIO()
+        validate_file(self._ndjson(locations), NDJSON, ReportWriter(pool_output, NDJSON), update=True,
+                      processes=2, chunksize=3)
+        validate_file(self._ndjson(locations), NDJSON, ReportWriter(in_process_output, NDJSON), update=True,
+                      processes=1)
+
+        self.assertEqual(pool_output.getvalue(), in_process_output.getvalue())
+
+
+class MainTestCase(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.ddot_path = os.path.join(self.temp_dir.name, 'ddot.csv')
+        with open(self.ddot_path, 'w', newline='') as fd:
+            fd.write('agencyCode,siteNumber\nUSGS ,12345678\n')
+        self.existing_path = os.path.join(self.temp_dir.name, 'existing.ndjson')
+        with open(self.existing_path, 'w') as fd:
+            fd.write(json.dumps(GOOD_LOCATION) + '\n')
+        self.output_path = os.path.join(self.temp_dir.name, 'report.ndjson')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @mock.patch('mlrvalidator.bulk_validator.sys.stderr')
+    def test_update_passes(self, mock_stderr):
+        self.assertEqual(main([self.ddot_path, '--existing', self.existing_path, '--update',
+                               '--output', self.output_path, '--processes', '1']), 0)
+        with open(self.output_path) as fd:
+            self.assertEqual(json.loads(fd.read())['status'], 'passed')
+        mock_stderr.write.assert_called_with(
+            'Validated 1 locations: 1 passed, 0 with fatal errors, 0 with warnings, 0 invalid\n')
+
+    @mock.patch('mlrvalidator.bulk_validator.sys.stderr')
+    def test_add_of_existing_location_fails(self, mock_stderr):
+        self.assertEqual(main([self.ddot_path, '--existing', self.existing_path,
+                               '--output', self.output_path, '--processes', '1']), 1)
+        with open(self.output_path) as fd:
+            self.assertIn('duplicate_site', json.loads(fd.read())['fatal_errors'])
+
+    @mock.patch('mlrvalidator.bulk_validator.sys.stderr')
+    def test_invalid_line_fails(self, mock_stderr):
+        ndjson_path = os.path.join(self.temp_dir.name, 'ddot.ndjson')
+        with open(ndjson_path, 'w') as fd:
+            fd.write(json.dumps(GOOD_LOCATION) + '\n{\n')
+        self.assertEqual(main([ndjson_path, '--update', '--output', self.output_path, '--processes', '1']), 1)
+        mock_stderr.write.assert_called_with(
+            'Validated 2 locations: 1 passed, 0 with fatal errors, 0 with warnings, 1 invalid\n')
+
+    @mock.patch('mlrvalidator.bulk_validator.sys.stderr')
+    def test_invalid_existing_location(self, mock_stderr):
+        with open(self.existing_path, 'a') as fd:
+            fd.write('{\n')
+        self.assertEqual(main([self.ddot_path, '--existing', self.existing_path, '--update',
+                               '--output', self.output_path, '--processes', '1']), 2)
+        self.assertIn('Line 2 of {0} is not a valid location'.format(self.existing_path),
+                      mock_stderr.write.call_args[0][0])
@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from app import application
+from .. import metrics
+from ..validators.location_validator import LocationValidator
+
+
+class HistogramTestCase(TestCase):
+
+    def test_render(self):
+        histogram = metrics.Histogram('test_seconds', 'Test histogram', ('name',), buckets=(0.1, 1.0))
+        histogram.observe(('a',), 0.05)
+        histogram.observe(('a',), 0.5)
+        histogram.observe(('a',), 2.0)
+
+        self.assertEqual(histogram.render(), [
+            '# HELP test_seconds Test histogram',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{name="a",le="0.1"} 1',
+            'test_seconds_bucket{name="a",le="1.0"} 2',
+            'test_seconds_bucket{name="a",le="+Inf"} 3',
+            'test_seconds_sum{name="a"} 2.55',
+            'test_seconds_count{name="a"} 3'
+        ])
+
+
+class CounterTestCase(TestCase):
+
+    def test_render(self):
+        counter = metrics.Counter('test_total', 'Test counter', ('name',))
+        counter.inc(('b"',))
+        counter.inc(('a',), 2)
+
+        self.assertEqual(counter.render(), [
+            '# HELP test_total Test counter',
+            '# TYPE test_total counter',
+            'test_total{name="a"} 2',
+            'test_total{name="b\\""} 1'
+        ])
+
+
+class InstrumentTestCase(TestCase):
+
+    def setUp(self):
+        self.validator = LocationValidator(application.config['SCHEMA_DIR'], application.config['REFERENCE_FILE_DIR'])
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.clear()
+
+    def test_not_enabled(self):
+        metrics.instrument(self.validator)
+        self.assertNotIn('validate', vars(self.validator))
+        self.assertNotIn('_validate_mcd', vars(self.validator.error_validator.cross_field_ref_validator))
+
+    def test_instrumented_validators_and_rules(self):
+        metrics.enable()
+        metrics.instrument(self.validator)
+        result = self.validator.validate({'agencyCode': 'USGS ', 'siteNumber': '12345678'}, {}, update=True)
+
+        self.assertTrue(result.passed)
+        self.assertEqual(metrics.VALIDATOR_DURATION.get_count(('LocationValidator', 'LocationValidator')), 1)
+        self.assertEqual(metrics.VALIDATOR_DURATION.get_count(
+            ('CrossFieldRefErrorValidator', 'LocationValidator.error_validator.cross_field_ref_validator')), 1)
+        self.assertEqual(metrics.RULE_DURATION.get_count(
+            ('CrossFieldRefErrorValidator', 'LocationValidator.error_validator.cross_field_ref_validator',
+             '_validate_site_number_format')), 1)
+        # Only the rules which read the submitted fields are run
+        self.assertEqual(metrics.RULE_DURATION.get_count(
+            ('CrossFieldRefErrorValidator', 'LocationValidator.error_validator.cross_field_ref_validator',
+             '_validate_mcd')), 0)
+        self.assertIn('mlr_validator_rule_duration_seconds_count{validator="CrossFieldRefErrorValidator",'
+                      'instance="LocationValidator.error_validator.cross_field_ref_validator",'
+                      'rule="_validate_site_number_format"} 1',
+                      metrics.render())
@@ -1,12 +1,14 @@
 import json
+import time
 from unittest import TestCase, mock
 
 import jwt
 
 import app
+from .. import metrics
+from ..validators.location_validator import ValidationResult
 
-@mock.patch('mlrvalidator.services.warning_validator')
-@mock.patch('mlrvalidator.services.error_validator')
+@mock.patch('mlrvalidator.services.location_validator')
 class AddValidateTransactionTestCase(TestCase):
 
     def setUp(self):
@@ -27,30 +29,23 @@ class AddValidateTransactionTestCase(TestCase):
         }
 
 
-    def test_valid_transaction(self, merror_validator, mwarning_validator):
+    def test_valid_transaction(self, mlocation_validator):
         good_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'secret')
-        merror_validator.validate.return_value = True
-        merror_validator.errors = {}
-        mwarning_validator.validate.return_value = True
-        mwarning_validator.warnings = {}
+        mlocation_validator.validate.return_value = ValidationResult(errors={}, warnings={})
 
         response = self.app_client.post('/validators/add',
                                         content_type='application/json',
                                         headers={'Authorization': 'Bearer {0}'.format(good_token.decode('utf-8'))},
                                         data=json.dumps(self.location))
         self.assertEqual(response.status_code, 200)
-        merror_validator.validate.assert_called_with(self.location.get('ddotLocation'), {}, update=False)
-        mwarning_validator.validate.assert_called_with(self.location.get('ddotLocation'), {})
+        mlocation_validator.validate.assert_called_with(self.location.get('ddotLocation'), {}, update=False, fail_fast=False)
         resp_data = json.loads(response.data)
         self.assertEqual(len(resp_data), 1)
         self.assertEqual({'validation_passed_message': 'Validations Passed'}, resp_data)
 
-    def test_transaction_with_error(self, merror_validator, mwarning_validator):
+    def test_transaction_with_error(self, mlocation_validator):
         good_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'secret')
-        merror_validator.validate.return_value = False
-        merror_validator.errors = {'stationName': ['Invalid value']}
-        mwarning_validator.validate.return_value = True
-        mwarning_validator.warnings = {}
+        mlocation_validator.validate.return_value = ValidationResult(errors={'stationName': ['Invalid value']}, warnings={})
 
         response = self.app_client.post('/validators/add',
                                         content_type='application/json',
@@ -62,12 +57,9 @@ class AddValidateTransactionTestCase(TestCase):
         self.assertIn('fatal_error_message', resp_data)
 
 
-    def test_transaction_with_warning(self, merror_validator, mwarning_validator):
+    def test_transaction_with_warning(self, mlocation_validator):
         good_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'secret')
-        merror_validator.validate.return_value = True
-        merror_validator.errors = {}
-        mwarning_validator.validate.return_value = False
-        mwarning_validator.warnings = {'stationName': ['Contains quotes']}
+        mlocation_validator.validate.return_value = ValidationResult(errors={}, warnings={'stationName': ['Contains quotes']})
 
         response = self.app_client.post('/validators/add',
                                         content_type='application/json',
@@ -78,12 +70,9 @@ class AddValidateTransactionTestCase(TestCase):
         self.assertEqual(len(resp_data), 1)
         self.assertIn('warning_message', resp_data)
 
-    def test_transaction_with_error_and_warning(self, merror_validator, mwarning_validator):
+    def test_transaction_with_error_and_warning(self, mlocation_validator):
         good_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'secret')
-        merror_validator.validate.return_value = False
-        merror_validator.errors = {'agencyCode': ['Bad value']}
-        mwarning_validator.validate.return_value = False
-        mwarning_validator.warnings = {'stationName': ['Contains quotes']}
+        mlocation_validator.validate.return_value = ValidationResult(errors={'agencyCode': ['Bad value']}, warnings={'stationName': ['Contains quotes']})
 
         response = self.app_client.post('/validators/add',
                                         content_type='application/json',
@@ -95,7 +84,7 @@ class AddValidateTransactionTestCase(TestCase):
         self.assertIn('warning_message', resp_data)
         self.assertIn('fatal_error_message', resp_data)
 
-    def test_transaction_with_missing_keys(self, merror_validator, mwarning_validator):
+    def test_transaction_with_missing_keys(self, mlocation_validator):
         good_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'secret')
         response = self.app_client.post('/validators/add',
                                         content_type='application/json',
@@ -111,14 +100,24 @@ class AddValidateTransactionTestCase(TestCase):
                                         )
         self.assertEqual(response.status_code, 400)
 
-    def test_no_auth_header(self, merror_validator, mwarning_validator):
+    def test_locations_must_be_objects(self, mlocation_validator):
+        good_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'secret')
+        response = self.app_client.post('/validators/add',
+                                        content_type='application/json',
+                                        headers={'Authorization': 'Bearer {0}'.format(good_token.decode('utf-8'))},
+                                        data=json.dumps({'ddotLocation': [], 'existingLocation': {}})
+                                        )
+        self.assertEqual(response.status_code, 400)
+        mlocation_validator.validate.assert_not_called()
+
+    def test_no_auth_header(self, mlocation_validator):
         response = self.app_client.post('/validators/add',
                                         content_type='application/json',
                                         data=json.dumps({'ddotLocation': {}})
                                         )
         self.assertEqual(response.status_code, 401)
 
-    def test_bad_token(self, merror_validator, mwarning_validator):
+    def test_bad_token(self, mlocation_validator):
         bad_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'bad_secret')
         response = self.app_client.post('/validators/add',
                                         content_type='application/json',
@@ -128,8 +127,7 @@ class AddValidateTransactionTestCase(TestCase):
         self.assertEqual(response.status_code, 422)
 
 
-@mock.patch('mlrvalidator.services.warning_validator')
-@mock.patch('mlrvalidator.services.error_validator')
+@mock.patch('mlrvalidator.services.location_validator')
 class UpdateValidateTransactionTestCase(TestCase):
 
     def setUp(self):
@@ -154,30 +152,23 @@ class UpdateValidateTransactionTestCase(TestCase):
         }
 
 
-    def test_valid_transaction(self, merror_validator, mwarning_validator):
+    def test_valid_transaction(self, mlocation_validator):
         good_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'secret')
-        merror_validator.validate.return_value = True
-        merror_validator.errors = {}
-        mwarning_validator.validate.return_value = True
-        mwarning_validator.warnings = {}
+        mlocation_validator.validate.return_value = ValidationResult(errors={}, warnings={})
 
         response = self.app_client.post('/validators/update',
                                         content_type='application/json',
                                         headers={'Authorization': 'Bearer {0}'.format(good_token.decode('utf-8'))},
                                         data=json.dumps(self.location))
         self.assertEqual(response.status_code, 200)
-        merror_validator.validate.assert_called_with(self.location.get('ddotLocation'), self.location.get('existingLocation'), update=True)
-        mwarning_validator.validate.assert_called_with(self.location.get('ddotLocation'), self.location.get('existingLocation'))
+        mlocation_validator.validate.assert_called_with(self.location.get('ddotLocation'), self.location.get('existingLocation'), update=True, fail_fast=False)
         resp_data = json.loads(response.data)
         self.assertEqual(len(resp_data), 1)
         self.assertEqual({'validation_passed_message': 'Validations Passed'}, resp_data)
 
-    def test_transaction_with_error(self, merror_validator, mwarning_validator):
+    def test_transaction_with_error(self, mlocation_validator):
         good_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'secret')
-        merror_validator.validate.return_value = False
-        merror_validator.errors = {'stationName': ['Invalid value']}
-        mwarning_validator.validate.return_value = True
-        mwarning_validator.warnings = {}
+        mlocation_validator.validate.return_value = ValidationResult(errors={'stationName': ['Invalid value']}, warnings={})
 
         response = self.app_client.post('/validators/update',
                                         content_type='application/json',
@@ -189,12 +180,9 @@ class UpdateValidateTransactionTestCase(TestCase):
         self.assertIn('fatal_error_message', resp_data)
 
 
-    def test_transaction_with_warning(self, merror_validator, mwarning_validator):
+    def test_transaction_with_warning(self, mlocation_validator):
         good_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'secret')
-        merror_validator.validate.return_value = True
-        merror_validator.errors = {}
-        mwarning_validator.validate.return_value = False
-        mwarning_validator.warnings = {'stationName': ['Contains quotes']}
+        mlocation_validator.validate.return_value = ValidationResult(errors={}, warnings={'stationName': ['Contains quotes']})
 
         response = self.app_client.post('/validators/update',
                                         content_type='application/json',
@@ -205,12 +193,9 @@ class UpdateValidateTransactionTestCase(TestCase):
         self.assertEqual(len(resp_data), 1)
         self.assertIn('warning_message', resp_data)
 
-    def test_transaction_with_error_and_warning(self, merror_validator, mwarning_validator):
+    def test_transaction_with_error_and_warning(self, mlocation_validator):
         good_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'secret')
-        merror_validator.validate.return_value = False
-        merror_validator.errors = {'agencyCode': ['Bad value']}
-        mwarning_validator.validate.return_value = False
-        mwarning_validator.warnings = {'stationName': ['Contains quotes']}
+        mlocation_validator.validate.return_value = ValidationResult(errors={'agencyCode': ['Bad value']}, warnings={'stationName': ['Contains quotes']})
 
         response = self.app_client.post('/validators/update',
                                         content_type='application/json',
@@ -222,7 +207,7 @@ class UpdateValidateTransactionTestCase(TestCase):
         self.assertIn('warning_message', resp_data)
         self.assertIn('fatal_error_message', resp_data)
 
-    def test_transaction_with_missing_keys(self, merror_validator, mwarning_validator):
+    def test_transaction_with_missing_keys(self, mlocation_validator):
         good_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'secret')
         response = self.app_client.post('/validators/update',
                                         content_type='application/json',
@@ -238,18 +223,313 @@ class UpdateValidateTransactionTestCase(TestCase):
                                         )
         self.assertEqual(response.status_code, 400)
 
-    def test_no_auth_header(self, merror_validator, mwarning_validator):
+    def test_no_auth_header(self, mlocation_validator):
         response = self.app_client.post('/validators/update',
                                         content_type='application/json',
                                         data=json.dumps({'ddotLocation': {}})
                                         )
         self.assertEqual(response.status_code, 401)
 
-    def test_bad_token(self, merror_validator, mwarning_validator):
+    def test_bad_token(self, mlocation_validator):
         bad_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'bad_secret')
         response = self.app_client.post('/validators/update',
                                         content_type='application/json',
                                         headers={'Authorization': 'Bearer {0}'.format(bad_token.decode('utf-8'))},
                                         data=json.dumps({'ddotLocation': {}})
                                         )
-        self.assertEqual(response.status_code, 422)
\ No newline at end of file
+        self.assertEqual(response.status_code, 422)
+
+@mock.patch('mlrvalidator.services.location_validator')
+class BatchValidateTransactionTestCase(TestCase):
+
+    def setUp(self):
+        app.application.config['JWT_SECRET_KEY'] = 'secret'
+        app.application.config['JWT_PUBLIC_KEY'] = None
+        app.application.config['JWT_ALGORITHM'] = 'HS256'
+        app.application.config['AUTH_TOKEN_KEY_URL'] = ''
+        app.application.config['JWT_DECODE_AUDIENCE'] = None
+        app.application.testing = True
+        self.app_client = app.application.test_client()
+        self.good_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'secret')
+        self.locations = [
+            {
+                "ddotLocation": {
+                    "agencyCode": "USGS ",
+                    "siteNumber": "123456789012345",
+                    "stationName": "This station name "
+                },
+                "existingLocation": {}
+            }, {
+                "ddotLocation": {
+                    "stationName": "New station name"
+                },
+                "existingLocation": {
+                    'agencyCode': 'USGS ',
+                    'siteNumber': '123456789012346',
+                    'stationName': 'This station name'
+                },
+                "update": True
+            }
+        ]
+
+    def post(self, data):
+        return self.app_client.post('/validators/batch',
+                                    content_type='application/json',
+                                    headers={'Authorization': 'Bearer {0}'.format(self.good_token.decode('utf-8'))},
+                                    data=json.dumps(data))
+
+    def test_results_in_order(self, mlocation_validator):
+        mlocation_validator.validate.side_effect = [
+            ValidationResult(errors={}, warnings={}),
+            ValidationResult(errors={'stationName': ['Invalid value']}, warnings={})
+        ]
+
+        response = self.post(self.locations)
+        self.assertEqual(response.status_code, 200)
+        mlocation_validator.validate.assert_has_calls([
+            mock.call(self.locations[0]['ddotLocation'], {}, update=False, fail_fast=False),
+            mock.call(self.locations[1]['ddotLocation'], self.locations[1]['existingLocation'], update=True, fail_fast=False)
+        ])
+        resp_data = json.loads(response.data)
+        self.assertEqual(len(resp_data), 2)
+        self.assertEqual(resp_data[0], {'validation_passed_message': 'Validations Passed'})
+        self.assertIn('fatal_error_message', resp_data[1])
+
+    def test_fail_fast(self, mlocation_validator):
+        mlocation_validator.validate.return_value = ValidationResult(errors={}, warnings={})
+
+        response = self.app_client.post('/validators/batch?failFast=true',
+                                        content_type='application/json',
+                                        headers={'Authorization': 'Bearer {0}'.format(self.good_token.decode('utf-8'))},
+                                        data=json.dumps(self.locations))
+        self.assertEqual(response.status_code, 200)
+        mlocation_validator.validate.assert_has_calls([
+            mock.call(self.locations[0]['ddotLocation'], {}, update=False, fail_fast=True),
+            mock.call(self.locations[1]['ddotLocation'], self.locations[1]['existingLocation'], update=True,
+                      fail_fast=True)
+        ])
+
+    def test_update_must_be_boolean(self, mlocation_validator):
+        for update in ('false', 0, None):
+            location = dict(self.locations[1], update=update)
+            response = self.post([self.locations[0], location])
+            self.assertEqual(response.status_code, 400)
+        mlocation_validator.validate.assert_not_called()
+
+    def test_empty_batch(self, mlocation_validator):
+        response = self.post([])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), [])
+
+    def test_not_a_list(self, mlocation_validator):
+        response = self.post(self.locations[0])
+        self.assertEqual(response.status_code, 400)
+
+    def test_location_with_missing_keys(self, mlocation_validator):
+        response = self.post(self.locations + [{'ddotLocation': {}}])
+        self.assertEqual(response.status_code, 400)
+        mlocation_validator.validate.assert_not_called()
+
+    def test_no_auth_header(self, mlocation_validator):
+        response = self.app_client.post('/validators/batch',
+                                        content_type='application/json',
+                                        data=json.dumps(self.locations)
+                                        )
+        self.assertEqual(response.status_code, 401)
+
+
+class SwaggerTestCase(TestCase):
+
+    def test_swagger_document(self):
+        response = app.application.test_client().get('/swagger.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/validators/batch', json.loads(response.data)['paths'])
+
+
+@mock.patch('mlrvalidator.services.location_validator')
+class StreamValidateTransactionTestCase(TestCase):
+
+    def setUp(self):
+        app.application.config['JWT_SECRET_KEY'] = 'secret'
+        app.application.config['JWT_PUBLIC_KEY'] = None
+        app.application.config['JWT_ALGORITHM'] = 'HS256'
+        app.application.config['AUTH_TOKEN_KEY_URL'] = ''
+        app.application.config['JWT_DECODE_AUDIENCE'] = None
+        app.application.testing = True
+        self.app_client = app.application.test_client()
+        self.good_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'secret')
+        self.locations = [
+            {
+                "ddotLocation": {
+                    "agencyCode": "USGS ",
+                    "siteNumber": "123456789012345"
+                },
+                "existingLocation": {}
+            }, {
+                "ddotLocation": {
+                    "stationName": "New station name"
+                },
+                "existingLocation": {
+                    'agencyCode': 'USGS ',
+                    'siteNumber': '123456789012346'
+                },
+                "update": True
+            }
+        ]
+
+    def post(self, data):
+        return self.app_client.post('/validators/stream',
+                                    content_type='application/x-ndjson',
+                                    headers={'Authorization': 'Bearer {0}'.format(self.good_token.decode('utf-8'))},
+                                    data=data)
+
+    def test_results_in_order(self, mlocation_validator):
+        mlocation_validator.validate.side_effect = [
+            ValidationResult(errors={}, warnings={}),
+            ValidationResult(errors={}, warnings={'stationName': ['Contains quotes']})
+        ]
+
+        response = self.post('\n'.join(json.dumps(location) for location in self.locations) + '\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.data.decode('utf-8').splitlines()
+        mlocation_validator.validate.assert_has_calls([
+            mock.call(self.locations[0]['ddotLocation'], {}, update=False, fail_fast=False),
+            mock.call(self.locations[1]['ddotLocation'], self.locations[1]['existingLocation'], update=True, fail_fast=False)
+        ])
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0]), {'validation_passed_message': 'Validations Passed'})
+        self.assertIn('warning_message', json.loads(lines[1]))
+
+    def test_blank_lines_are_skipped(self, mlocation_validator):
+        mlocation_validator.validate.return_value = ValidationResult(errors={}, warnings={})
+
+        response = self.post('\n' + json.dumps(self.locations[0]) + '\n\n')
+        self.assertEqual(len(response.data.decode('utf-8').splitlines()), 1)
+
+    def test_invalid_lines(self, mlocation_validator):
+        mlocation_validator.validate.return_value = ValidationResult(errors={}, warnings={})
+
+        response = self.post('\n'.join(['{"ddotLocation": {}}', 'not json', json.dumps(self.locations[0])]))
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+        self.assertEqual(lines[0], {'error_message': 'Line 1 is not a valid location transaction'})
+        self.assertEqual(lines[1], {'error_message': 'Line 2 is not a valid location transaction'})
+        self.assertEqual(lines[2], {'validation_passed_message': 'Validations Passed'})
+
+    def test_locations_must_be_objects(self, mlocation_validator):
+        mlocation_validator.validate.return_value = ValidationResult(errors={}, warnings={})
+
+        response = self.post('\n'.join(['{"ddotLocation": [], "existingLocation": {}}',
+                                        '{"ddotLocation": {}, "existingLocation": null}',
+                                        json.dumps(self.locations[0])]))
+        lines = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+        self.assertEqual(lines[0], {'error_message': 'Line 1 is not a valid location transaction'})
+        self.assertEqual(lines[1], {'error_message': 'Line 2 is not a valid location transaction'})
+        self.assertEqual(lines[2], {'validation_passed_message': 'Validations Passed'})
+
+    def test_validation_exception_does_not_end_stream(self, mlocation_validator):
+        mlocation_validator.validate.side_effect = [ValueError('bad document'),
+                                                    ValidationResult(errors={}, warnings={})]
+
+        with self.assertLogs('mlrvalidator.services', level='ERROR'):
+            data = self.post('\n'.join(json.dumps(location) for location in self.locations)).get_data()
+        lines = [json.loads(line) for line in data.decode('utf-8').splitlines()]
+        self.assertEqual(lines, [{'error_message': 'Line 1 could not be validated'},
+                                 {'validation_passed_message': 'Validations Passed'}])
+
+    def test_request_duration_includes_streaming(self, mlocation_validator):
+        metrics.enable()
+        self.addCleanup(metrics.clear)
+        self.addCleanup(metrics.disable)
+
+        def slow_validate(*args, **kwargs):
+            time.sleep(0.05)
+            return ValidationResult(errors={}, warnings={})
+        mlocation_validator.validate.side_effect = slow_validate
+
+        self.post(json.dumps(self.locations[0])).get_data()
+        text = self.app_client.get('/metrics').data.decode('utf-8')
+        self.assertIn('mlr_validator_request_duration_seconds_count{endpoint="stream"} 1', text)
+        duration = [line for line in text.splitlines()
+                    if line.startswith('mlr_validator_request_duration_seconds_sum{endpoint="stream"}')][0]
+        self.assertGreaterEqual(float(duration.split()[1]), 0.05)
+
+    def test_update_must_be_boolean(self, mlocation_validator):
+        mlocation_validator.validate.return_value = ValidationResult(errors={}, warnings={})
+
+        response = self.post('\n'.join([json.dumps(dict(self.locations[1], update='false')),
+                                        json.dumps(self.locations[0])]))
+        lines = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+        self.assertEqual(lines[0], {'error_message': 'Line 1 is not a valid location transaction'})
+        self.assertEqual(lines[1], {'validation_passed_message': 'Validations Passed'})
+        mlocation_validator.validate.assert_called_once_with(self.locations[0]['ddotLocation'], {}, update=False,
+                                                             fail_fast=False)
+        self.assertEqual(mlocation_validator.validate.call_count, 1)
+
+    def test_no_auth_header(self, mlocation_validator):
+        response = self.app_client.post('/validators/stream',
+                                        content_type='application/x-ndjson',
+                                        data=json.dumps(self.locations[0]))
+        self.assertEqual(response.status_code, 401)
+
+
+@mock.patch('mlrvalidator.services.location_validator')
+class MetricsTestCase(TestCase):
+
+    def setUp(self):
+        app.application.config['JWT_SECRET_KEY'] = 'secret'
+        app.application.config['JWT_PUBLIC_KEY'] = None
+        app.application.config['JWT_ALGORITHM'] = 'HS256'
+        app.application.config['AUTH_TOKEN_KEY_URL'] = ''
+        app.application.config['JWT_DECODE_AUDIENCE'] = None
+        app.application.testing = True
+        self.app_client = app.application.test_client()
+        self.location = {
+            "ddotLocation": {"agencyCode": "USGS ", "siteNumber": "123456789012345"},
+            "existingLocation": {}
+        }
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.clear()
+
+    def test_metrics_not_enabled(self, mlocation_validator):
+        response = self.app_client.get('/metrics')
+        self.assertEqual(response.status_code, 404)
+
+    def test_request_metrics(self, mlocation_validator):
+        metrics.enable()
+        good_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'secret')
+        mlocation_validator.validate.return_value = ValidationResult(errors={}, warnings={'stationName': ['Quote']})
+
+        self.app_client.post('/validators/update',
+                             content_type='application/json',
+                             headers={'Authorization': 'Bearer {0}'.format(good_token.decode('utf-8'))},
+                             data=json.dumps(self.location))
+        response = self.app_client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        text = response.data.decode('utf-8')
+        self.assertIn('mlr_validator_requests_total{endpoint="update",result="warnings"} 1', text)
+        self.assertIn('mlr_validator_request_duration_seconds_count{endpoint="update"} 1', text)
+        self.assertIn('mlr_validator_validation_duration_seconds_count{endpoint="update"} 1', text)
+
+    def test_unauthorized_request_is_not_timed(self, mlocation_validator):
+        metrics.enable()
+        bad_token = jwt.encode({'authorities': ['one_role', 'two_role']}, 'bad_secret')
+
+        response = self.app_client.post('/validators/add',
+                                        content_type='application/json',
+                                        headers={'Authorization': 'Bearer {0}'.format(bad_token.decode('utf-8'))},
+                                        data=json.dumps(self.location))
+        self.assertEqual(response.status_code, 422)
+        response = self.app_client.post('/validators/batch', content_type='application/json',
+                                        data=json.dumps([self.location]))
+        self.assertEqual(response.status_code, 401)
+
+        text = self.app_client.get('/metrics').data.decode('utf-8')
+        self.assertNotIn('mlr_validator_request_duration_seconds_count{endpoint="add"}', text)
+        self.assertNotIn('mlr_validator_request_duration_seconds_count{endpoint="batch"}', text)
+        mlocation_validator.validate.assert_not_called()
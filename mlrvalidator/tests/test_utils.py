@@ -1,7 +1,7 @@
 
 from unittest import TestCase
 
-from ..utils import get_dict
+from ..utils import get_dict, index_dicts
 
 class GetDictTestCase(TestCase):
 
@@ -34,3 +34,35 @@ class GetDictTestCase(TestCase):
             'a': 'B',
             'b': 2
         }], 'c', 'C'), {})
+
+
+class IndexDictsTestCase(TestCase):
+
+    def test_empty_dictlist(self):
+        self.assertEqual(index_dicts([], 'a'), {})
+
+    def test_index_by_key(self):
+        self.assertEqual(index_dicts([{
+            'a': 'A',
+            'b': 1
+        }, {
+            'a': 'B',
+            'b': 2
+        }], 'a'), {'A': {'a': 'A', 'b': 1}, 'B': {'a': 'B', 'b': 2}})
+
+    def test_first_dict_wins(self):
+        self.assertEqual(index_dicts([{
+            'a': 'A',
+            'b': 1
+        }, {
+            'a': 'A',
+            'b': 2
+        }], 'a'), {'A': {'a': 'A', 'b': 1}})
+
+    def test_missing_parent_key_is_skipped(self):
+        self.assertEqual(index_dicts([{
+            'a': 'A',
+            'b': 1
+        }, {
+            'b': 2
+        }], 'a'), {'A': {'a': 'A', 'b': 1}})
@@ -18,3 +18,16 @@ def get_dict(dictlist, parent_key, parent_value):
     return result
 
 
+def index_dicts(dictlist, parent_key):
+    '''
+    :param dictlist: list of dictionaries. See get_dict for the assumed form.
+    :param parent_key: the key whose value is used to index each dictionary in dictlist
+    :return: dictionary mapping each value of parent_key to the dictionary in dictlist containing it. As with
+        get_dict, the first dictionary found wins when a value is repeated. Dictionaries without parent_key are skipped.
+    '''
+    result = {}
+    for d in dictlist:
+        if parent_key in d:
+            result.setdefault(d[parent_key], d)
+
+    return result
@@ -1,35 +1,123 @@
+from .check_rank import RANKS, VALUE_RANK
+from .validation_context import ValidationContext
 
-class BaseCrossFieldValidator:
+
+class CrossFieldRule:
     '''
-    Extends validate to add an argument for the existing_document. Typically for an add this will be empty.
+    A cross field rule of a validator and the document fields it reads. The rule can only find an error when at
+    least one of its fields was submitted, so it is not run otherwise.
     '''
+    __slots__ = ('method_name', 'fields', 'args', 'rank')
 
-    def __init__(self):
-        self._errors = {}
+    def __init__(self, method_name, fields, *args, rank=VALUE_RANK):
+        '''
+        :param str method_name: name of the validator method which implements the rule. It is called with the
+            ValidationContext, the errors dictionary and args.
+        :param iterable fields: the fields which the rule reads or None if the rule must be run for every document
+        :param args: any additional arguments for the method
+        :param int rank: one of the check_rank ranks, for the most expensive work the rule does. When failing fast,
+            rules of a lower rank are run first.
+        '''
+        self.method_name = method_name
+        self.fields = None if fields is None else frozenset(fields)
+        self.args = args
+        self.rank = rank
 
-    def validate(self, document, existing_document):
-        self.document = document
-        self.existing_document = existing_document
-        self.merged_document = existing_document.copy()
-        self.merged_document.update(document)
 
-        self._errors = {}
+class CrossFieldRuleIndex:
+    '''
+    Finds the rules which can fire for the fields of a document, so a document with only a few fields runs only the
+    rules which read them.
+    '''
 
-        return True
+    def __init__(self, rules):
+        '''
+        :param list of CrossFieldRule rules: in the order they are to be run
+        '''
+        self.rules = tuple(rules)
+        self._always_run = frozenset(position for position, rule in enumerate(self.rules) if rule.fields is None)
+        self._positions_by_field = {}
+        for position, rule in enumerate(self.rules):
+            for field in rule.fields or ():
+                self._positions_by_field.setdefault(field, set()).add(position)
 
-    @property
-    def errors(self):
-        return self._errors
+    def get_rules(self, fields, rank=None):
+        '''
+        :param iterable fields: the submitted fields
+        :param int rank: if not None, only the rules of this rank are returned
+        :return: list of CrossFieldRule - the rules which read any of fields, in the order they were given
+        '''
+        positions = set(self._always_run)
+        positions_by_field = self._positions_by_field
+        for field in fields:
+            field_positions = positions_by_field.get(field)
+            if field_positions:
+                positions.update(field_positions)
+        rules = self.rules
+        return [rules[position] for position in sorted(positions) if rank is None or rules[position].rank == rank]
 
-    def _any_fields_in_document(self, keys):
+
+class BaseCrossFieldValidator:
+    '''
+    Extends validate to add an argument for the existing_document. Typically for an add this will be empty.
+    Subclasses either list their rules in RULES or implement _validate_rules. get_errors keeps all of its state in the
+    ValidationContext it is given, so it can be called concurrently and the context can be shared with the other
+    validators handling the request. validate is kept for callers that read the errors property afterwards.
+    '''
+
+    # CrossFieldRule for each rule of the validator
+    RULES = ()
+
+    def __init__(self):
+        self._errors = {}
+        self.rule_index = CrossFieldRuleIndex(self.get_rules())
+
+    def get_rules(self):
         '''
+        Subclasses override this when the fields a rule reads depend on the reference files
+        :return: list of CrossFieldRule
+        '''
+        return self.RULES
 
-        :param list of str keys:
+    def validate(self, document, existing_document):
+        '''
+        After validate is called the errors property will reflect the errors generated by the last call to validate
+        :param dict document:
+        :param dict existing_document:
         :return: boolean
         '''
-        document_keys = self.document.keys()
-        return any(key in self.document for key in keys)
-
+        self._errors = self.get_errors(ValidationContext(document, existing_document))
+        return self._errors == {}
 
+    def get_errors(self, context, fail_fast=False, rank=None):
+        '''
+        :param ValidationContext context:
+        :param boolean fail_fast: if True, the RULES are run by rank and stop at the first rule which finds an error.
+            Validators which implement _validate_rules run all of their rules.
+        :param int rank: if not None and fail_fast is True, only the RULES of this rank are run. See check_rank.
+        :return: dict - error messages keyed by field. The dictionary will be empty if the document is valid.
+        '''
+        errors = {}
+        if fail_fast and self.rule_index.rules:
+            for rule_rank in RANKS if rank is None else (rank,):
+                for rule in self.rule_index.get_rules(context.submitted_fields, rank=rule_rank):
+                    getattr(self, rule.method_name)(context, errors, *rule.args)
+                    if errors:
+                        return errors
+        else:
+            self._validate_rules(context, errors)
+        return errors
 
+    def _validate_rules(self, context, errors):
+        '''
+        Add any errors found in context to errors. Runs the RULES which read any of the submitted fields.
+        :param ValidationContext context:
+        :param dict errors:
+        '''
+        for rule in self.rule_index.get_rules(context.submitted_fields):
+            # Looked up on each call so that rules wrapped on the instance, for example by metrics, are used
+            getattr(self, rule.method_name)(context, errors, *rule.args)
 
+    @property
+    def errors(self):
+        return self._errors
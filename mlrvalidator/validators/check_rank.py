@@ -0,0 +1,16 @@
+'''
+Ranks which order the checks when validation fails fast. A check's rank is the most expensive kind of work it does,
+so the order follows from what the check does rather than from timings, which change with the reference data and the
+machine. The checks of a lower rank are run before those of a higher rank.
+'''
+
+# Compares or tests the submitted values, for example for presence, emptiness or length
+VALUE_RANK = 0
+# Looks a value up in a reference set or reference file
+LOOKUP_RANK = 1
+# Parses a number, date or DMS value, or matches a regex
+PARSE_RANK = 2
+# Looks up a reference range and parses the value to compare with it
+LOOKUP_AND_PARSE_RANK = 3
+
+RANKS = (VALUE_RANK, LOOKUP_RANK, PARSE_RANK, LOOKUP_AND_PARSE_RANK)
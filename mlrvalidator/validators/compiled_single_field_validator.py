@@ -0,0 +1,345 @@
+from collections.abc import Mapping
+from itertools import chain
+import re
+
+from .check_rank import RANKS, VALUE_RANK, LOOKUP_RANK, PARSE_RANK
+from .single_field_validator import SingleFieldValidator, SingleFieldValidatorPool, load_reference_lists, is_numeric, \
+    is_positive_numeric, check_valid_precision, check_is_empty, check_valid_site_number, check_valid_map_scale_chars, \
+    check_valid_latitude_dms, check_valid_longitude_dms, check_valid_date, check_valid_reference, \
+    check_valid_single_quotes
+
+# Values for the single_field_engine argument of ErrorValidator, WarningValidator and LocationValidator
+CERBERUS_ENGINE = 'cerberus'
+COMPILED_ENGINE = 'compiled'
+GENERATED_ENGINE = 'generated'
+
+# Cerberus' messages for the standard rules. See cerberus.errors.BasicErrorHandler
+REQUIRED_FIELD = 'required field'
+UNKNOWN_FIELD = 'unknown field'
+NOT_NULLABLE = 'null value not allowed'
+BAD_TYPE = 'must be of {0} type'
+MAX_LENGTH = 'max length is {0}'
+REGEX_MISMATCH = "value does not match regex '{0}'"
+UNALLOWED_VALUE = 'unallowed value {0}'
+
+TYPE_CHECKS = {
+    'string': lambda value: isinstance(value, str),
+    'numeric': is_numeric,
+    'positive_numeric': is_positive_numeric
+}
+
+# Custom rules which are checked when the rule's constraint is True
+CUSTOM_CHECKS = {
+    'valid_precision': check_valid_precision,
+    'valid_site_number': check_valid_site_number,
+    'valid_map_scale_chars': check_valid_map_scale_chars,
+    'valid_latitude_dms': check_valid_latitude_dms,
+    'valid_longitude_dms': check_valid_longitude_dms,
+    'valid_date': check_valid_date,
+    'valid_single_quotes': check_valid_single_quotes
+}
+
+# The check_rank rank of each rule. The required, unknown field and null checks have VALUE_RANK. A field's type check
+# decides whether its other rules are checked, so all the rules of a field with a type are checked at the type's rank.
+RULE_RANKS = {
+    'type': PARSE_RANK,
+    'maxlength': VALUE_RANK,
+    'regex': PARSE_RANK,
+    'allowed': VALUE_RANK,
+    'is_empty': VALUE_RANK,
+    'valid_reference': LOOKUP_RANK,
+    'valid_precision': PARSE_RANK,
+    'valid_site_number': VALUE_RANK,
+    'valid_map_scale_chars': PARSE_RANK,
+    'valid_latitude_dms': PARSE_RANK,
+    'valid_longitude_dms': PARSE_RANK,
+    'valid_date': PARSE_RANK,
+    'valid_single_quotes': VALUE_RANK
+}
+
+# When failing fast, documents which are validated by Cerberus are validated with the checks of this rank, the
+# highest rank of the single field rules, so that Cerberus is only called once.
+FALLBACK_RANK = max(RULE_RANKS.values())
+
+
+class UnsupportedRule(Exception):
+    pass
+
+
+def _maxlength_check(max_length):
+    message = MAX_LENGTH.format(max_length)
+
+    def check(value):
+        return [message] if len(value) > max_length else []
+    return check
+
+
+def _regex_check(pattern):
+    re_obj = re.compile(pattern if pattern.endswith('$') else pattern + '$')
+    message = REGEX_MISMATCH.format(pattern)
+
+    def check(value):
+        return [] if re_obj.match(value) else [message]
+    return check
+
+
+def _allowed_check(allowed_values):
+    def check(value):
+        return [] if value in allowed_values else [UNALLOWED_VALUE.format(value)]
+    return check
+
+
+def _reference_check(ref_list):
+    def check(value):
+        return check_valid_reference(value, ref_list)
+    return check
+
+
+class FieldPlan:
+    '''
+    The checks for one field in the schema. custom_checks produce Cerberus custom errors and standard_checks produce
+    errors for Cerberus' own rules. Cerberus sorts a field's errors so that custom errors come first, in the order the
+    rules ran, followed by the standard rule errors ordered by rule name. The plan keeps the checks in that order.
+    '''
+
+    def __init__(self, field, definitions, reference_lists):
+        '''
+        :param str field:
+        :param dict definitions: the schema rules for the field
+        :param ReferenceLists reference_lists: allowed values of the fields with the valid_reference rule
+        :raises UnsupportedRule: if definitions contains a rule that can not be compiled
+        '''
+        self.nullable = definitions.get('nullable', False)
+        self.type_check = None
+        self.type_message = None
+        self.custom_checks = []
+        standard_checks = []
+        # The rank of each custom check
+        custom_ranks = []
+
+        for rule, constraint in definitions.items():
+            if rule in ('required', 'nullable'):
+                continue
+            elif rule == 'type':
+                if constraint not in TYPE_CHECKS:
+                    raise UnsupportedRule('type {0}'.format(constraint))
+                self.type_check = TYPE_CHECKS[constraint]
+                self.type_message = BAD_TYPE.format(constraint)
+            elif rule == 'maxlength':
+                standard_checks.append((rule, _maxlength_check(constraint)))
+            elif rule == 'regex':
+                standard_checks.append((rule, _regex_check(constraint)))
+            elif rule == 'allowed':
+                standard_checks.append((rule, _allowed_check(constraint)))
+            elif rule == 'is_empty':
+                if not constraint:
+                    self.custom_checks.append(check_is_empty)
+                    custom_ranks.append(RULE_RANKS[rule])
+            elif rule == 'valid_reference':
+                if constraint and reference_lists is not None:
+                    self.custom_checks.append(_reference_check(reference_lists.get_reference_set(field)))
+                    custom_ranks.append(RULE_RANKS[rule])
+            elif rule in CUSTOM_CHECKS:
+                if constraint:
+                    self.custom_checks.append(CUSTOM_CHECKS[rule])
+                    custom_ranks.append(RULE_RANKS[rule])
+            else:
+                raise UnsupportedRule(rule)
+
+        standard_checks.sort(key=lambda rule_check: rule_check[0])
+        self.standard_checks = [check for rule, check in standard_checks]
+
+        # The checks of each rank, in the same order as get_errors runs them
+        self.rank_checks = {}
+        if self.type_check is None:
+            for rank, check in chain(zip(custom_ranks, self.custom_checks),
+                                     ((RULE_RANKS[rule], check) for rule, check in standard_checks)):
+                self.rank_checks.setdefault(rank, []).append(check)
+
+    def get_errors(self, value):
+        '''
+        :param str or None value:
+        :return: list of str - error messages for value
+        '''
+        if value is None:
+            return [] if self.nullable else [NOT_NULLABLE]
+        if self.type_check is not None and not self.type_check(value):
+            return [self.type_message]
+
+        messages = []
+        for check in self.custom_checks:
+            messages.extend(check(value))
+        for check in self.standard_checks:
+            messages.extend(check(value))
+        return messages
+
+    def get_rank_errors(self, value, rank):
+        '''
+        :param str or None value:
+        :param int rank:
+        :return: list of str - error messages for value from the checks of rank. These are some or all of the
+            messages returned by get_errors.
+        '''
+        if value is None:
+            return [] if self.nullable or rank != VALUE_RANK else [NOT_NULLABLE]
+        if self.type_check is not None:
+            return self.get_errors(value) if rank == RULE_RANKS['type'] else []
+
+        messages = []
+        for check in self.rank_checks.get(rank, ()):
+            messages.extend(check(value))
+        return messages
+
+
+class CompiledSingleFieldValidator:
+    '''
+    Validates documents against a single field schema without going through Cerberus. The schema is compiled once
+    into a FieldPlan for each field, so a call only runs the checks for the fields in the document. The errors are the
+    same as those returned by SingleFieldValidator, including their order.
+
+    Documents that the plan does not handle, those that are not dicts or that have values which are not strings or
+    None, are passed to a pool of SingleFieldValidators, as is every document if the schema uses a rule that
+    can not be compiled. The validator holds no per call state so a single instance can be shared by concurrent
+    requests.
+    '''
+
+    def __init__(self, schema, reference_dir='', allow_unknown=False):
+        '''
+        :param dict schema: Cerberus schema using the rules supported by SingleFieldValidator
+        :param str reference_dir: directory containing reference_lists.json
+        :param boolean allow_unknown: if False, fields which are not in schema are errors
+        '''
+        self.allow_unknown = allow_unknown
+        reference_lists = load_reference_lists(reference_dir)
+        self.fallback = SingleFieldValidatorPool(
+            lambda: SingleFieldValidator(schema, reference_list=reference_lists, allow_unknown=allow_unknown))
+
+        self.required_fields = sorted(field for field, definitions in schema.items()
+                                      if definitions.get('required') is True)
+        try:
+            self.plan = dict((field, FieldPlan(field, definitions, reference_lists))
+                             for field, definitions in schema.items())
+        except UnsupportedRule:
+            self.plan = None
+
+    def _is_compilable(self, document):
+        if self.plan is None or not isinstance(document, Mapping):
+            return False
+        plan = self.plan
+        return all(isinstance(value, str) or value is None
+                   for field, value in document.items() if field in plan)
+
+    def get_errors(self, document, update=False, fail_fast=False, rank=None):
+        '''
+        :param dict document:
+        :param boolean update: if True, required fields are not checked
+        :param boolean fail_fast: if True, the checks are run by rank and only the errors of the first field found in
+            error are returned. The required fields are checked before the fields in the document.
+        :param int rank: if not None and fail_fast is True, only the checks of this rank are run. See check_rank.
+        :return: dict - error messages keyed by field. The dictionary will be empty if the document is valid.
+        '''
+        if not self._is_compilable(document):
+            if fail_fast and rank is not None and rank != FALLBACK_RANK:
+                return {}
+            return self.fallback.get_errors(document, update=update, fail_fast=fail_fast)
+        if fail_fast:
+            for rank_to_check in RANKS if rank is None else (rank,):
+                errors = self._get_first_errors(document, update, rank_to_check)
+                if errors:
+                    return errors
+            return {}
+
+        plan = self.plan
+        errors = {}
+        for field, value in document.items():
+            field_plan = plan.get(field)
+            if field_plan is not None:
+                messages = field_plan.get_errors(value)
+                if messages:
+                    errors[field] = messages
+            elif not self.allow_unknown:
+                errors[field] = [UNKNOWN_FIELD]
+
+        if not update:
+            for field in self.required_fields:
+                if field not in document:
+                    errors[field] = [REQUIRED_FIELD]
+
+        return dict((field, errors[field]) for field in sorted(errors))
+
+    def _get_first_errors(self, document, update, rank):
+        if rank == VALUE_RANK and not update:
+            for field in self.required_fields:
+                if field not in document:
+                    return {field: [REQUIRED_FIELD]}
+
+        plan = self.plan
+        for field, value in document.items():
+            field_plan = plan.get(field)
+            if field_plan is not None:
+                messages = field_plan.get_rank_errors(value, rank)
+                if messages:
+                    return {field: messages}
+            elif rank == VALUE_RANK and not self.allow_unknown:
+                return {field: [UNKNOWN_FIELD]}
+        return {}
+
+
+class CombinedSingleFieldValidator:
+    '''
+    Validates a document against the schemas of several CompiledSingleFieldValidators, such as the error and warning
+    schemas, in one pass over the document. The errors for each schema are the same as those returned by its own
+    validator. Documents that any of the plans can not handle are validated by each validator in turn.
+    '''
+
+    def __init__(self, validators):
+        '''
+        :param list of CompiledSingleFieldValidator validators:
+        '''
+        self.validators = tuple(validators)
+        if any(validator.plan is None for validator in self.validators):
+            self.plan = None
+        else:
+            fields = set()
+            for validator in self.validators:
+                fields.update(validator.plan)
+            self.plan = dict((field, tuple(validator.plan.get(field) for validator in self.validators))
+                             for field in fields)
+
+    def _is_compilable(self, document):
+        if self.plan is None or not isinstance(document, Mapping):
+            return False
+        plan = self.plan
+        return all(isinstance(value, str) or value is None
+                   for field, value in document.items() if field in plan)
+
+    def get_errors(self, document, update=False):
+        '''
+        :param dict document:
+        :param boolean update: if True, required fields are not checked
+        :return: list of dict - the error messages keyed by field for each of the validators, in the same order
+        '''
+        if not self._is_compilable(document):
+            return [validator.get_errors(document, update=update) for validator in self.validators]
+
+        plan = self.plan
+        all_errors = [{} for validator in self.validators]
+        for field, value in document.items():
+            field_plans = plan.get(field)
+            for index, validator in enumerate(self.validators):
+                field_plan = None if field_plans is None else field_plans[index]
+                if field_plan is not None:
+                    messages = field_plan.get_errors(value)
+                    if messages:
+                        all_errors[index][field] = messages
+                elif not validator.allow_unknown:
+                    all_errors[index][field] = [UNKNOWN_FIELD]
+
+        results = []
+        for validator, errors in zip(self.validators, all_errors):
+            if not update:
+                for field in validator.required_fields:
+                    if field not in document:
+                        errors[field] = [REQUIRED_FIELD]
+            results.append(dict((field, errors[field]) for field in sorted(errors)))
+        return results
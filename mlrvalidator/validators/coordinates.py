@@ -0,0 +1,131 @@
+'''
+Parses the degree, minute and second (DMS) latitudes and longitudes into signed integer hundredths of a second, so
+that they are checked and compared as numbers. Document values have a sign column, '-' or a space, followed by the
+degrees, two digits of minutes, two of seconds and optional decimal seconds, for example ' 0863015.25'. The bounds in
+the reference files have an optional '-' followed by the degrees, minutes and seconds, for example '-0745800'.
+'''
+from functools import lru_cache
+import re
+
+HUNDREDTHS_PER_SECOND = 100
+HUNDREDTHS_PER_MINUTE = 60 * HUNDREDTHS_PER_SECOND
+HUNDREDTHS_PER_DEGREE = 60 * HUNDREDTHS_PER_MINUTE
+
+LATITUDE_DEGREE_DIGITS = 2
+LONGITUDE_DEGREE_DIGITS = 3
+
+_NOT_DIGITS = re.compile('[^0-9]+')
+
+
+def _to_hundredths(negative, degrees, minutes, seconds, hundredths):
+    value = degrees * HUNDREDTHS_PER_DEGREE + minutes * HUNDREDTHS_PER_MINUTE + seconds * HUNDREDTHS_PER_SECOND + \
+        hundredths
+    return -value if negative else value
+
+
+def parse_dms(value, degree_digits, max_degrees):
+    '''
+    :param str value: a document DMS value
+    :param int degree_digits:
+    :param int max_degrees:
+    :return: int - value in hundredths of a second or None if value is blank or is not a valid DMS value. Digits
+        after the hundredths of a second are ignored.
+    '''
+    rstripped_value = value.rstrip()
+    if not rstripped_value or rstripped_value[0] not in '- ':
+        return None
+
+    minutes_index = 1 + degree_digits
+    seconds_index = minutes_index + 2
+    decimal_index = seconds_index + 2
+    try:
+        degrees = int(rstripped_value[1:minutes_index])
+        minutes = int(rstripped_value[minutes_index:seconds_index])
+        seconds = int(rstripped_value[seconds_index:decimal_index])
+    except ValueError:
+        return None
+    if not (0 <= degrees <= max_degrees and 0 <= minutes < 60 and 0 <= seconds < 60):
+        return None
+
+    hundredths = 0
+    if len(rstripped_value) > decimal_index:
+        if rstripped_value[decimal_index] != '.':
+            return None
+        decimal_seconds = rstripped_value.split('.')[1]
+        if not decimal_seconds or _NOT_DIGITS.search(decimal_seconds):
+            return None
+        hundredths = int(decimal_seconds[:2].ljust(2, '0'))
+
+    return _to_hundredths(rstripped_value[0] == '-', degrees, minutes, seconds, hundredths)
+
+
+@lru_cache(maxsize=4096)
+def parse_latitude(value):
+    '''
+    :param str value:
+    :return: int - see parse_dms
+    '''
+    return parse_dms(value, LATITUDE_DEGREE_DIGITS, 90)
+
+
+@lru_cache(maxsize=4096)
+def parse_longitude(value):
+    '''
+    :param str value:
+    :return: int - see parse_dms
+    '''
+    return parse_dms(value, LONGITUDE_DEGREE_DIGITS, 180)
+
+
+def parse_reference_dms(value, degree_digits):
+    '''
+    :param str value: a DMS bound from a reference file
+    :param int degree_digits:
+    :return: int - value in hundredths of a second or None if value is not in the reference format
+    '''
+    if not isinstance(value, str):
+        return None
+    digits = value.strip()
+    negative = digits.startswith('-')
+    if negative:
+        digits = digits[1:]
+    if len(digits) != degree_digits + 4 or not digits.isdigit():
+        return None
+    return _to_hundredths(negative, int(digits[:degree_digits]), int(digits[degree_digits:degree_digits + 2]),
+                          int(digits[degree_digits + 2:]), 0)
+
+
+def parse_range(attributes, min_key, max_key, degree_digits):
+    '''
+    :param dict attributes: state or county reference attributes
+    :param str min_key:
+    :param str max_key:
+    :param int degree_digits:
+    :return: tuple of int - the bounds in hundredths of a second or None if either is missing or not valid. Some
+        reference entries have their bounds swapped, for example the southern latitudes of AY and CI, which list the
+        bound nearest the equator first, so the lower bound is returned first. The exception is a longitude range
+        from a western, positive, bound to an eastern, negative, one, such as Alaska's. It crosses the 180th
+        meridian, so its bounds are kept in order and the lower bound is returned second.
+    '''
+    minimum = parse_reference_dms(attributes.get(min_key), degree_digits)
+    maximum = parse_reference_dms(attributes.get(max_key), degree_digits)
+    if minimum is None or maximum is None:
+        return None
+    if minimum > maximum and not (degree_digits == LONGITUDE_DEGREE_DIGITS and minimum > 0 > maximum):
+        return maximum, minimum
+    return minimum, maximum
+
+
+def in_range(value, value_range):
+    '''
+    :param int value: see parse_dms. None, for a value which is not a valid DMS value, is never in range.
+    :param tuple value_range: see parse_range
+    :return: boolean - True if value is at least the minimum and less than the maximum. For a range which crosses
+        the 180th meridian, True if value is at least the western bound or less than the eastern one.
+    '''
+    if value is None:
+        return False
+    minimum, maximum = value_range
+    if minimum > maximum:
+        return value >= minimum or value < maximum
+    return minimum <= value < maximum
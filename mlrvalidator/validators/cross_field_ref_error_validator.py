@@ -3,114 +3,141 @@ from collections import defaultdict
 import os
 import re
 
-from .base_cross_field_validator import BaseCrossFieldValidator
-from .country_state_reference_validator import CountryStateReferenceValidator
-from .reference import States, NationalWaterUseCodes, SiteTypesCrossField, Counties, LandNetCrossField, SiteNumberFormat
+from .base_cross_field_validator import BaseCrossFieldValidator, CrossFieldRule
+from .check_rank import LOOKUP_RANK, LOOKUP_AND_PARSE_RANK
+from .coordinates import in_range
+from .reference import GeographyIndex, NationalWaterUseCodes, SiteTypesCrossField, LandNetCrossField, SiteNumberFormat, \
+    reference_registry
 
 
 class CrossFieldRefErrorValidator(BaseCrossFieldValidator):
 
+    # The errors for the codes which are only checked against the country and state are added last. The range rules
+    # also parse the DMS value, the other rules only look the values up in the reference files.
+    RULES = (
+        CrossFieldRule('_validate_counties', ['countryCode', 'stateFipsCode', 'countyCode'], rank=LOOKUP_RANK),
+        CrossFieldRule('_validate_mcd', ['countryCode', 'stateFipsCode', 'countyCode', 'minorCivilDivisionCode'],
+                       rank=LOOKUP_RANK),
+        CrossFieldRule('_validate_states', ['countryCode', 'stateFipsCode'], rank=LOOKUP_RANK),
+        CrossFieldRule('_validate_national_water_use_code', ['siteTypeCode', 'nationalWaterUseCode'],
+                       rank=LOOKUP_RANK),
+        # The fields are those of the site type reference file. See get_rules
+        CrossFieldRule('_validate_site_type', None, rank=LOOKUP_RANK),
+        #CrossFieldRule('_validate_land_net', ['districtCode', 'landNet']),
+        CrossFieldRule('_validate_state_latitude_range', ['latitude', 'countryCode', 'stateFipsCode'],
+                       rank=LOOKUP_AND_PARSE_RANK),
+        CrossFieldRule('_validate_state_longitude_range', ['longitude', 'countryCode', 'stateFipsCode'],
+                       rank=LOOKUP_AND_PARSE_RANK),
+        CrossFieldRule('_validate_site_number_format', ['siteNumber', 'siteTypeCode'], rank=LOOKUP_RANK),
+        CrossFieldRule('_validate_country_state_codes', ['countryCode', 'stateFipsCode', 'aquiferCode'],
+                       'aquiferCode', 'aquifer_codes', rank=LOOKUP_RANK),
+        CrossFieldRule('_validate_hydrologic_unit_code', ['countryCode', 'stateFipsCode', 'hydrologicUnitCode'],
+                       rank=LOOKUP_RANK),
+        CrossFieldRule('_validate_country_state_codes', ['countryCode', 'stateFipsCode', 'nationalAquiferCode'],
+                       'nationalAquiferCode', 'national_aquifer_codes', rank=LOOKUP_RANK)
+    )
+
     def __init__(self, reference_dir):
+        self.geography_ref = reference_registry.get(GeographyIndex, reference_dir)
+        self.national_water_use_ref = reference_registry.get(NationalWaterUseCodes, os.path.join(reference_dir, 'national_water_use.json'))
+        self.land_net_ref = reference_registry.get(LandNetCrossField, os.path.join(reference_dir, 'land_net.json'))
+        self.site_number_format_ref = reference_registry.get(SiteNumberFormat, os.path.join(reference_dir,'site_number_format.json'))
+        self.site_type_ref = reference_registry.get(SiteTypesCrossField, os.path.join(reference_dir, 'site_type_cross_field.json'))
         super().__init__()
-        self.aquifer_ref_validator = CountryStateReferenceValidator(os.path.join(reference_dir, 'aquifer.json'), 'aquiferCodes', 'aquiferCode')
-        self.huc_ref_validator = CountryStateReferenceValidator(os.path.join(reference_dir, 'huc.json'), 'hydrologicUnitCodes', 'hydrologicUnitCode')
-        self.national_aquifer_ref_validator = CountryStateReferenceValidator(os.path.join(reference_dir, 'national_aquifer.json'), 'nationalAquiferCodes', 'nationalAquiferCode')
-
-        self.counties_ref = Counties(os.path.join(reference_dir, 'county.json'))
-        self.mcd_ref = Counties(os.path.join(reference_dir, 'mcd.json'))
-        self.states_ref = States(os.path.join(reference_dir, 'state.json'))
-        self.national_water_use_ref = NationalWaterUseCodes(os.path.join(reference_dir, 'national_water_use.json'))
-        self.land_net_ref = LandNetCrossField(os.path.join(reference_dir, 'land_net.json'))
-        self.site_number_format_ref = SiteNumberFormat(os.path.join(reference_dir,'site_number_format.json'))
-        self.site_type_ref = SiteTypesCrossField(os.path.join(reference_dir, 'site_type_cross_field.json'))
-
-    def _validate_counties(self):
+
+    def get_rules(self):
+        '''
+        The site type rule reads siteTypeCode and the attributes listed for the site types in the reference file
+        :return: list of CrossFieldRule
+        '''
+        return [CrossFieldRule(rule.method_name, ['siteTypeCode'] + sorted(self.site_type_ref.get_attribute_fields()),
+                               rank=rule.rank)
+                if rule.method_name == '_validate_site_type' else rule
+                for rule in self.RULES]
+
+    def _validate_counties(self, context, errors):
         keys = ['countryCode', 'stateFipsCode', 'countyCode']
-        if self._any_fields_in_document(keys):
-            country, state, county = [self.merged_document.get(key, '').strip() for key in keys]
+        country, state, county = context.get_values(keys)
 
-            if country and state and county:
-                county_list = self.counties_ref.get_county_codes(country, state)
-                if county_list and county not in county_list:
-                    self._errors['countyCode'] = ['County {0} is not in the reference list for country {1} and state {2}'.format(county, country, state)]
+        if country and state and county:
+            county_list = context.lookup(self.geography_ref.get_state, country, state).county_codes
+            if county_list and county not in county_list:
+                errors['countyCode'] = ['County {0} is not in the reference list for country {1} and state {2}'.format(county, country, state)]
 
-    def _validate_mcd(self):
+    def _validate_mcd(self, context, errors):
         keys = ['countryCode', 'stateFipsCode', 'countyCode', 'minorCivilDivisionCode']
-        if self._any_fields_in_document(keys):
-            if self.merged_document.get('minorCivilDivisionCode') is not None:
-                country, state, county, mcd = [self.merged_document.get(key, '').strip() for key in keys]
+        if context.merged_document.get('minorCivilDivisionCode') is not None:
+            country, state, county, mcd = context.get_values(keys)
 
-                if country and state and county and mcd:
-                    allowed_mcds = self.mcd_ref.get_county_attributes(country, state, county).get('minorCivilDivisionCodes', [])
+            if country and state and county and mcd:
+                allowed_mcds = context.lookup(self.geography_ref.get_county, country, state, county).minor_civil_division_codes
 
-                    if mcd not in allowed_mcds:
-                        self._errors['minorCivilDivisionCode'] = \
-                            ['MCD {0} is not in the list for country {1}, state {2} and county {3}'.format(mcd, country, state, county)]
+                if mcd not in allowed_mcds:
+                    errors['minorCivilDivisionCode'] = \
+                        ['MCD {0} is not in the list for country {1}, state {2} and county {3}'.format(mcd, country, state, county)]
 
 
-    def _validate_states(self):
+    def _validate_states(self, context, errors):
         '''
         :return: boolean
         '''
         keys = ['countryCode', 'stateFipsCode']
-        if self._any_fields_in_document(keys):
-            country, state = [self.merged_document.get(key, '').strip() for key in keys]
+        country, state = context.get_values(keys)
 
-            if country and state:
-                state_list = self.states_ref.get_state_codes(country)
-                if state_list and state not in state_list:
-                    self._errors['stateFipsCode'] = ['{0} is not in the reference list for country {1}.'.format(state, country)]
+        if country and state:
+            state_list = context.lookup(self.geography_ref.get_state_code_set, country)
+            if state_list and state not in state_list:
+                errors['stateFipsCode'] = ['{0} is not in the reference list for country {1}.'.format(state, country)]
 
 
-    def _validate_national_water_use_code(self):
+    def _validate_national_water_use_code(self, context, errors):
         '''
         :return: boolean
         '''
         keys = ['siteTypeCode', 'nationalWaterUseCode']
-        if self._any_fields_in_document(keys):
-            site_type, water_use = [self.merged_document.get(key, '').strip() for key in keys]
+        site_type, water_use = context.get_values(keys)
 
-            if site_type and water_use:
-                if water_use not in self.national_water_use_ref.get_national_water_use_codes(site_type):
-                    self._errors['nationalWaterUseCode'] = ['{0} is not in the references list for siteTypeCode {1}'.format(water_use, site_type)]
+        if site_type and water_use:
+            if water_use not in self.national_water_use_ref.get_national_water_use_codes(site_type):
+                errors['nationalWaterUseCode'] = ['{0} is not in the references list for siteTypeCode {1}'.format(water_use, site_type)]
 
-    def _validate_site_type(self):
-        site_type = self.merged_document.get('siteTypeCode', '').strip()
+    def _validate_site_type(self, context, errors):
+        site_type = context.get_value('siteTypeCode')
 
         if site_type:
             site_type_attr = self.site_type_ref.get_site_type_field_dependencies(site_type)
-            if 'siteTypeCode' in self.document:
+            if 'siteTypeCode' in context.document:
                 # Should check all fields in site_type_attr
                 not_null_attrs = site_type_attr.get('notNullAttrs', [])
                 null_attrs = site_type_attr.get('nullAttrs', [])
             else:
                 # Only check fields that are in the document
                 not_null_attrs = [not_null_attr for not_null_attr in site_type_attr.get('notNullAttrs', [])
-                                  if not_null_attr in self.document]
+                                  if not_null_attr in context.document]
                 null_attrs = [null_attr for null_attr in site_type_attr.get('nullAttrs', [])
-                              if null_attr in self.document]
+                              if null_attr in context.document]
 
             # Should check all fields in site_type_attr
             not_null_errors = []
             null_errors = []
             for not_null_attr in not_null_attrs:
-                if not self.merged_document.get(not_null_attr, '').strip():
+                if not context.get_value(not_null_attr):
                     not_null_errors.append(not_null_attr)
 
             for null_attr in null_attrs:
-                if self.merged_document.get(null_attr, '').strip():
+                if context.get_value(null_attr):
                     null_errors.append(null_attr)
 
             if not_null_errors or null_errors:
-                self._errors['siteTypeCode'] = []
+                errors['siteTypeCode'] = []
                 if not_null_errors:
-                    self._errors['siteTypeCode'].append(
+                    errors['siteTypeCode'].append(
                         'Site type {0} must not have the following attributes null: {1}'.format(site_type, ', '.join(not_null_errors)))
                 if null_errors:
-                    self._errors['siteTypeCode'].append(
+                    errors['siteTypeCode'].append(
                         'Site type {0} must have the following attributes null: {1}'.format(site_type, ', '.join(null_errors)))
 
-    def _validate_land_net(self):
+    def _validate_land_net(self, context, errors):
         # Check that the land net description field follows the correct template
         """
         The rule's arguments are validated against this schema:
@@ -118,104 +145,85 @@ class CrossFieldRefErrorValidator(BaseCrossFieldValidator):
         """
         error_message = "Invalid format - Land Net does not fit template"
         keys = ['districtCode', 'landNet']
-        if self._any_fields_in_document(keys):
-             district_code, land_net = [self.merged_document.get(key, '') for key in keys]
-
-             if district_code and land_net:
-                 land_net_template = self.land_net_ref.get_land_net_templates(district_code)
-                 if land_net_template:
-                     value_end = len(land_net) - 1
-                     section = land_net_template.index("S")
-                     township = land_net_template.index("T")
-                     lrange = land_net_template.index("R")
-                     try:
-                         if land_net[section] == "S" and land_net[township] == "T" and land_net[lrange] == "R":
-                             test_match = re.search('[^a-zA-Z0-9 ]', land_net[section:value_end])
-                             if test_match is not None:
-                                 self._errors['landNet'] = [error_message]
-                         else:
-                             self._errors['landNet'] = [error_message]
-                     except IndexError:
-                         self._errors['landNet'] = [error_message]
-
-    def _validate_state_latitude_range(self):
-        keys = ['latitude', 'countryCode', 'stateFipsCode']
-        if self._any_fields_in_document(keys):
-            lat, country, state = [self.merged_document.get(key, '').strip() for key in keys]
-
-            if lat and country and state:
-                # Do a check for lat range using the country and state codes
-                state_attr = self.states_ref.get_state_attributes(country, state)
-                if state_attr and 'state_min_lat_va' in state_attr and 'state_max_lat_va' in state_attr:
-                    if not (state_attr['state_min_lat_va'] <= lat < state_attr['state_max_lat_va']):
-                        self._errors['latitude'] = ['Latitude is out of range for state {0}'.format(state)]
-
-    def _validate_state_longitude_range(self):
-        keys = ['longitude', 'countryCode', 'stateFipsCode']
-        if self._any_fields_in_document(keys):
-            lat, country, state = [self.merged_document.get(key, '').strip() for key in keys]
-
-            if lat and country and state:
-                # Do a check for lat range using the country and state codes
-                state_attr = self.states_ref.get_state_attributes(country, state)
-                if state_attr and 'state_min_long_va' in state_attr and 'state_max_long_va' in state_attr:
-                    if not (state_attr['state_min_long_va'] <= lat < state_attr['state_max_long_va']):
-                        self._errors['longitude'] = ['Longitude is out of range for state {0}'.format(state)]
-
-    def _validate_site_number_format(self):
+        district_code, land_net = [context.merged_document.get(key, '') for key in keys]
+
+        if district_code and land_net:
+            land_net_template = self.land_net_ref.get_land_net_templates(district_code)
+            if land_net_template:
+                value_end = len(land_net) - 1
+                section = land_net_template.index("S")
+                township = land_net_template.index("T")
+                lrange = land_net_template.index("R")
+                try:
+                    if land_net[section] == "S" and land_net[township] == "T" and land_net[lrange] == "R":
+                        test_match = re.search('[^a-zA-Z0-9 ]', land_net[section:value_end])
+                        if test_match is not None:
+                            errors['landNet'] = [error_message]
+                    else:
+                        errors['landNet'] = [error_message]
+                except IndexError:
+                    errors['landNet'] = [error_message]
+
+    def _validate_state_latitude_range(self, context, errors):
+        country, state = context.get_values(['countryCode', 'stateFipsCode'])
+
+        if context.get_value('latitude') and country and state:
+            # Compare in hundredths of a second against the range parsed when the reference file was loaded. A value
+            # which is not a valid DMS value, such as an invalid value kept from the existing location, is out of range
+            latitude_range = context.lookup(self.geography_ref.get_state, country, state).latitude_range
+            if latitude_range is not None and not in_range(context.get_dms('latitude'), latitude_range):
+                errors['latitude'] = ['Latitude is out of range for state {0}'.format(state)]
+
+    def _validate_state_longitude_range(self, context, errors):
+        country, state = context.get_values(['countryCode', 'stateFipsCode'])
+
+        if context.get_value('longitude') and country and state:
+            # Compare in hundredths of a second against the range parsed when the reference file was loaded. A value
+            # which is not a valid DMS value, such as an invalid value kept from the existing location, is out of range
+            longitude_range = context.lookup(self.geography_ref.get_state, country, state).longitude_range
+            if longitude_range is not None and not in_range(context.get_dms('longitude'), longitude_range):
+                errors['longitude'] = ['Longitude is out of range for state {0}'.format(state)]
+
+    def _validate_site_number_format(self, context, errors):
         '''
         :return: boolean
         '''
         keys = ['siteNumber', 'siteTypeCode']
-        if self._any_fields_in_document(keys):
-            site_number, site_type_code = [self.merged_document.get(key, '').strip() for key in keys]
+        site_number, site_type_code = context.get_values(keys)
 
-            if site_number and site_type_code:
-                error_message = [
-                    'Site Number is not the right format for site type code {0}'.format(site_type_code)]
-                site_format_code = self.site_number_format_ref.get_site_number_template(site_type_code)
-                if site_format_code == 'LL' and len(site_number) != 15:
-                    self._errors['siteNumber'] = error_message
+        if site_number and site_type_code:
+            error_message = [
+                'Site Number is not the right format for site type code {0}'.format(site_type_code)]
+            site_format_code = self.site_number_format_ref.get_site_number_template(site_type_code)
+            if site_format_code == 'LL' and len(site_number) != 15:
+                errors['siteNumber'] = error_message
 
-                if site_format_code == 'DSLL' and not 8 <= len(site_number) <= 15:
-                    self._errors['siteNumber'] = error_message
+            if site_format_code == 'DSLL' and not 8 <= len(site_number) <= 15:
+                errors['siteNumber'] = error_message
 
-                if site_format_code == 'WU' and not (10 <= len(site_number) <= 15 and site_number[0] == '9'):
-                    self._errors['siteNumber'] = error_message
+            if site_format_code == 'WU' and not (10 <= len(site_number) <= 15 and site_number[0] == '9'):
+                errors['siteNumber'] = error_message
 
-                if site_format_code == 'LLWU' and not (len(site_number) == 15 or (10 <= len(site_number) < 15 and site_number[0] == '9')):
-                    self._errors['siteNumber'] = error_message
+            if site_format_code == 'LLWU' and not (len(site_number) == 15 or (10 <= len(site_number) < 15 and site_number[0] == '9')):
+                errors['siteNumber'] = error_message
 
 
 
 
-    def validate(self, document, existing_document):
+    def _validate_country_state_codes(self, context, errors, document_key, codes_attribute):
         '''
-        :param dict document:
-        :param dict existing_document:
-        :return: boolean
+        Adds an error for document_key if its value is not in the codes_attribute set of the StateGeography
+        for the country and state.
         '''
-        super().validate(document, existing_document)
+        keys = ['countryCode', 'stateFipsCode', document_key]
+        country, state, value_to_check = context.get_values(keys)
+
+        if country and state and value_to_check:
+            state_geography = context.lookup(self.geography_ref.get_state, country, state)
+            if value_to_check not in getattr(state_geography, codes_attribute):
+                errors[document_key] = ['{0} is not in the reference list for country {1}, state {2}'.format(value_to_check, country, state)]
 
-        self.aquifer_ref_validator.validate(document, existing_document)
+    def _validate_hydrologic_unit_code(self, context, errors):
         # A huc of 99999999 is always allowed
-        if self.merged_document.get('hydrologicUnitCode', '').strip() != '99999999':
-            self.huc_ref_validator.validate(document, existing_document)
-        self.national_aquifer_ref_validator.validate(document, existing_document)
-
-        self._validate_counties()
-        self._validate_mcd()
-        self._validate_states()
-        self._validate_national_water_use_code()
-
-        self._validate_site_type()
-        #self._validate_land_net()
-        self._validate_state_latitude_range()
-        self._validate_state_longitude_range()
-        self._validate_site_number_format()
-
-        self._errors.update(self.aquifer_ref_validator.errors)
-        self._errors.update(self.huc_ref_validator.errors)
-        self._errors.update(self.national_aquifer_ref_validator.errors)
-
-        return self._errors == {}
+        if context.get_value('hydrologicUnitCode') != '99999999':
+            self._validate_country_state_codes(context, errors, 'hydrologicUnitCode', 'hydrologic_unit_codes')
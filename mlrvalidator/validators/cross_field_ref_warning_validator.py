@@ -2,79 +2,70 @@
 import os
 import re
 
-from .base_cross_field_validator import BaseCrossFieldValidator
-from .reference import States, Counties, NationalWaterUseCodes
+from .base_cross_field_validator import BaseCrossFieldValidator, CrossFieldRule
+from .coordinates import in_range
+from .reference import GeographyIndex, NationalWaterUseCodes, reference_registry
 
 class CrossFieldRefWarningValidator(BaseCrossFieldValidator):
 
+    RULES = (
+        CrossFieldRule('_validate_county_latitude_range', ['latitude', 'countryCode', 'stateFipsCode', 'countyCode']),
+        CrossFieldRule('_validate_county_longitude_range', ['longitude', 'countryCode', 'stateFipsCode', 'countyCode']),
+        CrossFieldRule('_validate_altitude_range', ['altitude', 'countryCode', 'stateFipsCode']),
+        CrossFieldRule('_validate_use_code', ['primaryUseOfSiteCode', 'secondaryUseOfSiteCode', 'tertiaryUseOfSiteCode'],
+                       'primaryUseOfSiteCode', 'secondaryUseOfSiteCode', 'tertiaryUseOfSiteCode'),
+        CrossFieldRule('_validate_use_code', ['primaryUseOfWaterCode', 'secondaryUseOfWaterCode', 'tertiaryUseOfWaterCode'],
+                       'primaryUseOfWaterCode', 'secondaryUseOfWaterCode', 'tertiaryUseOfWaterCode')
+    )
+
     def __init__(self, reference_dir):
         '''
-        :param object states_reference: should be a references.States instance
+        :param str reference_dir: directory containing the reference files
         '''
-        self.states_ref = States(os.path.join(reference_dir, 'state.json'))
-        self.counties_ref = Counties(os.path.join(reference_dir, 'county.json'))
-        self.site_types_ref = NationalWaterUseCodes(os.path.join(reference_dir, 'national_water_use.json'))
+        self.geography_ref = reference_registry.get(GeographyIndex, reference_dir)
+        self.site_types_ref = reference_registry.get(NationalWaterUseCodes, os.path.join(reference_dir, 'national_water_use.json'))
 
         super().__init__()
 
-    def _validate_county_latitude_range(self):
-        keys = ['latitude', 'countryCode', 'stateFipsCode', 'countyCode']
-        if self._any_fields_in_document(keys):
-            lat, country, state, county = [self.merged_document.get(key, '').strip() for key in keys]
-
-            if lat and country and state and county:
-                # Do a check for lat range using the country and state codes
-                county_attr = self.counties_ref.get_county_attributes(country, state, county)
-                if county_attr and 'county_min_lat_va' in county_attr and 'county_max_lat_va' in county_attr:
-                    if not (county_attr['county_min_lat_va'] <= lat < county_attr['county_max_lat_va']):
-                        self._errors['latitude'] = ['Latitude is out of range for county {0}'.format(county)]
-
-    def _validate_county_longitude_range(self):
-        keys = ['longitude', 'countryCode', 'stateFipsCode', 'countyCode']
-        if self._any_fields_in_document(keys):
-            lat, country, state, county = [self.merged_document.get(key, '').strip() for key in keys]
-
-            if lat and country and state and county:
-                # Do a check for lat range using the country and state codes
-                county_attr = self.counties_ref.get_county_attributes(country, state, county)
-                if county_attr and 'county_min_long_va' in county_attr and 'county_max_long_va' in county_attr:
-                    if not (county_attr['county_min_long_va'] <= lat < county_attr['county_max_long_va']):
-                        self._errors['longitude'] = ['Longitude is out of range for county {0}'.format(county)]
-
-    def _validate_altitude_range(self):
-        keys = ['altitude', 'countryCode', 'stateFipsCode']
-        if self._any_fields_in_document(keys):
-            altitude, country, state = [self.merged_document.get(key, '').strip() for key in keys]
-            if altitude and country and state:
-                state_attr = self.states_ref.get_state_attributes(country, state)
-                if state_attr and state_attr['state_min_alt_va'] and state_attr['state_max_alt_va']:
-                    # The below is necessary because altitude range can be specified as 00-10 for -10
-                    stripped_min = re.split(".(?=-)", state_attr['state_min_alt_va'])
-                    stripped_max = re.split(".(?=-)", state_attr['state_max_alt_va'])
-                    min_alt_va = stripped_min[len(stripped_min) - 1]
-                    max_alt_va = stripped_max[len(stripped_max) - 1]
-                    try:
-                        if not float(min_alt_va) <= float(altitude) <= float(max_alt_va):
-                            self._errors['altitude'] = ["Altitude Out of Range for State {0}".format(state)]
-                    except ValueError:
-                        pass
-
-    def _validate_use_code(self, primaryKey, secondaryKey, tertiaryKey):
+    def _validate_county_latitude_range(self, context, errors):
+        country, state, county = context.get_values(['countryCode', 'stateFipsCode', 'countyCode'])
+
+        if context.get_value('latitude') and country and state and county:
+            # Compare in hundredths of a second against the range parsed when the reference file was loaded. A value
+            # which is not a valid DMS value, such as an invalid value kept from the existing location, is out of range
+            latitude_range = context.lookup(self.geography_ref.get_county, country, state, county).latitude_range
+            if latitude_range is not None and not in_range(context.get_dms('latitude'), latitude_range):
+                errors['latitude'] = ['Latitude is out of range for county {0}'.format(county)]
+
+    def _validate_county_longitude_range(self, context, errors):
+        country, state, county = context.get_values(['countryCode', 'stateFipsCode', 'countyCode'])
+
+        if context.get_value('longitude') and country and state and county:
+            # Compare in hundredths of a second against the range parsed when the reference file was loaded. A value
+            # which is not a valid DMS value, such as an invalid value kept from the existing location, is out of range
+            longitude_range = context.lookup(self.geography_ref.get_county, country, state, county).longitude_range
+            if longitude_range is not None and not in_range(context.get_dms('longitude'), longitude_range):
+                errors['longitude'] = ['Longitude is out of range for county {0}'.format(county)]
+
+    def _validate_altitude_range(self, context, errors):
+        altitude = context.get_number('altitude')
+        country, state = context.get_values(['countryCode', 'stateFipsCode'])
+        if altitude is not None and country and state:
+            state_attr = context.lookup(self.geography_ref.get_state, country, state).attributes
+            if state_attr and state_attr['state_min_alt_va'] and state_attr['state_max_alt_va']:
+                # The below is necessary because altitude range can be specified as 00-10 for -10
+                stripped_min = re.split(".(?=-)", state_attr['state_min_alt_va'])
+                stripped_max = re.split(".(?=-)", state_attr['state_max_alt_va'])
+                min_alt_va = stripped_min[len(stripped_min) - 1]
+                max_alt_va = stripped_max[len(stripped_max) - 1]
+                try:
+                    if not float(min_alt_va) <= altitude <= float(max_alt_va):
+                        errors['altitude'] = ["Altitude Out of Range for State {0}".format(state)]
+                except ValueError:
+                    pass
+
+    def _validate_use_code(self, context, errors, primaryKey, secondaryKey, tertiaryKey):
         keys = [primaryKey, secondaryKey, tertiaryKey]
-        if self._any_fields_in_document(keys):
-            primary, secondary, tertiary = [self.merged_document.get(key, '').strip() for key in keys]
-            if (primary and secondary and tertiary) and ((primary == secondary) or (primary == tertiary) or (secondary == tertiary)):
-                self._errors['uniqueUseCodes'] = ['Primary, secondary, and tertiary fields must be unique']
-
-    def validate(self, document, existing_document):
-        super().validate(document, existing_document)
-        self._validate_county_latitude_range()
-        self._validate_county_longitude_range()
-        self._validate_altitude_range()
-        self._validate_use_code('primaryUseOfSiteCode', 'secondaryUseOfSiteCode', 'tertiaryUseOfSiteCode')
-        self._validate_use_code('primaryUseOfWaterCode', 'secondaryUseOfWaterCode', 'tertiaryUseOfWaterCode')
-        return self._errors == {}
-
-
-
-
+        primary, secondary, tertiary = context.get_values(keys)
+        if (primary and secondary and tertiary) and ((primary == secondary) or (primary == tertiary) or (secondary == tertiary)):
+            errors['uniqueUseCodes'] = ['Primary, secondary, and tertiary fields must be unique']
@@ -1,29 +1,14 @@
 
-from .base_cross_field_validator import BaseCrossFieldValidator
+from .base_cross_field_validator import BaseCrossFieldValidator, CrossFieldRule
 
 class CrossFieldWarningValidator(BaseCrossFieldValidator):
 
-    def _validate_drainage_area(self):
-        keys = ['drainageArea', 'contributingDrainageArea']
-        if self._any_fields_in_document(keys):
-            try:
-                drainage_area, contributing_drainage_area = [float(self.merged_document.get(key, '').strip()) for key in keys]
-            except ValueError:
-                pass
-            else:
-                if (drainage_area and contributing_drainage_area) and contributing_drainage_area == drainage_area:
-                    self._errors['drainageArea'] = ['contributingDrainageArea should not be equal to drainageArea']
-
-    def validate(self, document, existing_document):
-        '''
-        After validate is called the error property will reflect the errors generated by the last call to validate
-        :param dict document:
-        :param dict existing_document:
-        :return: boolean
-        '''
-
-        super().validate(document, existing_document)
+    RULES = (
+        CrossFieldRule('_validate_drainage_area', ['drainageArea', 'contributingDrainageArea']),
+    )
 
-        self._validate_drainage_area()
-
-        return self._errors == {}
\ No newline at end of file
+    def _validate_drainage_area(self, context, errors):
+        keys = ['drainageArea', 'contributingDrainageArea']
+        drainage_area, contributing_drainage_area = context.get_numbers(keys)
+        if (drainage_area and contributing_drainage_area) and contributing_drainage_area == drainage_area:
+            errors['drainageArea'] = ['contributingDrainageArea should not be equal to drainageArea']
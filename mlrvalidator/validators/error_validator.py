@@ -1,58 +1,142 @@
-
 from collections import defaultdict
 from itertools import chain
 import os
 import yaml
 
+from .check_rank import RANKS, VALUE_RANK, LOOKUP_RANK
+from .compiled_single_field_validator import CompiledSingleFieldValidator, CERBERUS_ENGINE, COMPILED_ENGINE, \
+    GENERATED_ENGINE
 from .cross_field_error_validator import CrossFieldErrorValidator
 from .cross_field_ref_error_validator import CrossFieldRefErrorValidator
-from .single_field_validator import SingleFieldValidator
+from .generated_single_field_validator import GeneratedSingleFieldValidator
+from .single_field_validator import SingleFieldValidator, SingleFieldValidatorPool
 from .transition_validator import TransitionValidator
+from .validation_context import ValidationContext
 
 
 class ErrorValidator:
 
-    def __init__(self, schema_dir, reference_file_dir):
+    def __init__(self, schema_dir, reference_file_dir, single_field_engine=CERBERUS_ENGINE, code_cache_dir=None):
+        '''
+        :param str schema_dir:
+        :param str reference_file_dir:
+        :param str single_field_engine: CERBERUS_ENGINE, COMPILED_ENGINE or GENERATED_ENGINE
+        :param str code_cache_dir: directory where the GENERATED_ENGINE caches its compiled code
+        '''
         with open(os.path.join(schema_dir, 'error_schema.yml')) as fd:
             error_schema = yaml.load(fd.read())
 
-        self.single_field_validator = SingleFieldValidator(error_schema, reference_dir=reference_file_dir, allow_unknown=True)
+        if single_field_engine == COMPILED_ENGINE:
+            self.single_field_validator = CompiledSingleFieldValidator(
+                error_schema, reference_dir=reference_file_dir, allow_unknown=True)
+        elif single_field_engine == GENERATED_ENGINE:
+            self.single_field_validator = GeneratedSingleFieldValidator(
+                error_schema, reference_dir=reference_file_dir, allow_unknown=True, cache_dir=code_cache_dir)
+        else:
+            # Validators added to the pool share the reference lists loaded by the first one, so that a reload
+            # of the reference files is never started while a request is being handled
+            validator = SingleFieldValidator(error_schema, reference_dir=reference_file_dir, allow_unknown=True)
+            self.single_field_validator = SingleFieldValidatorPool(
+                lambda: SingleFieldValidator(error_schema, reference_list=validator.reference_list, allow_unknown=True),
+                idle=[validator])
         self.cross_field_validator = CrossFieldErrorValidator()
         self.cross_field_ref_validator = CrossFieldRefErrorValidator(reference_file_dir)
         self.transition_validator = TransitionValidator(reference_file_dir)
         self._errors = defaultdict(list)
 
 
-    def validate(self, ddot_location, existing_location, update=False):
-        self.single_field_validator.validate(ddot_location, update=update)
-        self.cross_field_validator.validate(ddot_location, existing_location)
-        self.cross_field_ref_validator.validate(ddot_location, existing_location)
+    def validate(self, ddot_location, existing_location, update=False, fail_fast=False):
+        '''
+        After validate is called the errors property will reflect the errors generated by the last call to validate.
+        Use get_errors when the validator is shared by concurrent requests.
+        '''
+        self._errors = self.get_errors(ddot_location, existing_location, update=update, fail_fast=fail_fast)
+        return self._errors == {}
+
+    def get_errors(self, ddot_location, existing_location, update=False, context=None, single_field_errors=None,
+                   fail_fast=False):
+        '''
+        :param dict ddot_location:
+        :param dict existing_location:
+        :param boolean update:
+        :param ValidationContext context: context for ddot_location and existing_location if one has already been
+            created for this request. If None, one is created.
+        :param dict single_field_errors: the single field errors of ddot_location if they have already been found,
+            for example by a combined single field validator. If None, they are found by single_field_validator.
+        :param boolean fail_fast: if True, stop at the first check which finds an error. The errors are then only
+            those of that check, so use this when only whether the location is valid is needed.
+        :return: defaultdict(list) - error messages keyed by field. Empty if there are no errors.
+        '''
+        if context is None:
+            context = ValidationContext(ddot_location, existing_location)
+        if fail_fast:
+            return self._get_first_errors(ddot_location, existing_location, update, context)
+
+        if single_field_errors is None:
+            single_field_errors = self.single_field_validator.get_errors(ddot_location, update=update)
+        cross_field_errors = self.cross_field_validator.get_errors(context)
+        cross_field_ref_errors = self.cross_field_ref_validator.get_errors(context)
 
         duplicate_error = {}
         if update:
-            self.transition_validator.validate(ddot_location, existing_location)
-            transition_errors = self.transition_validator.errors
+            transition_errors = self.transition_validator.get_errors(ddot_location, existing_location)
         else:
             transition_errors = {}
-            if existing_location != {}:
-                duplicate_error = {
-                    'duplicate_site': [
-                        'Site with agencyCode {0} and siteNumber {1} already exists'.format(existing_location.get('agencyCode'),
-                                                                                             existing_location.get('siteNumber'))]
-                }
+            duplicate_error = self._get_duplicate_error(existing_location)
 
-        self._errors = defaultdict(list)
+        errors = defaultdict(list)
         all_errors = chain(duplicate_error.items(),
-                           self.single_field_validator.errors.items(),
-                           self.cross_field_validator.errors.items(),
-                           self.cross_field_ref_validator.errors.items(),
+                           single_field_errors.items(),
+                           cross_field_errors.items(),
+                           cross_field_ref_errors.items(),
                            transition_errors.items())
 
         for k, v in chain(all_errors):
-            self.errors[k].extend(v)
-        return self._errors == {}
+            errors[k].extend(v)
+        return errors
+
+    def _get_duplicate_error(self, existing_location):
+        if existing_location == {}:
+            return {}
+        return {
+            'duplicate_site': [
+                'Site with agencyCode {0} and siteNumber {1} already exists'.format(existing_location.get('agencyCode'),
+                                                                                     existing_location.get('siteNumber'))]
+        }
+
+    def _get_first_errors(self, ddot_location, existing_location, update, context):
+        '''
+        Runs the checks rank by rank, from those which only compare the values to those which look up a reference and
+        parse the values, and returns the errors of the first check which finds any. See check_rank. Cerberus checks
+        all of a location's single field rules in one call, so with the Cerberus engine they are checked last.
+        :return: defaultdict(list) - error messages keyed by field. Empty if there are no errors.
+        '''
+        errors = defaultdict(list)
+        for check_errors in self._iter_check_errors(ddot_location, existing_location, update, context):
+            for k, v in check_errors.items():
+                errors[k].extend(v)
+            if errors:
+                break
+        return errors
+
+    def _iter_check_errors(self, ddot_location, existing_location, update, context):
+        '''
+        Yields the errors of each check in the order they are run when failing fast. The single field and cross
+        field validators stop at their first error.
+        '''
+        ranked_single_field = not isinstance(self.single_field_validator, SingleFieldValidatorPool)
+        for rank in RANKS:
+            if rank == VALUE_RANK and not update:
+                yield self._get_duplicate_error(existing_location)
+            if rank == LOOKUP_RANK and update:
+                yield self.transition_validator.get_errors(ddot_location, existing_location)
+            if ranked_single_field:
+                yield self.single_field_validator.get_errors(ddot_location, update=update, fail_fast=True, rank=rank)
+            yield self.cross_field_validator.get_errors(context, fail_fast=True, rank=rank)
+            yield self.cross_field_ref_validator.get_errors(context, fail_fast=True, rank=rank)
+        if not ranked_single_field:
+            yield self.single_field_validator.get_errors(ddot_location, update=update, fail_fast=True)
 
     @property
     def errors(self):
         return self._errors
-
@@ -0,0 +1,385 @@
+from collections.abc import Mapping
+import hashlib
+import marshal
+import os
+import re
+import sys
+import tempfile
+
+from .check_rank import RANKS, VALUE_RANK
+from .compiled_single_field_validator import UnsupportedRule, REQUIRED_FIELD, UNKNOWN_FIELD, NOT_NULLABLE, BAD_TYPE, \
+    MAX_LENGTH, REGEX_MISMATCH, UNALLOWED_VALUE, CUSTOM_CHECKS, RULE_RANKS, FALLBACK_RANK
+from .single_field_validator import SingleFieldValidator, SingleFieldValidatorPool, load_reference_lists, is_numeric, \
+    is_positive_numeric
+
+# Change when the generated source changes in a way that the source hash would not catch.
+GENERATOR_VERSION = '1'
+
+TYPE_CHECK_NAMES = {
+    'numeric': '_is_numeric',
+    'positive_numeric': '_is_positive_numeric'
+}
+
+
+class _SourceWriter:
+
+    def __init__(self):
+        self.lines = []
+        self.indent = 0
+
+    def write(self, line):
+        self.lines.append('    ' * self.indent + line)
+
+    def source(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def _write_field(writer, field, definitions, namespace, errors_name='errors', rank=None):
+    '''
+    Writes the statements which validate a single field whose value has been assigned to value.
+    :param _SourceWriter writer:
+    :param str field:
+    :param dict definitions: the schema rules for the field
+    :param dict namespace: globals for the generated function. Constants used by the statements are added to it.
+    :param str errors_name: name of the dictionary the errors are added to
+    :param int rank: if not None, only the checks of this rank are written. See RULE_RANKS.
+    :return: boolean - False if the field has no checks of rank, in which case nothing is written
+    :raises UnsupportedRule: if definitions contains a rule that can not be generated
+    '''
+    data_type = definitions.get('type')
+    if data_type is not None:
+        if data_type not in TYPE_CHECK_NAMES:
+            raise UnsupportedRule('type {0}'.format(data_type))
+        if rank is not None:
+            if rank != RULE_RANKS['type']:
+                return False
+            rank = None
+
+    # Custom rule errors come first in the order of the schema, followed by the standard rule errors ordered by
+    # rule name. This is the order in which Cerberus reports them.
+    statements = []
+    standard_rules = []
+    for rule, constraint in definitions.items():
+        if rule in ('required', 'nullable', 'type'):
+            continue
+        elif rule not in RULE_RANKS:
+            raise UnsupportedRule(rule)
+        elif rank is not None and RULE_RANKS[rule] != rank:
+            continue
+        elif rule in ('maxlength', 'regex', 'allowed'):
+            standard_rules.append((rule, constraint))
+        elif rule == 'is_empty':
+            if not constraint:
+                statements.append('if not value.strip():')
+                statements.append("    messages.append('Field must contain non whitespace characters')")
+        elif rule == 'valid_reference':
+            if constraint and namespace['_reference_lists'] is not None:
+                ref_name = '_ref_{0}'.format(len(namespace))
+                namespace[ref_name] = namespace['_reference_lists'].get_reference_set(field)
+                statements.append('stripped_value = value.strip()')
+                statements.append('if stripped_value and stripped_value not in {0}:'.format(ref_name))
+                statements.append("    messages.append('{0} is not in reference list'.format(value))")
+        elif constraint:
+            check_name = '_check_{0}'.format(rule)
+            namespace[check_name] = CUSTOM_CHECKS[rule]
+            statements.append('messages.extend({0}(value))'.format(check_name))
+
+    for rule, constraint in sorted(standard_rules, key=lambda rule_constraint: rule_constraint[0]):
+        if rule == 'maxlength':
+            statements.append('if len(value) > {0!r}:'.format(constraint))
+            statements.append('    messages.append({0!r})'.format(MAX_LENGTH.format(constraint)))
+        elif rule == 'regex':
+            regex_name = '_regex_{0}'.format(len(namespace))
+            namespace[regex_name] = re.compile(constraint if constraint.endswith('$') else constraint + '$')
+            statements.append('if not {0}.match(value):'.format(regex_name))
+            statements.append('    messages.append({0!r})'.format(REGEX_MISMATCH.format(constraint)))
+        elif rule == 'allowed':
+            allowed_name = '_allowed_{0}'.format(len(namespace))
+            namespace[allowed_name] = list(constraint)
+            statements.append('if value not in {0}:'.format(allowed_name))
+            statements.append('    messages.append({0!r}.format(value))'.format(UNALLOWED_VALUE))
+
+    check_null = not definitions.get('nullable', False) and rank in (None, VALUE_RANK)
+    if rank is not None and not statements and not check_null:
+        return False
+
+    writer.write('if value is None:')
+    writer.indent += 1
+    if check_null:
+        writer.write('{0}[{1!r}] = [{2!r}]'.format(errors_name, field, NOT_NULLABLE))
+    else:
+        writer.write('pass')
+    writer.indent -= 1
+
+    if data_type is not None:
+        writer.write('elif not {0}(value):'.format(TYPE_CHECK_NAMES[data_type]))
+        writer.indent += 1
+        writer.write('{0}[{1!r}] = [{2!r}]'.format(errors_name, field, BAD_TYPE.format(data_type)))
+        writer.indent -= 1
+
+    writer.write('else:')
+    writer.indent += 1
+    writer.write('messages = []')
+    for statement in statements:
+        writer.write(statement)
+    writer.write('if messages:')
+    writer.write('    {0}[{1!r}] = messages'.format(errors_name, field))
+    writer.indent -= 1
+    return True
+
+
+def _write_validate(writer, schemas, namespace, function_name='validate', rank=None):
+    '''
+    Writes a function, validate(document, update), which validates document against each of schemas in one pass
+    over the fields and returns the errors for the schema, or a tuple of the errors for each schema if there is more
+    than one. It returns None if the document has a value in a schema field that is not a string or None.
+    :param _SourceWriter writer:
+    :param list schemas: tuples of the schema, its allow_unknown and the name of the dictionary for its errors
+    :param dict namespace: globals for the generated function. The constants it uses are added to it.
+    :param str function_name:
+    :param int rank: if not None, the function only runs the checks of this rank and returns as soon as a field is
+        found in error, after checking the required fields. Only supported for a single schema.
+    :raises UnsupportedRule: if a schema contains a rule that can not be generated
+    '''
+    writer.write('def {0}(document, update):'.format(function_name))
+    writer.indent += 1
+    for schema, allow_unknown, errors_name in schemas:
+        writer.write('{0} = {{}}'.format(errors_name))
+    if rank == VALUE_RANK:
+        schema, allow_unknown, errors_name = schemas[0]
+        required_name = '_{0}_required_fields'.format(errors_name)
+        namespace[required_name] = sorted(field for field, definitions in schema.items()
+                                          if definitions.get('required') is True)
+        writer.write('if not update:')
+        writer.write('    for field in {0}:'.format(required_name))
+        writer.write('        if field not in document:')
+        writer.write('            return {{field: [{0!r}]}}'.format(REQUIRED_FIELD))
+    fields = set()
+    for schema, allow_unknown, errors_name in schemas:
+        fields.update(schema)
+    for field in sorted(fields):
+        # Every function checks the types of the values, even of fields with no checks of rank, so that they all
+        # return None for the same documents
+        writer.write('value = document.get({0!r}, _MISSING)'.format(field))
+        writer.write('if value is not _MISSING:')
+        writer.indent += 1
+        writer.write('if value is not None and not isinstance(value, str):')
+        writer.write('    return None')
+        for schema, allow_unknown, errors_name in schemas:
+            if field in schema and _write_field(writer, field, schema[field], namespace, errors_name=errors_name,
+                                                rank=rank) and rank is not None:
+                writer.write('if {0}:'.format(errors_name))
+                writer.write('    return {0}'.format(errors_name))
+        writer.indent -= 1
+        required_names = [errors_name for schema, allow_unknown, errors_name in schemas
+                          if field in schema and schema[field].get('required') is True]
+        if required_names and rank is None:
+            writer.write('elif not update:')
+            for errors_name in required_names:
+                writer.write('    {0}[{1!r}] = [{2!r}]'.format(errors_name, field, REQUIRED_FIELD))
+
+    results = []
+    for schema, allow_unknown, errors_name in schemas:
+        if not allow_unknown and rank in (None, VALUE_RANK):
+            fields_name = '_{0}_fields'.format(errors_name)
+            namespace[fields_name] = frozenset(schema)
+            writer.write('for field in document:')
+            writer.write('    if field not in {0}:'.format(fields_name))
+            if rank is not None:
+                writer.write('        return {{field: [{0!r}]}}'.format(UNKNOWN_FIELD))
+            else:
+                writer.write('        {0}[field] = [{1!r}]'.format(errors_name, UNKNOWN_FIELD))
+            results.append('dict((field, {0}[field]) for field in sorted({0}))'.format(errors_name))
+        else:
+            results.append(errors_name)
+    if rank is not None:
+        writer.write('return {}')
+    else:
+        writer.write('return {0}'.format(', '.join(results)))
+    writer.indent -= 1
+
+
+def generate_source(schema, namespace, allow_unknown=False):
+    '''
+    Generates the source of a function, validate(document, update), which returns the same errors as Cerberus would
+    for schema. It returns None if the document has a value in a schema field that is not a string or None, in which
+    case the document should be validated with Cerberus. For each rank in RANKS, the source also defines
+    validate_rank_<rank>(document, update), which runs only the checks of that rank and returns the errors of the
+    first field found in error.
+    :param dict schema:
+    :param dict namespace: globals for the generated functions. The constants they use are added to it.
+    :param boolean allow_unknown:
+    :return: str
+    :raises UnsupportedRule: if the schema contains a rule that can not be generated
+    '''
+    writer = _SourceWriter()
+    _write_validate(writer, [(schema, allow_unknown, 'errors')], namespace)
+    for rank in RANKS:
+        _write_validate(writer, [(schema, allow_unknown, 'errors')], namespace,
+                        function_name='validate_rank_{0}'.format(rank), rank=rank)
+    return writer.source()
+
+
+def generate_combined_source(schemas, namespace):
+    '''
+    Generates the source of a function, validate(document, update), which validates document against all of schemas
+    in one pass and returns a tuple with the errors for each schema. See generate_source.
+    :param list schemas: at least two tuples of a schema and its allow_unknown
+    :param dict namespace:
+    :return: str
+    :raises UnsupportedRule: if a schema contains a rule that can not be generated
+    '''
+    writer = _SourceWriter()
+    _write_validate(writer, [(schema, allow_unknown, 'errors_{0}'.format(index))
+                             for index, (schema, allow_unknown) in enumerate(schemas)], namespace)
+    return writer.source()
+
+
+def _new_namespace(reference_lists):
+    return {
+        '_MISSING': object(),
+        '_reference_lists': reference_lists,
+        '_is_numeric': is_numeric,
+        '_is_positive_numeric': is_positive_numeric
+    }
+
+
+def _compile_source(source, cache_dir):
+    '''
+    Compiles source, reusing the code object cached in cache_dir for the same source and Python version.
+    :param str source:
+    :param str cache_dir: if None, the code object is not cached
+    :return: code object
+    '''
+    filename = '<generated single field validator>'
+    if cache_dir is None:
+        return compile(source, filename, 'exec')
+
+    key = hashlib.sha256((GENERATOR_VERSION + source).encode('utf-8')).hexdigest()
+    cache_path = os.path.join(cache_dir, 'single_field_{0}.{1}.marshal'.format(key, sys.implementation.cache_tag))
+    try:
+        with open(cache_path, 'rb') as fd:
+            return marshal.load(fd)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    code = compile(source, filename, 'exec')
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir)
+        with os.fdopen(fd, 'wb') as temp_file:
+            marshal.dump(code, temp_file)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        pass
+    return code
+
+
+class GeneratedSingleFieldValidator:
+    '''
+    Validates documents with a function generated from the schema's rules. Each field's checks are written out as
+    straight line Python, so a call does no rule lookup or method dispatch. The errors are the same as those returned
+    by SingleFieldValidator, including their order.
+
+    The generated code is compiled once and, if cache_dir is given, the code object is cached there keyed by a hash
+    of the source and the Python version. Documents with values that are not strings or None are passed to a pool of
+    SingleFieldValidators, as is every document if the schema uses a rule that can not be generated. The validator
+    holds no per call state so a single instance can be shared by concurrent requests.
+    '''
+
+    def __init__(self, schema, reference_dir='', allow_unknown=False, cache_dir=None):
+        '''
+        :param dict schema: Cerberus schema using the rules supported by SingleFieldValidator
+        :param str reference_dir: directory containing reference_lists.json
+        :param boolean allow_unknown: if False, fields which are not in schema are errors
+        :param str cache_dir: directory where compiled code is cached. If None it is not cached
+        '''
+        self.schema = schema
+        self.allow_unknown = allow_unknown
+        self.reference_lists = load_reference_lists(reference_dir)
+        self.fallback = SingleFieldValidatorPool(
+            lambda: SingleFieldValidator(schema, reference_list=self.reference_lists, allow_unknown=allow_unknown))
+
+        namespace = _new_namespace(self.reference_lists)
+        try:
+            self.source = generate_source(schema, namespace, allow_unknown=allow_unknown)
+        except UnsupportedRule:
+            self.source = None
+            self._validate = None
+        else:
+            exec(_compile_source(self.source, cache_dir), namespace)
+            self._validate = namespace['validate']
+            self._validate_by_rank = dict((rank, namespace['validate_rank_{0}'.format(rank)]) for rank in RANKS)
+
+    def get_errors(self, document, update=False, fail_fast=False, rank=None):
+        '''
+        :param dict document:
+        :param boolean update: if True, required fields are not checked
+        :param boolean fail_fast: if True, the checks are run by rank and only the errors of the first field found in
+            error are returned. The required fields are checked before the fields in the document.
+        :param int rank: if not None and fail_fast is True, only the checks of this rank are run. See check_rank.
+        :return: dict - error messages keyed by field. The dictionary will be empty if the document is valid.
+        '''
+        if fail_fast:
+            for rank_to_check in RANKS if rank is None else (rank,):
+                errors = self._get_first_errors(document, update, rank_to_check)
+                if errors:
+                    return errors
+            return {}
+
+        errors = None
+        if self._validate is not None and isinstance(document, Mapping):
+            errors = self._validate(document, update)
+        if errors is None:
+            errors = self.fallback.get_errors(document, update=update)
+        return errors
+
+    def _get_first_errors(self, document, update, rank):
+        errors = None
+        if self._validate is not None and isinstance(document, Mapping):
+            errors = self._validate_by_rank[rank](document, update)
+        if errors is None:
+            # Cerberus checks every rule at once, so it is only called for the last rank of the single field rules
+            errors = self.fallback.get_errors(document, update=update, fail_fast=True) if rank == FALLBACK_RANK \
+                else {}
+        return errors
+
+
+class CombinedGeneratedSingleFieldValidator:
+    '''
+    Validates a document against the schemas of several GeneratedSingleFieldValidators, such as the error and warning
+    schemas, with one generated function which visits each field of the document once. The errors for each schema
+    are the same as those returned by its own validator. Documents that the function does not handle are validated
+    by each validator in turn.
+    '''
+
+    def __init__(self, validators, cache_dir=None):
+        '''
+        :param list of GeneratedSingleFieldValidator validators: at least two validators. They are only combined if
+            they use the same reference lists.
+        :param str cache_dir: directory where compiled code is cached. If None it is not cached
+        '''
+        self.validators = tuple(validators)
+        self._validate = None
+        self.source = None
+        reference_lists = self.validators[0].reference_lists
+        if all(validator.source is not None and validator.reference_lists is reference_lists
+               for validator in self.validators):
+            namespace = _new_namespace(reference_lists)
+            self.source = generate_combined_source(
+                [(validator.schema, validator.allow_unknown) for validator in self.validators], namespace)
+            exec(_compile_source(self.source, cache_dir), namespace)
+            self._validate = namespace['validate']
+
+    def get_errors(self, document, update=False):
+        '''
+        :param dict document:
+        :param boolean update: if True, required fields are not checked
+        :return: list of dict - the error messages keyed by field for each of the validators, in the same order
+        '''
+        all_errors = None
+        if self._validate is not None and isinstance(document, Mapping):
+            all_errors = self._validate(document, update)
+        if all_errors is None:
+            return [validator.get_errors(document, update=update) for validator in self.validators]
+        return list(all_errors)
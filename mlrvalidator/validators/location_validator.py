@@ -0,0 +1,103 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+from .compiled_single_field_validator import CombinedSingleFieldValidator, CompiledSingleFieldValidator, \
+    CERBERUS_ENGINE
+from .error_validator import ErrorValidator
+from .generated_single_field_validator import CombinedGeneratedSingleFieldValidator, GeneratedSingleFieldValidator
+from .result_cache import version_stamp
+from .validation_context import ValidationContext
+from .warning_validator import WarningValidator
+
+
+class ValidationResult(namedtuple('ValidationResult', ['errors', 'warnings'])):
+    '''
+    The outcome of validating a location. errors and warnings are read only mappings of field name to a
+    list of messages.
+    '''
+    __slots__ = ()
+
+    @property
+    def passed(self):
+        return not self.errors and not self.warnings
+
+
+def _freeze(messages):
+    return MappingProxyType(dict(messages))
+
+
+def combine_single_field_validators(error_validator, warning_validator, code_cache_dir=None):
+    '''
+    :param error_validator: single field validator for the error schema
+    :param warning_validator: single field validator for the warning schema
+    :param str code_cache_dir: see GeneratedSingleFieldValidator
+    :return: a validator whose get_errors returns the single field errors and warnings in one pass over the
+        document, or None if the validators can't be combined. Cerberus validators can't be combined.
+    '''
+    validators = [error_validator, warning_validator]
+    if all(isinstance(validator, CompiledSingleFieldValidator) for validator in validators):
+        return CombinedSingleFieldValidator(validators)
+    if all(isinstance(validator, GeneratedSingleFieldValidator) for validator in validators):
+        return CombinedGeneratedSingleFieldValidator(validators, cache_dir=code_cache_dir)
+    return None
+
+
+class LocationValidator:
+    '''
+    Runs the error and warning validations for a location. validate holds no state between calls, so a single
+    instance can be shared by all of the threads or greenlets serving requests.
+
+    The error and warning validations share one ValidationContext, so the merged document and the reference lookups
+    are made once. With the compiled or generated engine the single field errors and warnings are also found in one
+    pass over the location.
+    '''
+
+    def __init__(self, schema_dir, reference_file_dir, single_field_engine=CERBERUS_ENGINE, code_cache_dir=None):
+        '''
+        :param str schema_dir:
+        :param str reference_file_dir:
+        :param str single_field_engine: the engine used for the single field rules, CERBERUS_ENGINE,
+            COMPILED_ENGINE or GENERATED_ENGINE
+        :param str code_cache_dir: directory where the GENERATED_ENGINE caches its compiled code. If None it is not
+            cached.
+        '''
+        self.version = version_stamp(schema_dir, reference_file_dir)
+        self.error_validator = ErrorValidator(schema_dir, reference_file_dir, single_field_engine=single_field_engine,
+                                              code_cache_dir=code_cache_dir)
+        self.warning_validator = WarningValidator(schema_dir, reference_file_dir,
+                                                  single_field_engine=single_field_engine,
+                                                  code_cache_dir=code_cache_dir)
+        self.single_field_validator = combine_single_field_validators(
+            self.error_validator.single_field_validator, self.warning_validator.single_field_validator,
+            code_cache_dir=code_cache_dir)
+
+    def validate(self, ddot_location, existing_location, update=False, fail_fast=False):
+        '''
+        :param dict ddot_location:
+        :param dict existing_location:
+        :param boolean update: True if ddot_location is an update to existing_location rather than a new location
+        :param boolean fail_fast: if True, validation stops at the first error found and the warnings are not
+            checked for a location with errors. The result of a location without errors is the same as without
+            fail_fast.
+        :return: ValidationResult
+        '''
+        context = ValidationContext(ddot_location, existing_location)
+        if fail_fast:
+            errors = self.error_validator.get_errors(ddot_location, existing_location, update=update, context=context,
+                                                     fail_fast=True)
+            if errors:
+                return ValidationResult(errors=_freeze(errors), warnings=_freeze({}))
+            # Every error check was run without finding an error
+            warnings = self.warning_validator.get_warnings(ddot_location, existing_location, update=update,
+                                                           context=context)
+            return ValidationResult(errors=_freeze(errors), warnings=_freeze(warnings))
+
+        single_field_errors, single_field_warnings = None, None
+        if self.single_field_validator is not None:
+            single_field_errors, single_field_warnings = self.single_field_validator.get_errors(ddot_location,
+                                                                                                update=update)
+        errors = self.error_validator.get_errors(ddot_location, existing_location, update=update, context=context,
+                                                 single_field_errors=single_field_errors)
+        warnings = self.warning_validator.get_warnings(ddot_location, existing_location, update=update,
+                                                       context=context, single_field_warnings=single_field_warnings)
+        return ValidationResult(errors=_freeze(errors), warnings=_freeze(warnings))
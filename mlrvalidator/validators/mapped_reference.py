@@ -0,0 +1,349 @@
+'''
+Stores the geography index in a read only memory mapped file. Every worker which maps the file shares the same
+physical pages, so memory use does not grow with the number of workers. Build the store whenever the reference
+files change:
+
+    mlr-build-mapped-reference-store --output reference_store.map
+
+The file holds records sorted by key. Each record is a key made of a record type and the codes which identify it,
+separated by SEPARATOR, followed by a NUL byte and an optional JSON value. Membership in a set of codes is a binary
+search for the record of the code. The store is only used if it was built from the current reference files.
+'''
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+
+import config
+from .coordinates import LATITUDE_DEGREE_DIGITS, LONGITUDE_DEGREE_DIGITS, parse_range
+from .reference import GeographyIndex, reference_registry
+from .reference_snapshot import describe_sources, sources_match
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'MLRMAP\x00\x01'
+SEPARATOR = '\x1f'
+# Record count and length of the JSON describing the sources. They are followed by the JSON, the little endian
+# unsigned 32 bit offset of each record and of the end of the file, then the records.
+HEADER = struct.Struct('<II')
+OFFSET = struct.Struct('<I')
+
+# Record types
+STATE_CODE = 'C'
+STATE_ATTRIBUTES = 'S'
+COUNTY_CODE = 'K'
+COUNTY_ATTRIBUTES = 'A'
+MINOR_CIVIL_DIVISION_CODE = 'M'
+# StateGeography attribute -> record type
+STATE_CODE_SETS = {
+    'aquifer_codes': 'Q',
+    'hydrologic_unit_codes': 'H',
+    'national_aquifer_codes': 'N'
+}
+
+
+def _get_ranges(attributes, prefix):
+    '''
+    :param dict attributes: state or county attributes
+    :param str prefix: 'state' or 'county'
+    :return: tuple - the latitude and longitude ranges. See coordinates.parse_range
+    '''
+    return (
+        parse_range(attributes, prefix + '_min_lat_va', prefix + '_max_lat_va', LATITUDE_DEGREE_DIGITS),
+        parse_range(attributes, prefix + '_min_long_va', prefix + '_max_long_va', LONGITUDE_DEGREE_DIGITS)
+    )
+
+
+class MappedStoreError(Exception):
+    pass
+
+
+def _key(*parts):
+    return SEPARATOR.join(parts).encode('utf-8')
+
+
+def _records(geography):
+    '''
+    :param GeographyIndex geography:
+    :return: iterator of tuples - key and value of each record for geography
+    '''
+    for country_code, state_codes in geography.get_states_by_country().items():
+        for state_code in state_codes:
+            yield _key(STATE_CODE, country_code, state_code), b''
+
+    for country_code, state_code, state in geography.iter_states():
+        if state.attributes:
+            yield _key(STATE_ATTRIBUTES, country_code, state_code), json.dumps(state.attributes).encode('utf-8')
+        for county_code in state.county_codes:
+            yield _key(COUNTY_CODE, country_code, state_code, county_code), b''
+        for attribute, record_type in STATE_CODE_SETS.items():
+            for code in getattr(state, attribute):
+                yield _key(record_type, country_code, state_code, code), b''
+        for county_code, county in state.counties.items():
+            if county.attributes:
+                yield _key(COUNTY_ATTRIBUTES, country_code, state_code, county_code), \
+                      json.dumps(county.attributes).encode('utf-8')
+            for code in county.minor_civil_division_codes:
+                yield _key(MINOR_CIVIL_DIVISION_CODE, country_code, state_code, county_code, code), b''
+
+
+def build_mapped_store(reference_dir, output_path):
+    '''
+    Writes the geography index for the files in reference_dir to output_path
+    :param str reference_dir:
+    :param str output_path:
+    :return: int - the number of records written
+    '''
+    records = sorted(_records(GeographyIndex(reference_dir, use_shards=False)))
+    sources = json.dumps(describe_sources(reference_dir)).encode('utf-8')
+
+    records_start = len(MAGIC) + HEADER.size + len(sources) + OFFSET.size * (len(records) + 1)
+    offsets = [records_start]
+    for key, value in records:
+        offsets.append(offsets[-1] + len(key) + 1 + len(value))
+
+    temp_path = '{0}.{1}.tmp'.format(output_path, os.getpid())
+    with open(temp_path, 'wb') as fd:
+        fd.write(MAGIC)
+        fd.write(HEADER.pack(len(records), len(sources)))
+        fd.write(sources)
+        fd.write(struct.pack('<{0}I'.format(len(offsets)), *offsets))
+        for key, value in records:
+            fd.write(key + b'\x00' + value)
+    os.replace(temp_path, output_path)
+    return len(records)
+
+
+class MappedStore:
+    '''
+    Read only view of a file written by build_mapped_store
+    '''
+
+    def __init__(self, path):
+        '''
+        :param str path:
+        :raises MappedStoreError: if path is not a mapped reference store
+        '''
+        with open(path, 'rb') as fd:
+            try:
+                self._map = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise MappedStoreError('{0} is empty'.format(path))
+
+        if self._map[:len(MAGIC)] != MAGIC or len(self._map) < len(MAGIC) + HEADER.size:
+            raise MappedStoreError('{0} is not a mapped reference store'.format(path))
+        self._count, sources_length = HEADER.unpack_from(self._map, len(MAGIC))
+        sources_start = len(MAGIC) + HEADER.size
+        self.sources = json.loads(self._map[sources_start:sources_start + sources_length].decode('utf-8'))
+        offsets_start = sources_start + sources_length
+        offsets_end = offsets_start + OFFSET.size * (self._count + 1)
+        if len(self._map) < offsets_end:
+            raise MappedStoreError('{0} is truncated'.format(path))
+        if sys.byteorder == 'little':
+            # The offsets are read in place rather than unpacked
+            self._offsets = memoryview(self._map)[offsets_start:offsets_end].cast('I')
+        else:
+            self._offsets = struct.unpack_from('<{0}I'.format(self._count + 1), self._map, offsets_start)
+        if self._offsets[self._count] != len(self._map):
+            raise MappedStoreError('{0} is truncated'.format(path))
+
+    def _record_key(self, index):
+        start = self._offsets[index]
+        return self._map[start:self._map.find(b'\x00', start)]
+
+    def _bisect(self, key):
+        '''
+        :return: int - index of the first record whose key is not less than key
+        '''
+        offsets = self._offsets
+        data = self._map
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            start = offsets[middle]
+            if data[start:data.find(b'\x00', start)] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def __contains__(self, key):
+        index = self._bisect(key)
+        return index < self._count and self._record_key(index) == key
+
+    def get(self, key):
+        '''
+        :param bytes key:
+        :return: the value of the record for key decoded from JSON or None if there is no record for key
+        '''
+        index = self._bisect(key)
+        if index >= self._count or self._record_key(index) != key:
+            return None
+        value = self._map[self._offsets[index] + len(key) + 1:self._offsets[index + 1]]
+        return json.loads(value.decode('utf-8')) if value else None
+
+    def has_prefix(self, prefix):
+        index = self._bisect(prefix)
+        return index < self._count and self._record_key(index).startswith(prefix)
+
+    def iter_suffixes(self, prefix):
+        '''
+        :return: iterator of bytes - the rest of each key which starts with prefix
+        '''
+        index = self._bisect(prefix)
+        while index < self._count:
+            key = self._record_key(index)
+            if not key.startswith(prefix):
+                break
+            yield key[len(prefix):]
+            index += 1
+
+
+class MappedCodeSet:
+    '''
+    Set like view of the codes in a MappedStore whose keys start with the same prefix. Supports the operations which
+    the validators use on the frozensets of a GeographyIndex.
+    '''
+    __slots__ = ('_store', '_prefix')
+
+    def __init__(self, store, prefix):
+        self._store = store
+        self._prefix = prefix
+
+    def __contains__(self, code):
+        return isinstance(code, str) and SEPARATOR not in code and \
+            self._prefix + code.encode('utf-8') in self._store
+
+    def __bool__(self):
+        return self._store.has_prefix(self._prefix)
+
+    def __iter__(self):
+        return (suffix.decode('utf-8') for suffix in self._store.iter_suffixes(self._prefix))
+
+    def __len__(self):
+        return sum(1 for _ in self._store.iter_suffixes(self._prefix))
+
+
+class MappedStateGeography:
+    '''
+    StateGeography read from a MappedStore. The attributes and ranges are decoded the first time they are read.
+    '''
+
+    def __init__(self, store, country_code, state_code):
+        self._store = store
+        self._parts = (country_code, state_code)
+        self._attributes = None
+        self._ranges = None
+        for attribute, record_type in STATE_CODE_SETS.items():
+            setattr(self, attribute, MappedCodeSet(store, _key(record_type, *self._parts, '')))
+        self.county_codes = MappedCodeSet(store, _key(COUNTY_CODE, *self._parts, ''))
+
+    @property
+    def attributes(self):
+        if self._attributes is None:
+            self._attributes = self._store.get(_key(STATE_ATTRIBUTES, *self._parts)) or {}
+        return self._attributes
+
+    @property
+    def latitude_range(self):
+        if self._ranges is None:
+            self._ranges = _get_ranges(self.attributes, 'state')
+        return self._ranges[0]
+
+    @property
+    def longitude_range(self):
+        if self._ranges is None:
+            self._ranges = _get_ranges(self.attributes, 'state')
+        return self._ranges[1]
+
+
+class MappedCountyGeography:
+    '''
+    CountyGeography read from a MappedStore. The attributes and ranges are decoded the first time they are read.
+    '''
+
+    def __init__(self, store, country_code, state_code, county_code):
+        self._store = store
+        self._parts = (country_code, state_code, county_code)
+        self._attributes = None
+        self._ranges = None
+        self.minor_civil_division_codes = MappedCodeSet(store, _key(MINOR_CIVIL_DIVISION_CODE, *self._parts, ''))
+
+    @property
+    def attributes(self):
+        if self._attributes is None:
+            self._attributes = self._store.get(_key(COUNTY_ATTRIBUTES, *self._parts)) or {}
+        return self._attributes
+
+    @property
+    def latitude_range(self):
+        if self._ranges is None:
+            self._ranges = _get_ranges(self.attributes, 'county')
+        return self._ranges[0]
+
+    @property
+    def longitude_range(self):
+        if self._ranges is None:
+            self._ranges = _get_ranges(self.attributes, 'county')
+        return self._ranges[1]
+
+
+class MappedGeographyIndex:
+    '''
+    Has the lookup methods of GeographyIndex but serves them from a MappedStore
+    '''
+
+    def __init__(self, store):
+        '''
+        :param MappedStore store:
+        '''
+        self.store = store
+
+    def get_state_code_set(self, country_code):
+        return MappedCodeSet(self.store, _key(STATE_CODE, country_code, ''))
+
+    def get_state(self, country_code, state_code):
+        return MappedStateGeography(self.store, country_code, state_code)
+
+    def get_county(self, country_code, state_code, county_code):
+        return MappedCountyGeography(self.store, country_code, state_code, county_code)
+
+
+def load_mapped_store(store_path, reference_dir, registry=reference_registry):
+    '''
+    Adds a MappedGeographyIndex for the store at store_path to registry, so that validators created afterwards use
+    it rather than a GeographyIndex. Does nothing if there is no store at store_path or it can't be used.
+    :param str store_path:
+    :param str reference_dir:
+    :param ReferenceRegistry registry:
+    :return: boolean - True if the store was loaded
+    '''
+    if not store_path or not os.path.exists(store_path):
+        return False
+    try:
+        store = MappedStore(store_path)
+        if not sources_match(store.sources, reference_dir):
+            raise MappedStoreError('{0} was not built from the current reference files'.format(store_path))
+    except (OSError, ValueError, MappedStoreError) as e:
+        logger.warning('Not using the mapped reference store. %s', e)
+        return False
+
+    registry.put(GeographyIndex, reference_dir, MappedGeographyIndex(store))
+    return True
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description='Build a memory mapped store of the geography reference files')
+    parser.add_argument('--output', default=config.REFERENCE_STORE, help='Path of the store to write')
+    parser.add_argument('--reference-dir', default=config.REFERENCE_FILE_DIR)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    count = build_mapped_store(args.reference_dir, args.output)
+    sys.stderr.write('Wrote {0} records to {1}\n'.format(count, args.output))
+    return 0
@@ -0,0 +1,15 @@
+'''
+Parses the numeric fields, such as altitude, holeDepth and drainageArea. The single field type checks and the cross
+field rules use the same parser, so they agree on which values are numbers.
+'''
+
+
+def parse_number(value):
+    '''
+    :param value: a document value, normally a str
+    :return: float - value as a number or None if value is blank or is not a number
+    '''
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
@@ -1,120 +1,452 @@
 import json
+import logging
+import os
+import sys
+import threading
 
-from mlrvalidator.utils import get_dict
+from mlrvalidator.utils import index_dicts
+from .coordinates import LATITUDE_DEGREE_DIGITS, LONGITUDE_DEGREE_DIGITS, parse_range
+from .reference_shards import ShardCache, read_manifest
+from .reference_stream import iter_country_states
+
+logger = logging.getLogger(__name__)
 
 class ReferenceInfo:
     def __init__(self, path_to_file):
         fd = open(path_to_file)
         with fd:
             self.reference_info = json.loads(fd.read())
+        self._build_indexes()
+
+    def _build_indexes(self):
+        '''
+        Called once the reference file has been read. Subclasses override this to build the dictionaries
+        used by their lookup methods so that lookups do not scan reference_info.
+        '''
+        pass
 
     def get_reference_info(self):
         return self.reference_info
 
 
-class CountryStateReference(ReferenceInfo):
+class NationalWaterUseCodes(ReferenceInfo):
+
+    def _build_indexes(self):
+        self._site_types = index_dicts(self.reference_info.get('siteTypeCodes', []), 'siteTypeCode')
 
-    def __init__(self, path_to_file, ref_list_key):
+    def get_national_water_use_codes(self, site_type_code):
+        return self._site_types.get(site_type_code, {}).get('nationalWaterUseCodes', [])
+
+
+class FieldTransitions(ReferenceInfo):
+
+    def _build_indexes(self):
+        self._transitions = index_dicts(self.reference_info, 'existingField')
+
+    def get_allowed_transitions(self, existing_field_value):
         '''
-        The json in the files is assumed to have the following form:
-        {"countries": [{"countryCode: "BG", "states": [{"stateFipsCode": "01", "ref_list_key": ["A", "B"]}]}]}'
-        :param str path_to_file:
-        :param str ref_list_key: Key of the list to return when searching by country and state.
+        :return list of allowed new values. Return an empty list if the existing_field_value isn't in the reference list.
+        :param string existing_field_value:
         '''
-        self.ref_list_key = ref_list_key
-        super().__init__(path_to_file)
+        return self._transitions.get(existing_field_value, {}).get('newFields', [])
 
-    def get_list_by_country_state(self, country_code, state_code):
-        country_list = self.reference_info['countries']
-        state_list = get_dict(country_list, 'countryCode', country_code).get('states', [])
 
-        return get_dict(state_list, 'stateFipsCode', state_code).get(self.ref_list_key, [])
+class SiteTypesCrossField(ReferenceInfo):
 
+    def _build_indexes(self):
+        self._site_types = index_dicts(self.reference_info.get('siteTypeCodes', []), 'siteTypeCode')
 
-class NationalWaterUseCodes(ReferenceInfo):
-    def get_national_water_use_codes(self, site_type_code):
-        site_type_list = self.reference_info['siteTypeCodes']
-        return get_dict(site_type_list, 'siteTypeCode', site_type_code).get('nationalWaterUseCodes', [])
+    def get_attribute_fields(self):
+        '''
+        :return: set of the fields in the notNullAttrs or nullAttrs of any site type
+        '''
+        return set(field for site_type in self._site_types.values()
+                   for field in site_type.get('notNullAttrs', []) + site_type.get('nullAttrs', []))
 
+    def get_site_type_field_dependencies(self, site_type_code):
+        try:
+            site_type_field_ref = self._site_types[site_type_code.strip()]
+        except KeyError:
+            site_type_field_ref = {'siteTypeCode': site_type_code, 'notNullAttrs': [], 'nullAttrs': []}
+        return site_type_field_ref
 
-class Counties(CountryStateReference):
 
-    def __init__(self, path_to_file):
-        super().__init__(path_to_file, 'counties')
+class LandNetCrossField(ReferenceInfo):
+
+    def _build_indexes(self):
+        self._land_net_templates = index_dicts(self.reference_info.get('landNetTemplates', []), 'districtCode')
 
+    def get_land_net_templates(self, district_code):
+        return self._land_net_templates.get(district_code.strip(), {}).get('landNetTemplate', {})
 
-    def get_county_codes(self, country_code, state_code):
-        county_list = self.get_list_by_country_state(country_code, state_code)
-        county_code_list = [d['countyCode'] for d in county_list]
 
-        return county_code_list
+class SiteNumberFormat(ReferenceInfo):
 
-    def get_county_attributes(self, country_code, state_code, county_code):
-        county_list = self.get_list_by_country_state(country_code, state_code)
-        try:
-            county_attributes = list(filter(lambda cc: cc['countyCode'] == county_code, county_list))[0]
-        except IndexError:
-            county_attributes = {}
+    def _build_indexes(self):
+        self._site_number_formats = {}
+        for d in self.reference_info.get('siteNumberFormatCodes', []):
+            for site_type_code in d.get('siteTypeCode', []):
+                self._site_number_formats.setdefault(site_type_code, d['siteNumberFormatCode'])
+
+    def get_site_number_template(self, site_type_code):
+        return self._site_number_formats.get(site_type_code, '')
 
-        return county_attributes
 
+class ReferenceLists(ReferenceInfo):
+    '''
+    The lists of allowed values for each field in reference_lists.json
+    '''
 
-class States(ReferenceInfo):
+    def _build_indexes(self):
+        self._reference_sets = {}
+        for field, ref_list in self.reference_info.items():
+            try:
+                self._reference_sets[field] = frozenset(ref_list)
+            except TypeError:
+                pass
 
-    def get_state_codes(self, country_code):
-        country_list = self.reference_info['countries']
-        state_list = get_dict(country_list, 'countryCode', country_code).get('states', [])
-        state_code_list = [d['stateFipsCode'] for d in state_list]
+    def get_reference_set(self, field):
+        '''
+        :return: frozenset of the allowed values for field. It is empty if field has no reference list.
+        '''
+        return self._reference_sets.get(field, frozenset())
 
-        return state_code_list
+    def get_reference_sets(self, fields):
+        '''
+        :param iterable fields:
+        :return: dict - frozenset of the allowed values keyed by field for each of fields
+        '''
+        return dict((field, self.get_reference_set(field)) for field in fields)
+
+
+def _intern(value):
+    '''
+    :return: value with all of the strings it contains, including dictionary keys, replaced by their interned copy so
+        that the codes repeated across the reference files share one string.
+    '''
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return dict((sys.intern(key), _intern(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return [_intern(item) for item in value]
+    return value
+
+
+class StateGeography:
+    '''
+    Reference data for a country and state gathered from all of the files in GeographyIndex.FILES.
+    '''
+    __slots__ = ('attributes', 'latitude_range', 'longitude_range', 'county_codes', 'counties', 'aquifer_codes',
+                 'hydrologic_unit_codes', 'national_aquifer_codes')
+
+    def __init__(self):
+        self.attributes = {}
+        self.latitude_range = None
+        self.longitude_range = None
+        self.county_codes = frozenset()
+        self.counties = {}
+        self.aquifer_codes = frozenset()
+        self.hydrologic_unit_codes = frozenset()
+        self.national_aquifer_codes = frozenset()
+
+    def set_attributes(self, attributes):
+        '''
+        Sets attributes and the latitude and longitude ranges, in hundredths of a second, parsed from them
+        :param dict attributes: the state from state.json
+        '''
+        self.attributes = attributes
+        self.latitude_range = parse_range(attributes, 'state_min_lat_va', 'state_max_lat_va', LATITUDE_DEGREE_DIGITS)
+        self.longitude_range = parse_range(attributes, 'state_min_long_va', 'state_max_long_va',
+                                           LONGITUDE_DEGREE_DIGITS)
 
-    def get_state_attributes(self, country_code, state_code):
-        country_list = self.reference_info['countries']
-        state_list = get_dict(country_list, 'countryCode', country_code).get('states', [])
-        return get_dict(state_list, 'stateFipsCode', state_code)
 
+class CountyGeography:
+    '''
+    Reference data for a country, state and county from county.json and mcd.json
+    '''
+    __slots__ = ('attributes', 'latitude_range', 'longitude_range', 'minor_civil_division_codes')
 
-class FieldTransitions(ReferenceInfo):
+    def __init__(self):
+        self.attributes = {}
+        self.latitude_range = None
+        self.longitude_range = None
+        self.minor_civil_division_codes = frozenset()
 
-    def get_allowed_transitions(self, existing_field_value):
+    def set_attributes(self, attributes):
         '''
-        :return list of allowed new values. Return an empty list if the existing_field_value isn't in the reference list.
-        :param string existing_field_value:
+        Sets attributes and the latitude and longitude ranges, in hundredths of a second, parsed from them
+        :param dict attributes: the county from county.json
         '''
-        return get_dict(self.reference_info, 'existingField', existing_field_value).get('newFields', [])
+        self.attributes = attributes
+        self.latitude_range = parse_range(attributes, 'county_min_lat_va', 'county_max_lat_va',
+                                          LATITUDE_DEGREE_DIGITS)
+        self.longitude_range = parse_range(attributes, 'county_min_long_va', 'county_max_long_va',
+                                           LONGITUDE_DEGREE_DIGITS)
 
 
-class SiteTypesCrossField(ReferenceInfo):
+EMPTY_STATE = StateGeography()
+EMPTY_COUNTY = CountyGeography()
 
-    def get_site_type_field_dependencies(self, site_type_code):
-        site_type_cross_field_refs = self.reference_info['siteTypeCodes']
-        try:
-            site_type_field_ref = next((site_type_d for site_type_d in site_type_cross_field_refs if site_type_d['siteTypeCode'] == site_type_code.strip()))
-        except StopIteration:
-            site_type_field_ref = {'siteTypeCode': site_type_code, 'notNullAttrs': [], 'nullAttrs': []}
-        return site_type_field_ref
 
+class GeographyIndex:
+    '''
+    Loads the reference files which are organized by country and state into a single index so that one lookup
+    returns everything known about a state or county. Strings are interned, so a code which appears in several files
+    is stored once.
+    '''
 
-class LandNetCrossField(ReferenceInfo):
+    # file name -> (attribute of StateGeography, key of the codes in each state of the file)
+    STATE_CODE_FILES = {
+        'aquifer.json': ('aquifer_codes', 'aquiferCodes'),
+        'huc.json': ('hydrologic_unit_codes', 'hydrologicUnitCodes'),
+        'national_aquifer.json': ('national_aquifer_codes', 'nationalAquiferCodes')
+    }
+    FILES = ('state.json', 'county.json', 'mcd.json') + tuple(sorted(STATE_CODE_FILES))
 
-    def get_land_net_templates(self, district_code):
-        land_net_templates = self.reference_info['landNetTemplates']
-        try:
-            land_net_template = get_dict(land_net_templates, 'districtCode', district_code.strip()).get('landNetTemplate', {})
-        except StopIteration:
-            land_net_template = {}
-        return land_net_template
+    # Number of shards kept loaded when huc.json and mcd.json are sharded
+    max_shards = 64
 
+    def __init__(self, reference_dir, use_shards=True):
+        '''
+        :param str reference_dir: directory containing FILES
+        :param boolean use_shards: if True and reference_dir contains shards built by mlr-build-reference-shards from
+            the current huc.json and mcd.json, those files are not loaded. Instead each state's shard is loaded the
+            first time the state is looked up.
+        '''
+        self._states = {}
+        self._state_code_sets = {}
+        shard_paths = read_manifest(reference_dir) if use_shards else None
+        self._shards = None if shard_paths is None else ShardCache(shard_paths, self.max_shards, self._build_state)
+
+        state_codes = {}
+        for (country_code, state_code), state in self._load(reference_dir, 'state.json'):
+            state_codes.setdefault(country_code, set()).add(state_code)
+            self._get_or_add_state(country_code, state_code).set_attributes(state)
+        self._state_code_sets = dict((country_code, frozenset(codes)) for country_code, codes in state_codes.items())
+
+        for (country_code, state_code), state in self._load(reference_dir, 'county.json'):
+            counties = state.get('counties', [])
+            geography = self._get_or_add_state(country_code, state_code)
+            geography.county_codes = frozenset(county['countyCode'] for county in counties)
+            for county_code, county in index_dicts(counties, 'countyCode').items():
+                self._get_or_add_county(geography, county_code).set_attributes(county)
+        self._log_unchecked_ranges(reference_dir)
+
+        if self._shards is None:
+            for (country_code, state_code), state in self._load(reference_dir, 'mcd.json'):
+                self._add_minor_civil_division_codes(self._get_or_add_state(country_code, state_code),
+                                                     index_dicts(state.get('counties', []), 'countyCode'))
+
+        for filename, (attribute, list_key) in sorted(self.STATE_CODE_FILES.items()):
+            if filename == 'huc.json' and self._shards is not None:
+                continue
+            for (country_code, state_code), state in self._load(reference_dir, filename):
+                setattr(self._get_or_add_state(country_code, state_code), attribute,
+                        frozenset(state.get(list_key, [])))
+
+    def _log_unchecked_ranges(self, reference_dir):
+        '''
+        Logs the states and counties whose latitude or longitude bounds are missing or not in the reference format.
+        Coordinates in them are not range checked.
+        '''
+        states = []
+        counties = []
+        for (country_code, state_code), state in sorted(self._states.items()):
+            if state.attributes and (state.latitude_range is None or state.longitude_range is None):
+                states.append('{0}/{1}'.format(country_code, state_code))
+            for county_code, county in sorted(state.counties.items()):
+                if county.attributes and (county.latitude_range is None or county.longitude_range is None):
+                    counties.append('{0}/{1}/{2}'.format(country_code, state_code, county_code))
+
+        for filename, names in (('state.json', states), ('county.json', counties)):
+            if names:
+                logger.warning('%d entries in %s have missing or malformed latitude or longitude bounds, so '
+                               'coordinates in them are not range checked: %s',
+                               len(names), os.path.join(reference_dir, filename), ', '.join(names))
+
+    @staticmethod
+    def _load(reference_dir, filename):
+        '''
+        Reads the file one state at a time, so only the indexed values are kept once a state has been processed
+        :return: iterator of tuples - (country code, state code) and state dictionary for each state in the file
+        '''
+        with open(os.path.join(reference_dir, filename)) as fd:
+            for country_code, state_code, state in iter_country_states(fd):
+                yield (_intern(country_code), _intern(state_code)), _intern(state)
+
+    def _get_or_add_state(self, country_code, state_code):
+        geography = self._states.get((country_code, state_code))
+        if geography is None:
+            geography = self._states[(country_code, state_code)] = StateGeography()
+        return geography
+
+    @staticmethod
+    def _get_or_add_county(state_geography, county_code):
+        geography = state_geography.counties.get(county_code)
+        if geography is None:
+            geography = state_geography.counties[county_code] = CountyGeography()
+        return geography
+
+    def _add_minor_civil_division_codes(self, state_geography, counties):
+        '''
+        :param StateGeography state_geography:
+        :param dict counties: county dictionaries from mcd.json keyed by county code
+        '''
+        for county_code, county in counties.items():
+            self._get_or_add_county(state_geography, county_code).minor_civil_division_codes = \
+                frozenset(county.get('minorCivilDivisionCodes', []))
 
-class SiteNumberFormat(ReferenceInfo):
-    def get_site_number_template(self, site_type_code):
-        site_number_format_refs = self.reference_info['siteNumberFormatCodes']
+    def _build_state(self, country_code, state_code, shard):
+        '''
+        :return: StateGeography - copy of the state's geography with the codes from its shard added
+        '''
+        shard = _intern(shard)
+        geography = StateGeography()
+        base = self._states.get((country_code, state_code), EMPTY_STATE)
+        for attribute in StateGeography.__slots__:
+            setattr(geography, attribute, getattr(base, attribute))
+        geography.hydrologic_unit_codes = frozenset(shard.get('hydrologicUnitCodes', []))
+
+        geography.counties = {}
+        for county_code, base_county in base.counties.items():
+            county = geography.counties[county_code] = CountyGeography()
+            county.set_attributes(base_county.attributes)
+        self._add_minor_civil_division_codes(
+            geography, dict((county_code, {'minorCivilDivisionCodes': codes})
+                            for county_code, codes in shard.get('minorCivilDivisionCodes', {}).items()))
+        return geography
+
+    @property
+    def shards(self):
+        '''
+        :return: ShardCache or None if the index is not sharded
+        '''
+        return self._shards
+
+    def get_states_by_country(self):
+        '''
+        :return: dict - frozenset of the state codes in state.json for each country code
+        '''
+        return dict(self._state_code_sets)
+
+    def iter_states(self):
+        '''
+        :return: iterator of tuples - country code, state code and StateGeography of every state in the index. If the
+            index is sharded, the states do not include the codes from huc.json and mcd.json.
+        '''
+        for (country_code, state_code), geography in sorted(self._states.items()):
+            yield country_code, state_code, geography
+
+    def get_state_code_set(self, country_code):
+        '''
+        :return: frozenset of the state codes in state.json for country_code
+        '''
+        return self._state_code_sets.get(country_code, frozenset())
 
+    def get_state(self, country_code, state_code):
+        '''
+        :return: StateGeography for country_code and state_code. Its attributes are empty if the state is not in any
+            of the files.
+        '''
+        if self._shards is not None:
+            geography = self._shards.get(country_code, state_code)
+            if geography is not None:
+                return geography
+        return self._states.get((country_code, state_code), EMPTY_STATE)
+
+    def get_county(self, country_code, state_code, county_code):
+        '''
+        :return: CountyGeography for country_code, state_code and county_code. Its attributes are empty if the
+            county is not in county.json or mcd.json.
+        '''
+        return self.get_state(country_code, state_code).counties.get(county_code, EMPTY_COUNTY)
+
+
+def _get_mtime(path):
+    if os.path.isdir(path):
+        return tuple(sorted((entry.name, entry.stat().st_mtime) for entry in os.scandir(path) if entry.is_file()))
+    return os.path.getmtime(path)
+
+
+class ReferenceRegistry:
+    '''
+    Shares ReferenceInfo instances across validators so that each reference file is parsed once per process.
+    Instances are keyed by their class, the absolute path and modification time of the file and any additional
+    constructor arguments. When a file's modification time changes, the next request for it loads the new contents
+    and the stale instance is dropped from the registry. A directory, such as the one read by GeographyIndex, is
+    versioned by the modification times of the files in it.
+
+    A reference is built without holding the registry's lock, so loading one file does not delay requests for the
+    others. Each key has its own build lock, so concurrent requests for the same file parse it once.
+    '''
+
+    def __init__(self):
+        self._references = {}
+        self._build_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, reference_class, path_to_file, *args):
+        '''
+        :param type reference_class: ReferenceInfo or one of its subclasses
+        :param str path_to_file:
+        :param args: any additional arguments needed to create a reference_class instance
+        :return: the shared reference_class instance for path_to_file
+        '''
+        abs_path = os.path.abspath(path_to_file)
+        try:
+            mtime = _get_mtime(abs_path)
+        except OSError:
+            # Without a modification time the contents can't be versioned, so the file is not shared
+            return reference_class(path_to_file, *args)
+
+        key = (reference_class, abs_path, args)
+        with self._lock:
+            entry = self._references.get(key)
+            if entry is not None and entry[0] == mtime:
+                return entry[1]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            # Another request may have built this version while we waited for the build lock
+            with self._lock:
+                entry = self._references.get(key)
+            if entry is not None and entry[0] == mtime:
+                return entry[1]
+
+            reference = reference_class(path_to_file, *args)
+            with self._lock:
+                self._references[key] = (mtime, reference)
+        return reference
+
+    def put(self, reference_class, path_to_file, reference, *args):
+        '''
+        Adds reference, which was loaded elsewhere, to the registry. It is returned by get until path_to_file is
+        modified.
+        :param type reference_class:
+        :param str path_to_file:
+        :param reference: the reference_class instance for path_to_file
+        :param args: the additional arguments used to create reference
+        '''
+        abs_path = os.path.abspath(path_to_file)
         try:
-            idx = next(index for (index, d) in enumerate(site_number_format_refs) if site_type_code in d['siteTypeCode'])
-        except StopIteration:
-            site_number_format_ref = ''
-        else:
-            site_number_format_ref = site_number_format_refs[idx]['siteNumberFormatCode']
-        return site_number_format_ref
+            mtime = _get_mtime(abs_path)
+        except OSError:
+            return
+        with self._lock:
+            self._references[(reference_class, abs_path, args)] = (mtime, reference)
+
+    def get_references(self):
+        '''
+        :return: list of tuples - the class, absolute path, additional arguments and instance of each reference
+        '''
+        with self._lock:
+            return [(reference_class, abs_path, args, entry[1])
+                    for (reference_class, abs_path, args), entry in self._references.items()]
+
+    def clear(self):
+        with self._lock:
+            self._references = {}
+
 
+reference_registry = ReferenceRegistry()
@@ -0,0 +1,210 @@
+'''
+Splits the largest country and state reference files, huc.json and mcd.json, into a shard for each country and
+state. When the shards are current, GeographyIndex loads a state's shard the first time the state is validated rather
+than parsing the whole files at startup. Build the shards whenever the reference files change:
+
+    mlr-build-reference-shards
+
+The shards are written to the shards directory in the reference directory, along with a manifest describing the files
+they were built from.
+'''
+import argparse
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+
+import config
+
+from mlrvalidator import metrics
+from mlrvalidator.utils import index_dicts
+from .reference_stream import iter_country_states
+
+SHARD_DIR_NAME = 'shards'
+MANIFEST_NAME = 'manifest.json'
+# Increment when the layout of the shards changes
+FORMAT_VERSION = 1
+SHARDED_FILES = ('huc.json', 'mcd.json')
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fd:
+        for block in iter(lambda: fd.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def describe_file(path):
+    '''
+    :param str path:
+    :return: dict - size, modification time and sha256 of the file at path
+    '''
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': _sha256_file(path)}
+
+
+def file_matches(description, path):
+    '''
+    :param dict description: see describe_file
+    :param str path:
+    :return: boolean - True if the file at path is the file described. The file is only read if its modification
+        time has changed.
+    '''
+    stat = os.stat(path)
+    if stat.st_size != description['size']:
+        return False
+    return stat.st_mtime_ns == description['mtime_ns'] or _sha256_file(path) == description['sha256']
+
+
+def _states(path):
+    with open(path) as fd:
+        yield from iter_country_states(fd)
+
+
+def build_shards(reference_dir):
+    '''
+    Writes a shard for each country and state in the SHARDED_FILES in reference_dir, replacing any existing shards
+    :param str reference_dir:
+    :return: int - the number of shards written
+    '''
+    shards = {}
+    for country_code, state_code, state in _states(os.path.join(reference_dir, 'huc.json')):
+        shards.setdefault((country_code, state_code), {})['hydrologicUnitCodes'] = \
+            state.get('hydrologicUnitCodes', [])
+    for country_code, state_code, state in _states(os.path.join(reference_dir, 'mcd.json')):
+        shards.setdefault((country_code, state_code), {})['minorCivilDivisionCodes'] = dict(
+            (county_code, county.get('minorCivilDivisionCodes', []))
+            for county_code, county in index_dicts(state.get('counties', []), 'countyCode').items())
+
+    shard_dir = os.path.join(reference_dir, SHARD_DIR_NAME)
+    temp_dir = '{0}.{1}.tmp'.format(shard_dir, os.getpid())
+    os.makedirs(temp_dir)
+    filenames = {}
+    for index, ((country_code, state_code), shard) in enumerate(sorted(shards.items())):
+        filename = '{0}.json'.format(index)
+        with open(os.path.join(temp_dir, filename), 'w') as fd:
+            json.dump(shard, fd)
+        filenames.setdefault(country_code, {})[state_code] = filename
+
+    with open(os.path.join(temp_dir, MANIFEST_NAME), 'w') as fd:
+        json.dump({
+            'format_version': FORMAT_VERSION,
+            'sources': dict((filename, describe_file(os.path.join(reference_dir, filename)))
+                            for filename in SHARDED_FILES),
+            'shards': filenames
+        }, fd)
+
+    if os.path.exists(shard_dir):
+        old_dir = '{0}.{1}.old'.format(shard_dir, os.getpid())
+        os.rename(shard_dir, old_dir)
+        os.rename(temp_dir, shard_dir)
+        shutil.rmtree(old_dir)
+    else:
+        os.rename(temp_dir, shard_dir)
+    return len(shards)
+
+
+def read_manifest(reference_dir):
+    '''
+    :param str reference_dir:
+    :return: dict - shard file name keyed by (country code, state code) or None if there are no shards or they were
+        not built from the current reference files
+    '''
+    shard_dir = os.path.join(reference_dir, SHARD_DIR_NAME)
+    try:
+        with open(os.path.join(shard_dir, MANIFEST_NAME)) as fd:
+            manifest = json.load(fd)
+        if manifest.get('format_version') != FORMAT_VERSION or \
+                sorted(manifest['sources']) != sorted(SHARDED_FILES) or \
+                not all(file_matches(description, os.path.join(reference_dir, filename))
+                        for filename, description in manifest['sources'].items()):
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+
+    return dict(((country_code, state_code), os.path.join(shard_dir, filename))
+                for country_code, states in manifest['shards'].items()
+                for state_code, filename in states.items())
+
+
+class ShardCache:
+    '''
+    Loads shards on first use and keeps the most recently used max_shards of them
+    '''
+
+    def __init__(self, shard_paths, max_shards, build):
+        '''
+        :param dict shard_paths: path of each shard keyed by (country code, state code). See read_manifest
+        :param int max_shards:
+        :param function build: called with the country code, state code and contents of a shard when it is loaded.
+            Its return value is cached.
+        '''
+        self.shard_paths = shard_paths
+        self.max_shards = max_shards
+        self.build = build
+        self._shards = OrderedDict()
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def __getstate__(self):
+        # Loaded shards and the lock are not kept when pickled
+        return {'shard_paths': self.shard_paths, 'max_shards': self.max_shards, 'build': self.build}
+
+    def __setstate__(self, state):
+        self.__init__(state['shard_paths'], state['max_shards'], state['build'])
+
+    def get(self, country_code, state_code, default=None):
+        '''
+        :return: the value built from the shard for country_code and state_code or default if there is no shard
+        '''
+        key = (country_code, state_code)
+        path = self.shard_paths.get(key)
+        if path is None:
+            return default
+
+        with self._lock:
+            shard = self._shards.get(key)
+            if shard is not None:
+                self._shards.move_to_end(key)
+                return shard
+
+        # Loaded without holding the lock so that requests for shards already loaded are not delayed. If two
+        # requests load the same shard at once, the second replaces the first.
+        with open(path) as fd:
+            shard = self.build(country_code, state_code, json.load(fd))
+        evictions = 0
+        with self._lock:
+            self._shards[key] = shard
+            self._shards.move_to_end(key)
+            self.loads += 1
+            while len(self._shards) > self.max_shards:
+                self._shards.popitem(last=False)
+                evictions += 1
+            self.evictions += evictions
+
+        if metrics.is_enabled():
+            metrics.REFERENCE_SHARDS.inc(('load',))
+            if evictions:
+                metrics.REFERENCE_SHARDS.inc(('eviction',), evictions)
+        return shard
+
+    def __len__(self):
+        return len(self._shards)
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description='Split huc.json and mcd.json into a shard for each country and state')
+    parser.add_argument('--reference-dir', default=config.REFERENCE_FILE_DIR)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    count = build_shards(args.reference_dir)
+    sys.stderr.write('Wrote {0} shards to {1}\n'.format(count, os.path.join(args.reference_dir, SHARD_DIR_NAME)))
+    return 0
@@ -0,0 +1,216 @@
+'''
+Builds and loads a snapshot of the indexed reference objects so that workers can start without parsing the
+reference JSON files. Build the snapshot whenever the reference files change, for example when building the image:
+
+    mlr-build-reference-snapshot --output reference_snapshot.pickle
+
+A snapshot is only used if its checksum is valid and it was built from the current reference files with the current
+versions of the modules which build the references: reference.py and the mlrvalidator modules it uses, such as
+coordinates.py and reference_stream.py. Otherwise the references are loaded from the JSON files. Snapshots are pickled, so only
+load snapshots built by a trusted process.
+'''
+import argparse
+import gc
+import hashlib
+import logging
+import os
+import pickle
+import struct
+import sys
+import types
+import zlib
+
+import config
+from . import reference
+from .location_validator import LocationValidator
+from .reference_shards import MANIFEST_NAME, SHARD_DIR_NAME
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'MLRREFSNAP'
+# Increment when the layout of the snapshot changes
+FORMAT_VERSION = 1
+# The payload follows the magic bytes and its CRC-32
+CHECKSUM = struct.Struct('>I')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fd:
+        for block in iter(lambda: fd.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _builder_modules():
+    '''
+    :return: dict - reference, which defines the snapshotted classes, and every mlrvalidator module it uses directly
+        or through another of them, keyed by module name. These modules build the snapshotted objects, so a change to
+        any of them may change what loading the JSON files would produce.
+    '''
+    modules = {}
+    pending = [reference]
+    while pending:
+        module = pending.pop()
+        if module.__name__ in modules:
+            continue
+        modules[module.__name__] = module
+        for value in vars(module).values():
+            name = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, '__module__', None)
+            if isinstance(name, str) and name.split('.')[0] == 'mlrvalidator' and name in sys.modules:
+                pending.append(sys.modules[name])
+    return modules
+
+
+def _source_paths(reference_dir):
+    '''
+    :return: dict - path of each JSON file in reference_dir and of the shard manifest if there is one, keyed by file
+        name, and of each module returned by _builder_modules, keyed by module name
+    '''
+    paths = dict((filename, os.path.join(reference_dir, filename))
+                 for filename in os.listdir(reference_dir) if filename.endswith('.json'))
+    manifest_path = os.path.join(reference_dir, SHARD_DIR_NAME, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        # A sharded index refers to the shard files, so the snapshot is stale if they are rebuilt or removed
+        paths['/'.join((SHARD_DIR_NAME, MANIFEST_NAME))] = manifest_path
+    for name, module in _builder_modules().items():
+        paths[name] = module.__file__
+    return paths
+
+
+def describe_sources(reference_dir):
+    '''
+    :param str reference_dir:
+    :return: dict - size, modification time and sha256 of each source of the snapshot, keyed by file name
+    '''
+    sources = {}
+    for filename, path in _source_paths(reference_dir).items():
+        stat = os.stat(path)
+        sources[filename] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': _sha256_file(path)}
+    return sources
+
+
+def sources_match(sources, reference_dir):
+    '''
+    :param dict sources: see describe_sources
+    :param str reference_dir:
+    :return: boolean - True if the files described by sources are the current sources. Files whose size and
+        modification time are unchanged are not read.
+    '''
+    paths = _source_paths(reference_dir)
+    if set(paths) != set(sources):
+        return False
+    for filename, path in paths.items():
+        stat = os.stat(path)
+        source = sources[filename]
+        if stat.st_size != source['size']:
+            return False
+        if stat.st_mtime_ns != source['mtime_ns'] and _sha256_file(path) != source['sha256']:
+            return False
+    return True
+
+
+def build_snapshot(schema_dir, reference_dir, output_path):
+    '''
+    Writes a snapshot of the reference objects used by a LocationValidator to output_path
+    :param str schema_dir:
+    :param str reference_dir:
+    :param str output_path:
+    :return: int - the number of reference objects in the snapshot
+    '''
+    registry = reference.reference_registry
+    registry.clear()
+    LocationValidator(schema_dir, reference_dir)
+
+    abs_reference_dir = os.path.abspath(reference_dir)
+    references = [(reference_class, os.path.relpath(path, abs_reference_dir), args, instance)
+                  for reference_class, path, args, instance in registry.get_references()
+                  if path == abs_reference_dir or os.path.dirname(path) == abs_reference_dir]
+    payload = pickle.dumps({
+        'format_version': FORMAT_VERSION,
+        'sources': describe_sources(reference_dir),
+        'references': references
+    }, protocol=pickle.HIGHEST_PROTOCOL)
+
+    temp_path = '{0}.{1}.tmp'.format(output_path, os.getpid())
+    with open(temp_path, 'wb') as fd:
+        fd.write(MAGIC + CHECKSUM.pack(zlib.crc32(payload)) + payload)
+    os.replace(temp_path, output_path)
+    return len(references)
+
+
+def read_snapshot(snapshot_path, reference_dir):
+    '''
+    :param str snapshot_path:
+    :param str reference_dir:
+    :return: list of tuples - the reference class, path relative to reference_dir, constructor arguments and
+        instance of each reference in the snapshot
+    :raises SnapshotError: if the snapshot is corrupt or was not built from the files in reference_dir
+    '''
+    with open(snapshot_path, 'rb') as fd:
+        data = fd.read()
+
+    payload_start = len(MAGIC) + CHECKSUM.size
+    if not data.startswith(MAGIC) or len(data) < payload_start:
+        raise SnapshotError('{0} is not a reference snapshot'.format(snapshot_path))
+    payload = memoryview(data)[payload_start:]
+    if zlib.crc32(payload) != CHECKSUM.unpack_from(data, len(MAGIC))[0]:
+        raise SnapshotError('{0} has an invalid checksum'.format(snapshot_path))
+
+    # The snapshot creates many objects but no reference cycles, so collections while unpickling are wasted
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        snapshot = pickle.loads(payload)
+    except Exception as e:
+        raise SnapshotError('{0} could not be unpickled: {1}'.format(snapshot_path, e))
+    finally:
+        if gc_enabled:
+            gc.enable()
+    if snapshot.get('format_version') != FORMAT_VERSION:
+        raise SnapshotError('{0} has format version {1}, expected {2}'.format(
+            snapshot_path, snapshot.get('format_version'), FORMAT_VERSION))
+    if not sources_match(snapshot['sources'], reference_dir):
+        raise SnapshotError('{0} was not built from the current reference files'.format(snapshot_path))
+    return snapshot['references']
+
+
+def load_snapshot(snapshot_path, reference_dir, registry=reference.reference_registry):
+    '''
+    Adds the references in the snapshot at snapshot_path to registry, so that validators created afterwards use them
+    rather than parsing the reference files. Does nothing if there is no snapshot at snapshot_path or it can't be used.
+    :param str snapshot_path:
+    :param str reference_dir:
+    :param ReferenceRegistry registry:
+    :return: boolean - True if the snapshot was loaded
+    '''
+    if not snapshot_path or not os.path.exists(snapshot_path):
+        return False
+    try:
+        references = read_snapshot(snapshot_path, reference_dir)
+    except (OSError, SnapshotError) as e:
+        logger.warning('Loading references from JSON. %s', e)
+        return False
+
+    for reference_class, relative_path, args, instance in references:
+        registry.put(reference_class, os.path.normpath(os.path.join(reference_dir, relative_path)), instance, *args)
+    return True
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(description='Build a snapshot of the indexed reference files')
+    parser.add_argument('--output', default=config.REFERENCE_SNAPSHOT, help='Path of the snapshot to write')
+    parser.add_argument('--schema-dir', default=config.SCHEMA_DIR)
+    parser.add_argument('--reference-dir', default=config.REFERENCE_FILE_DIR)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    count = build_snapshot(args.schema_dir, args.reference_dir, args.output)
+    sys.stderr.write('Wrote {0} references to {1}\n'.format(count, args.output))
+    return 0
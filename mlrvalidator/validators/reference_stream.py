@@ -0,0 +1,156 @@
+'''
+Reads the reference files which are organized by country and state one state at a time, so that loading them does
+not hold the text of the whole file or the complete decoded tree in memory. The file is read in chunks and each
+state is decoded with the standard JSON decoder once all of its text has been read.
+'''
+import json
+
+CHUNK_SIZE = 1 << 16
+WHITESPACE = ' \t\n\r'
+
+
+class _Scanner:
+    '''
+    Walks the structure of the JSON text read from a file, decoding the values the caller asks for
+    '''
+
+    def __init__(self, fd, chunk_size):
+        self._fd = fd
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        '''
+        Reads more of the file, dropping the text already consumed. At least as much is read as is already
+        buffered so that a value spanning many chunks is decoded a bounded number of times.
+        :return: boolean - False if the end of the file has been reached
+        '''
+        if self._eof:
+            return False
+        chunk = self._fd.read(max(self._chunk_size, len(self._buffer) - self._pos))
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        if not chunk:
+            self._eof = True
+        return bool(chunk)
+
+    def peek(self):
+        '''
+        :return: str - the next character which is not whitespace or '' at the end of the file
+        '''
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return self._buffer[self._pos:self._pos + 1]
+
+    def expect(self, characters):
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError('Expected one of {0!r} but found {1!r}'.format(characters, character))
+        self._pos += 1
+        return character
+
+    def decode(self):
+        '''
+        :return: the next value in the file
+        '''
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end < len(self._buffer) or not self._fill():
+                self._pos = end
+                return value
+
+    def iter_items(self):
+        '''
+        Yields once for each item of the array which is next in the file. The caller consumes the item before
+        resuming the iterator.
+        '''
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield
+            if self.expect(',]') == ']':
+                return
+
+    def iter_members(self):
+        '''
+        Yields the key of each member of the object which is next in the file. The caller consumes the member's
+        value before resuming the iterator.
+        '''
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise ValueError('Expected an object key')
+            key = self.decode()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+    def expect_end(self):
+        if self.peek():
+            raise ValueError('Extra data after the JSON document')
+
+
+def iter_country_states(fd, chunk_size=CHUNK_SIZE):
+    '''
+    The json in the file is assumed to have the following form:
+    {"countries": [{"countryCode: "BG", "states": [{"stateFipsCode": "01", ...}]}]}
+    As with index_dicts, only the first country with a countryCode and the first state with a stateFipsCode in that
+    country are used. Countries and states without a code are skipped.
+    :param file fd: text file to read
+    :param int chunk_size: number of characters to read at a time
+    :return: iterator of tuples - country code, state code and state dictionary, in the order they are in the file
+    :raises ValueError: if the file is not valid JSON
+    '''
+    scanner = _Scanner(fd, chunk_size)
+    country_codes = set()
+    for key in scanner.iter_members():
+        if key != 'countries':
+            scanner.decode()
+            continue
+
+        for _ in scanner.iter_items():
+            country_code = None
+            # States before the countryCode are held until the code is known
+            pending_states = []
+            state_codes = set()
+            for country_key in scanner.iter_members():
+                if country_key == 'countryCode':
+                    country_code = scanner.decode()
+                elif country_key == 'states':
+                    for _ in scanner.iter_items():
+                        state = scanner.decode()
+                        if country_code is None:
+                            pending_states.append(state)
+                        elif country_code not in country_codes and 'stateFipsCode' in state and \
+                                state['stateFipsCode'] not in state_codes:
+                            state_codes.add(state['stateFipsCode'])
+                            yield country_code, state['stateFipsCode'], state
+                else:
+                    scanner.decode()
+
+            if country_code is None or country_code in country_codes:
+                continue
+            for state in pending_states:
+                if 'stateFipsCode' in state and state['stateFipsCode'] not in state_codes:
+                    state_codes.add(state['stateFipsCode'])
+                    yield country_code, state['stateFipsCode'], state
+            country_codes.add(country_code)
+    scanner.expect_end()
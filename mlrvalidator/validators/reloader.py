@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+
+from .result_cache import version_stamp
+
+logger = logging.getLogger(__name__)
+
+
+class ReloadingLocationValidator:
+    '''
+    Validates with a LocationValidator which is replaced when the reference files change. A background thread polls
+    the modification times of the files in reference_dir. Once they have stopped changing, it creates a new
+    validator with factory and then swaps it in by assigning a single attribute. Requests already running finish
+    with the validator they started with and later requests use the new one, so requests never wait for a reload.
+
+    A forked process inherits the validator but not the polling thread. Servers such as gunicorn with --preload
+    create the validator before forking their workers, so with start_on_first_use each process starts its own thread
+    the first time it validates a location.
+    '''
+
+    def __init__(self, factory, reference_dir, interval=60, start_on_first_use=False):
+        '''
+        :param function factory: returns a new LocationValidator using the current reference files
+        :param str reference_dir: directory containing the reference files
+        :param float interval: seconds between polls of reference_dir
+        :param boolean start_on_first_use: if True, polling is started by the first call to validate in each process
+            rather than by calling start
+        '''
+        self.factory = factory
+        self.reference_dir = reference_dir
+        self.interval = interval
+        self.start_on_first_use = start_on_first_use
+        self.reloads = 0
+
+        self._loaded_stamp = version_stamp(reference_dir)
+        self._pending_stamp = None
+        self._failed_stamp = None
+        self._stop = threading.Event()
+        self._thread = None
+        # The process the thread was started in
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+        self.location_validator = factory()
+
+    @property
+    def version(self):
+        return self.location_validator.version
+
+    def validate(self, ddot_location, existing_location, update=False, fail_fast=False):
+        '''
+        :param dict ddot_location:
+        :param dict existing_location:
+        :param boolean update:
+        :param boolean fail_fast:
+        :return: ValidationResult
+        '''
+        if self.start_on_first_use and self._thread_pid != os.getpid():
+            self.start()
+        return self.location_validator.validate(ddot_location, existing_location, update=update, fail_fast=fail_fast)
+
+    def poll(self):
+        '''
+        Reloads the validator if the reference files have changed and were not changed since the previous poll.
+        A reload which fails is logged and is not retried until the files change again.
+        :return: boolean - True if the validator was replaced
+        '''
+        stamp = version_stamp(self.reference_dir)
+        if stamp in (self._loaded_stamp, self._failed_stamp):
+            self._pending_stamp = None
+            return False
+        if stamp != self._pending_stamp:
+            # The files may still be being written, so wait for them to be unchanged at the next poll
+            self._pending_stamp = stamp
+            return False
+
+        self._pending_stamp = None
+        try:
+            location_validator = self.factory()
+        except Exception:
+            logger.exception('Unable to reload the reference files in %s', self.reference_dir)
+            self._failed_stamp = stamp
+            return False
+
+        self.location_validator = location_validator
+        self._loaded_stamp = stamp
+        self.reloads += 1
+        logger.info('Reloaded the reference files in %s', self.reference_dir)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception('Unable to check the reference files in %s', self.reference_dir)
+
+    def start(self):
+        '''
+        Starts polling for changes in a daemon thread unless this process is already polling
+        '''
+        with self._start_lock:
+            pid = os.getpid()
+            if self._thread_pid != pid:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, name='reference-reloader', daemon=True)
+                self._thread.start()
+                self._thread_pid = pid
+
+    def stop(self):
+        with self._start_lock:
+            if self._thread is not None and self._thread_pid == os.getpid():
+                self._stop.set()
+                self._thread.join()
+            self._thread = None
+            self._thread_pid = None
@@ -0,0 +1,131 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import time
+
+from mlrvalidator import metrics
+
+
+def version_stamp(*directories):
+    '''
+    :param str directories: directories containing the schema and reference files
+    :return: str - a stamp which changes when any file in directories is added, removed, or modified
+    '''
+    digest = hashlib.sha256()
+    for directory in directories:
+        for dirpath, dirnames, filenames in sorted(os.walk(directory)):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                stat = os.stat(os.path.join(dirpath, filename))
+                digest.update('{0}:{1}:{2}\n'.format(os.path.relpath(os.path.join(dirpath, filename), directory),
+                                                     stat.st_size, stat.st_mtime_ns).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def fingerprint(ddot_location, existing_location, update, version, fail_fast=False):
+    '''
+    :return: str - sha256 of the canonical JSON of the arguments
+    '''
+    canonical = json.dumps([ddot_location, existing_location, bool(update), version, bool(fail_fast)],
+                           sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ValidationResultCache:
+    '''
+    Thread safe least recently used cache whose entries expire ttl seconds after they were added.
+    '''
+
+    def __init__(self, max_size=1024, ttl=300, clock=time.monotonic):
+        '''
+        :param int max_size: maximum number of entries
+        :param float ttl: seconds an entry is kept. If None, entries do not expire
+        :param function clock: returns the current time in seconds
+        '''
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        '''
+        :param str key:
+        :return: the cached value or None if key is not cached or has expired
+        '''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        expires = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        '''
+        :return: dict - size, hits, misses and evictions
+        '''
+        return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class CachedLocationValidator:
+    '''
+    Returns the cached ValidationResult for a location which has already been validated with the same documents,
+    update and fail fast flags and version of the schema and reference files. Otherwise the location is validated by
+    location_validator. ValidationResults are immutable so they can be shared between requests.
+    '''
+
+    def __init__(self, location_validator, max_size=1024, ttl=300):
+        '''
+        :param LocationValidator location_validator:
+        :param int max_size: maximum number of cached results
+        :param float ttl: seconds a result is cached
+        '''
+        self.location_validator = location_validator
+        self.cache = ValidationResultCache(max_size=max_size, ttl=ttl)
+
+    def validate(self, ddot_location, existing_location, update=False, fail_fast=False):
+        '''
+        :param dict ddot_location:
+        :param dict existing_location:
+        :param boolean update:
+        :param boolean fail_fast:
+        :return: ValidationResult
+        '''
+        key = fingerprint(ddot_location, existing_location, update, self.location_validator.version,
+                          fail_fast=fail_fast)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.location_validator.validate(ddot_location, existing_location, update=update,
+                                                      fail_fast=fail_fast)
+            self.cache.put(key, result)
+            if metrics.is_enabled():
+                metrics.RESULT_CACHE.inc(('miss',))
+        elif metrics.is_enabled():
+            metrics.RESULT_CACHE.inc(('hit',))
+        return result
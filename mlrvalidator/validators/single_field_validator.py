@@ -1,51 +1,188 @@
-
 import datetime
 import os
 import re
 
 from cerberus import Validator
 
-from .reference import ReferenceInfo
+from .coordinates import parse_latitude, parse_longitude
+from .numeric import parse_number
+from .reference import ReferenceLists, reference_registry
+
+
+def load_reference_lists(reference_dir):
+    '''
+    :param str reference_dir: directory containing reference_lists.json
+    :return: ReferenceLists or None if reference_dir is empty
+    '''
+    if not reference_dir:
+        return None
+    return reference_registry.get(ReferenceLists, os.path.join(reference_dir, 'reference_lists.json'))
+
+
+# The checks for the custom rules. Each returns a list of error messages, which is empty if value passes.
+# They are shared by SingleFieldValidator and CompiledSingleFieldValidator so both produce the same messages.
+
+
+def is_numeric(value):
+    # check for numeric value
+    if not value.strip():
+        return True
+
+    return parse_number(value) is not None
+
+
+def is_positive_numeric(value):
+    # check for positive numeric value
+    if not value.strip():
+        return True
+
+    test_num = parse_number(value)
+    if test_num is None or test_num < 0:
+        return False
+    else:
+        return True
+
+
+def check_valid_precision(value):
+    # Check that precision is no more than 2 decimal places
+    error_message = "Invalid Value, decimal precision error"
+    messages = []
+
+    stripped_value = value.strip()
+    test_split = stripped_value.split(".", 1)
+    # there is a decimal, so need to check what's after it
+    if len(test_split) > 1:
+        if test_split[1] == "":
+            messages.append(error_message)
+        else:
+            # Check that only digits 0-9 exist after the decimal
+            test_field = re.search('[^0-9]+', test_split[1])
+            if test_field is not None:
+                # There is something besides digits 0-9 after the decimal
+                messages.append(error_message)
+            if len(test_split[1]) > 2:
+                messages.append(error_message)
+    return messages
+
+
+def check_is_empty(value):
+    # Since the value coming in could consist of spaces, check that a value of only spaces is considered null
+    if not value.strip():
+        return ["Field must contain non whitespace characters"]
+    return []
+
+
+def check_valid_site_number(value):
+    # We are not validation format as specified in http://nwis.usgs.gov/nwisdocs4_3/gw/gwcoding_Sect2-1.pdf,
+    # however, need to ensure that the site number consists of only digits
+    stripped_value = value.rstrip()
+    if stripped_value and not stripped_value.isdigit():
+        return ["Site Number can only have digits 0-9"]
+    return []
+
+
+def check_valid_map_scale_chars(value):
+    # Check that characters other than 0-9 or a blank space do not exist in field
+    test_field = re.search('[^0-9 ]+', value)
+    if test_field is not None:
+        # There is something besides digits 0-9 or space
+        return ["Invalid Character: contains a character other than 0-9"]
+    return []
+
+
+def _check_dms(value, parse):
+    # Check that field consists of valid degrees, minutes and second values
+    if value.rstrip() and parse(value) is None:
+        return ["Invalid Degree/Minute/Second Value"]
+    return []
+
+
+def check_valid_latitude_dms(value):
+    return _check_dms(value, parse_latitude)
+
+
+def check_valid_longitude_dms(value):
+    return _check_dms(value, parse_longitude)
+
+
+def check_valid_date(value):
+    # Check that field is a formatted date of YYYY, YYYYMM or YYYYMMDD
+    error_message = "Invalid Date, should be YYYY, YYYYMM or YYYYMMDD"
+    messages = []
+    stripped_value = value.strip()
+    if stripped_value:
+        # Check for valid full or partial date lengths
+        if len(stripped_value) in [8, 6, 4]:
+            # Check that only digits 0-9 exist in the string
+            test_field = re.search('[^0-9]+', stripped_value)
+            if test_field is None:
+                # There are only digits 0-9 in the string
+                check_year = stripped_value[0:4]
+                check_month = stripped_value[4:6]
+                if not 1582 <= int(check_year) <= int(datetime.date.today().year):
+                    messages.append(error_message)
+                if len(stripped_value) == 8:
+                    try:
+                        datetime.datetime.strptime(stripped_value, '%Y%m%d')
+                    except ValueError:
+                        messages.append(error_message)
+                        return messages
+                if check_month:
+                    if not 1 <= int(check_month) <= 12:
+                        messages.append(error_message)
+
+            else:
+                messages.append(error_message)
+        else:
+            messages.append(error_message)
+    return messages
+
+
+def check_valid_reference(value, ref_list):
+    # Check that value is the list of allowable values
+    stripped_value = value.strip()
+    if stripped_value and stripped_value not in ref_list:
+        return ['{0} is not in reference list'.format(value)]
+    return []
+
+
+def check_valid_single_quotes(value):
+    # String is invalid if it starts with a single quote but does not end with a single quote or
+    # if the string ends with a single quote but does not start with a single quote.
+    if ((value.startswith("'") and not value.endswith("'")) or
+            (not value.startswith("'") and value.endswith("'"))):
+        return ["Missing Quote: may be missing a quote at beginning or ending of the name"]
+    return []
 
 
 class SingleFieldValidator(Validator):
 
     def __init__(self, *args, **kwargs):
         ''''
-        Added keyword argument reference_list which should be an instance of reference.ReferenceInfo
+        Added keyword argument reference_dir which should be the directory containing reference_lists.json, or
+        reference_list, the ReferenceLists already loaded from it
         '''
         self.reference_dir = kwargs.get('reference_dir', {})
+        self.reference_list = kwargs.get('reference_list')
+        self.reference_sets = {}
         super().__init__(*args, **kwargs)
 
-        if self.reference_dir:
-            self.reference_list = ReferenceInfo(os.path.join(self.reference_dir, 'reference_lists.json'))
-
-    def _validate_type_numeric(self, value):
-        # check for numeric value
-        if not value.strip():
-            return True
+        if self.reference_list is None and self.reference_dir:
+            self.reference_list = load_reference_lists(self.reference_dir)
+        if self.reference_list is not None:
+            # Sets of allowed values for the schema fields with the valid_reference rule
+            self.reference_sets = self.reference_list.get_reference_sets(
+                field for field, definitions in (self.schema or {}).items() if definitions.get('valid_reference'))
 
-        try:
-            float(value)
-        except ValueError:
-            return False
+    def _errors_from(self, field, messages):
+        for message in messages:
+            self._error(field, message)
 
-        return True
+    def _validate_type_numeric(self, value):
+        return is_numeric(value)
 
     def _validate_type_positive_numeric(self, value):
-        # check for positive numeric value
-        if not value.strip():
-            return True
-
-        try:
-            test_num = float(value)
-        except ValueError:
-            return False
-
-        if test_num < 0:
-            return False
-        else:
-            return True
+        return is_positive_numeric(value)
 
     def _validate_valid_precision(self, valid_precision, field, value):
         """
@@ -54,22 +191,7 @@ class SingleFieldValidator(Validator):
         The rule's arguments are validated against this schema:
         {'type': 'boolean'}
         """
-        error_message = "Invalid Value, decimal precision error"
-
-        stripped_value = value.strip()
-        test_split = stripped_value.split(".", 1)
-        # there is a decimal, so need to check what's after it
-        if len(test_split) > 1:
-            if test_split[1] == "":
-                self._error(field, error_message)
-            else:
-                # Check that only digits 0-9 exist after the decimal
-                test_field = re.search('[^0-9]+', test_split[1])
-                if test_field is not None:
-                    # There is something besides digits 0-9 after the decimal
-                    self._error(field, error_message)
-                if len(test_split[1]) > 2:
-                    self._error(field, error_message)
+        self._errors_from(field, check_valid_precision(value))
 
     def _validate_is_empty(self, is_empty, field, value):
         """
@@ -79,10 +201,8 @@ class SingleFieldValidator(Validator):
         The rule's arguments are validated against this schema:
         {'type': 'boolean'}
         """
-        stripped_value = value.strip()
         if not is_empty:
-            if not stripped_value:
-                self._error(field, "Field must contain non whitespace characters")
+            self._errors_from(field, check_is_empty(value))
 
     def _validate_valid_site_number(self, valid_site_number, field, value):
         """
@@ -92,10 +212,8 @@ class SingleFieldValidator(Validator):
         The rule's arguments are validated against this schema:
         {'valid_site_number': True}
         """
-        stripped_value = value.rstrip()
-        if valid_site_number and stripped_value:
-            if not stripped_value.isdigit():
-                self._error(field, "Site Number can only have digits 0-9")
+        if valid_site_number:
+            self._errors_from(field, check_valid_site_number(value))
 
     def _validate_valid_map_scale_chars(self, valid_map_scale_chars, field, value):
         """
@@ -105,10 +223,7 @@ class SingleFieldValidator(Validator):
         {'type': 'boolean'}
         """
         if valid_map_scale_chars:
-            test_field = re.search('[^0-9 ]+', value)
-            if test_field is not None:
-                # There is something besides digits 0-9 or space
-                self._error(field, "Invalid Character: contains a character other than 0-9")
+            self._errors_from(field, check_valid_map_scale_chars(value))
 
     def _validate_valid_latitude_dms(self, valid_latitude_dms, field, value):
         # Check that field consists of valid degrees, minutes and second values
@@ -117,43 +232,8 @@ class SingleFieldValidator(Validator):
         The rule's arguments are validated against this schema:
         {'type': 'boolean'}
         """
-        error_message = "Invalid Degree/Minute/Second Value"
-        rstripped_value = value.rstrip()
-
-        def check_100th_seconds(val):
-            try:
-                if val[7] in ["."]:
-                    test_split = val.split(".")
-                    # There is a decimal, but have to check if anything was split from it
-                    if test_split[1] == "":
-                        return False
-                    else:
-                        # Check that only digits 0-9 exist after the decimal
-                        test_field = re.search('[^0-9]+', test_split[1])
-                        if test_field is None:
-                            # There are only digits 0-9 after the decimal
-                            return True
-                        else:
-                            # There is something besides digits 0-9 after the decimal
-                            return False
-                else:
-                    return False
-            except IndexError:
-                return True
-
-        if valid_latitude_dms and rstripped_value:
-            first_val = rstripped_value[0]
-            check_degrees = rstripped_value[1:3]
-            check_minutes = rstripped_value[3:5]
-            check_seconds = rstripped_value[5:7]
-
-            try:
-                if not ((first_val in "- ") and (0 <= int(check_degrees) <= 90) and (
-                        0 <= int(check_minutes) < 60) and (0 <= int(check_seconds) < 60)
-                        and check_100th_seconds(rstripped_value)):
-                    self._error(field, error_message)
-            except ValueError:
-                self._error(field, error_message)
+        if valid_latitude_dms:
+            self._errors_from(field, check_valid_latitude_dms(value))
 
     def _validate_valid_longitude_dms(self, valid_longitude_dms, field, value):
         # Check that field consists of valid degrees, minutes and second values
@@ -162,42 +242,8 @@ class SingleFieldValidator(Validator):
         The rule's arguments are validated against this schema:
         {'type': 'boolean'}
         """
-        error_message = "Invalid Degree/Minute/Second Value"
-        rstripped_value = value.rstrip()
-
-        def check_100th_seconds(val):
-            try:
-                if val[8] in ["."]:
-                    test_split = val.split(".")
-                    # There is a decimal, but have to check if anything was split from it
-                    if test_split[1] == "":
-                        return False
-                    else:
-                        # Check that only digits 0-9 exist after the decimal
-                        test_field = re.search('[^0-9]+', test_split[1])
-                        if test_field is None:
-                            # There are only digits 0-9 after the decimal
-                            return True
-                        else:
-                            # There is something besides digits 0-9 after the decimal
-                            return False
-                else:
-                    return False
-            except IndexError:
-                return True
-
-        if valid_longitude_dms and rstripped_value:
-            first_val = rstripped_value[0]
-            check_degrees = rstripped_value[1:4]
-            check_minutes = rstripped_value[4:6]
-            check_seconds = rstripped_value[6:8]
-            try:
-                if not ((first_val in "- ") and (0 <= int(check_degrees) <= 180) and (
-                        0 <= int(check_minutes) < 60) and (0 <= int(check_seconds) < 60)
-                        and check_100th_seconds(rstripped_value)):
-                    self._error(field, error_message)
-            except ValueError:
-                self._error(field, error_message)
+        if valid_longitude_dms:
+            self._errors_from(field, check_valid_longitude_dms(value))
 
     def _validate_valid_date(self, valid_date, field, value):
         # Check that field is a formatted date of YYYY, YYYYMM or YYYYMMDD
@@ -206,32 +252,8 @@ class SingleFieldValidator(Validator):
         The rule's arguments are validated against this schema:
         {'type': 'boolean'}
         """
-        error_message = "Invalid Date, should be YYYY, YYYYMM or YYYYMMDD"
-        stripped_value = value.strip()
-        if valid_date and stripped_value:
-        # Check for valid full or partial date lengths
-            if len(stripped_value) in [8, 6, 4]:
-                # Check that only digits 0-9 exist in the string
-                test_field = re.search('[^0-9]+', stripped_value)
-                if test_field is None:
-                    # There are only digits 0-9 in the string
-                    check_year = stripped_value[0:4]
-                    check_month = stripped_value[4:6]
-                    if not 1582 <= int(check_year) <= int(datetime.date.today().year):
-                        self._error(field, error_message)
-                    if len(stripped_value) == 8:
-                        try:
-                            valid_date = datetime.datetime.strptime(stripped_value, '%Y%m%d')
-                        except ValueError:
-                            return self._error(field, error_message)
-                    if check_month:
-                        if not 1 <= int(check_month) <= 12:
-                            self._error(field, error_message)
-
-                else:
-                    self._error(field, error_message)
-            else:
-                self._error(field, error_message)
+        if valid_date:
+            self._errors_from(field, check_valid_date(value))
 
     def _validate_valid_reference(self, valid_reference, field, value):
         """
@@ -242,10 +264,10 @@ class SingleFieldValidator(Validator):
         """
 
         if valid_reference and self.reference_list:
-            stripped_value = value.strip()
-            ref_list = self.reference_list.get_reference_info().get(field, [])
-            if stripped_value and stripped_value not in ref_list:
-                return self._error(field, '{0} is not in reference list'.format(value))
+            ref_set = self.reference_sets.get(field)
+            if ref_set is None:
+                ref_set = self.reference_list.get_reference_set(field)
+            self._errors_from(field, check_valid_reference(value, ref_set))
 
     def _validate_valid_single_quotes(self, valid_single_quotes, field, value):
         """
@@ -256,6 +278,43 @@ class SingleFieldValidator(Validator):
         {'type': 'boolean'}
         """
         if valid_single_quotes:
-            if ((value.startswith("'") and not value.endswith("'")) or
-                    (not value.startswith("'") and value.endswith("'"))):
-                self._error(field, "Missing Quote: may be missing a quote at beginning or ending of the name")
+            self._errors_from(field, check_valid_single_quotes(value))
+
+
+class SingleFieldValidatorPool:
+    '''
+    Cerberus keeps the document being validated on the validator instance, so a SingleFieldValidator can't be shared
+    by concurrent requests. The pool lends each call an idle validator, creating another one when all are in use.
+    '''
+
+    def __init__(self, factory, idle=None):
+        '''
+        :param function factory: takes no arguments and returns a new SingleFieldValidator. It is called while a
+            request is being handled when all of the validators are in use, so it should not read the reference
+            files. Pass the ReferenceLists already loaded, for example by the first validator, as reference_list.
+        :param list of SingleFieldValidator idle: validators already created. If None, one is created with factory.
+        '''
+        self._factory = factory
+        self._idle = list(idle) if idle else [factory()]
+
+    def get_errors(self, document, update=False, fail_fast=False):
+        '''
+        :param dict document:
+        :param boolean update: if True, required fields are not checked
+        :param boolean fail_fast: if True, only the errors of the first field in error, by field name, are returned.
+            Cerberus can not stop part way through a document, so every field is still checked.
+        :return: dict - error messages keyed by field. The dictionary will be empty if the document is valid.
+        '''
+        try:
+            validator = self._idle.pop()
+        except IndexError:
+            validator = self._factory()
+        try:
+            validator.validate(document, update=update)
+            errors = validator.errors
+        finally:
+            self._idle.append(validator)
+        if fail_fast and errors:
+            field = min(errors, key=str)
+            return {field: errors[field]}
+        return errors
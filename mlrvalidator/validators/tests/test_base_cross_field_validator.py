@@ -1,23 +1,121 @@
-
 from unittest import TestCase
 
-from ..base_cross_field_validator import BaseCrossFieldValidator
+from ..base_cross_field_validator import BaseCrossFieldValidator, CrossFieldRule, CrossFieldRuleIndex
+from ..check_rank import VALUE_RANK, PARSE_RANK
+from ..validation_context import ValidationContext
+
+
+class RequiredFieldValidator(BaseCrossFieldValidator):
+
+    def _validate_rules(self, context, errors):
+        if not context.get_value('field1'):
+            errors['field1'] = ['field1 is required']
+
 
-class TestAnyFieldsInDocument(TestCase):
+class TestGetErrors(TestCase):
 
     def setUp(self):
-        self.validator = BaseCrossFieldValidator()
+        self.validator = RequiredFieldValidator()
 
-    def test_any_fields(self):
-        self.validator.validate({'field1': 'a', 'field2': 'b', 'field3': 'c'}, {})
-        self.assertTrue(self.validator._any_fields_in_document(['field1', 'field3']))
+    def test_get_errors(self):
+        self.assertEqual(self.validator.get_errors(ValidationContext({'field2': 'b'}, {})), {'field1': ['field1 is required']})
+        self.assertEqual(self.validator.get_errors(ValidationContext({'field2': 'b'}, {'field1': 'a'})), {})
 
+    def test_get_errors_does_not_change_errors(self):
         self.validator.validate({'field1': 'a'}, {})
-        self.assertTrue(self.validator._any_fields_in_document(['field1', 'field3']))
+        self.validator.get_errors(ValidationContext({'field2': 'b'}, {}))
+        self.assertEqual(self.validator.errors, {})
+
+    def test_validate(self):
+        self.assertFalse(self.validator.validate({'field2': 'b'}, {}))
+        self.assertEqual(self.validator.errors, {'field1': ['field1 is required']})
+
+        self.assertTrue(self.validator.validate({'field1': 'a'}, {}))
+        self.assertEqual(self.validator.errors, {})
+
+
+class RuleValidator(BaseCrossFieldValidator):
+
+    RULES = (
+        CrossFieldRule('_validate_required', ['field1', 'field2'], 'field1'),
+        CrossFieldRule('_validate_required', ['field3'], 'field3'),
+        CrossFieldRule('_validate_always', None)
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def _validate_required(self, context, errors, key):
+        self.calls.append(key)
+        if not context.get_value(key):
+            errors[key] = ['{0} is required'.format(key)]
+
+    def _validate_always(self, context, errors):
+        self.calls.append('always')
+
+
+class TestCrossFieldRuleIndex(TestCase):
+
+    def setUp(self):
+        self.index = CrossFieldRuleIndex(RuleValidator.RULES)
+
+    def test_get_rules(self):
+        self.assertEqual(self.index.get_rules(['field3', 'field2']), list(RuleValidator.RULES))
+        self.assertEqual(self.index.get_rules(['field2']), [RuleValidator.RULES[0], RuleValidator.RULES[2]])
+        self.assertEqual(self.index.get_rules(['field4']), [RuleValidator.RULES[2]])
+        self.assertEqual(self.index.get_rules([]), [RuleValidator.RULES[2]])
+
+
+class TestRuleDispatch(TestCase):
+
+    def setUp(self):
+        self.validator = RuleValidator()
+
+    def test_only_rules_for_submitted_fields_run(self):
+        self.assertEqual(self.validator.get_errors(ValidationContext({'field2': 'b'}, {'field3': ''})),
+                         {'field1': ['field1 is required']})
+        self.assertEqual(self.validator.calls, ['field1', 'always'])
+
+    def test_all_rules_run(self):
+        self.assertEqual(self.validator.get_errors(ValidationContext({'field1': 'a', 'field3': ''}, {})),
+                         {'field3': ['field3 is required']})
+        self.assertEqual(self.validator.calls, ['field1', 'field3', 'always'])
+
+
+class RankedRuleValidator(RuleValidator):
+
+    RULES = (
+        CrossFieldRule('_validate_required', ['field1', 'field2'], 'field1', rank=PARSE_RANK),
+        CrossFieldRule('_validate_required', ['field3'], 'field3'),
+        CrossFieldRule('_validate_always', None)
+    )
+
+
+class TestFailFast(TestCase):
+
+    def setUp(self):
+        self.validator = RankedRuleValidator()
+
+    def test_get_rules_of_rank(self):
+        index = CrossFieldRuleIndex(RankedRuleValidator.RULES)
+        self.assertEqual(index.get_rules(['field1', 'field3'], rank=VALUE_RANK),
+                         [RankedRuleValidator.RULES[1], RankedRuleValidator.RULES[2]])
+        self.assertEqual(index.get_rules(['field2'], rank=PARSE_RANK), [RankedRuleValidator.RULES[0]])
+        self.assertEqual(index.get_rules(['field3'], rank=PARSE_RANK), [])
+
+    def test_stops_at_first_error(self):
+        self.assertEqual(self.validator.get_errors(ValidationContext({'field1': '', 'field3': ''}, {}), fail_fast=True),
+                         {'field3': ['field3 is required']})
+        self.assertEqual(self.validator.calls, ['field3'])
 
-        self.validator.validate({'field2': 'a', 'field3': 'c'}, {})
-        self.assertTrue(self.validator._any_fields_in_document(['field1', 'field3']))
+    def test_runs_all_rules_when_valid(self):
+        self.assertEqual(self.validator.get_errors(ValidationContext({'field1': 'a', 'field3': 'c'}, {}), fail_fast=True),
+                         {})
+        self.assertEqual(self.validator.calls, ['field3', 'always', 'field1'])
 
-    def test_all_fields_missing_in_document(self):
-        self.validator.validate({'field2': 'b'}, {'field1': 'a', 'field3': 'b'})
-        self.assertFalse(self.validator._any_fields_in_document(['field1', 'field3']))
+    def test_runs_only_rules_of_rank(self):
+        context = ValidationContext({'field1': '', 'field3': ''}, {})
+        self.assertEqual(self.validator.get_errors(context, fail_fast=True, rank=PARSE_RANK),
+                         {'field1': ['field1 is required']})
+        self.assertEqual(self.validator.calls, ['field1'])
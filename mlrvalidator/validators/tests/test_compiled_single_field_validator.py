@@ -0,0 +1,172 @@
+import os
+import random
+from unittest import TestCase
+
+import yaml
+
+from app import application
+from ..check_rank import VALUE_RANK, PARSE_RANK
+from ..compiled_single_field_validator import CombinedSingleFieldValidator, CompiledSingleFieldValidator
+from ..reference import ReferenceInfo
+from ..single_field_validator import SingleFieldValidator
+
+SCHEMA_DIR = application.config['SCHEMA_DIR']
+REFERENCE_FILE_DIR = application.config['REFERENCE_FILE_DIR']
+
+SAMPLE_VALUES = [
+    '', '   ', 'USGS ', 'USGS', 'XYZ', 'a' * 60, '12345678', '1234567a', ' 1234', '-1.5', '1.234', '1.', '1.2x', '-3',
+    "'Name", "Name'", "'Name'", 'bad#name', 'Good name', ' 453000', ' 4530001.5', '-453000.', '9999999', '-0894530',
+    ' 0894530.12', '-1894530', '2001', '200113', '20010230', '20010228', '1500', '2001x1', 'Y', 'n', 'x', 'AION',
+    'YNX', 'Y N', '1 000', '1a', '99', '  12  ', None
+]
+
+
+def _load_schema(name):
+    with open(os.path.join(SCHEMA_DIR, name)) as fd:
+        return yaml.load(fd.read())
+
+
+class CompiledSingleFieldValidatorTestCase(TestCase):
+
+    def setUp(self):
+        self.reference_info = ReferenceInfo(os.path.join(REFERENCE_FILE_DIR, 'reference_lists.json')).get_reference_info()
+
+    def _sample_value(self, rand, field):
+        ref_list = self.reference_info.get(field)
+        if ref_list and rand.random() < 0.3:
+            return rand.choice(ref_list)
+        return rand.choice(SAMPLE_VALUES)
+
+    def _assert_same_errors(self, schema, allow_unknown=True, documents=400):
+        cerberus_validator = SingleFieldValidator(schema, reference_dir=REFERENCE_FILE_DIR, allow_unknown=allow_unknown)
+        compiled_validator = CompiledSingleFieldValidator(schema, reference_dir=REFERENCE_FILE_DIR,
+                                                          allow_unknown=allow_unknown)
+        self.assertIsNotNone(compiled_validator.plan)
+
+        rand = random.Random(8)
+        fields = sorted(schema) + ['unknownField']
+        for _ in range(documents):
+            document = dict((field, self._sample_value(rand, field)) for field in fields if rand.random() < 0.6)
+            update = rand.random() < 0.5
+
+            cerberus_validator.validate(document, update=update)
+            expected = cerberus_validator.errors
+            actual = compiled_validator.get_errors(document, update=update)
+            self.assertEqual(list(actual.items()), list(expected.items()), msg=document)
+
+    def test_error_schema(self):
+        self._assert_same_errors(_load_schema('error_schema.yml'))
+
+    def test_warning_schema(self):
+        self._assert_same_errors(_load_schema('warning_schema.yml'))
+
+    def test_unknown_fields_not_allowed(self):
+        self._assert_same_errors(_load_schema('error_schema.yml'), allow_unknown=False, documents=50)
+
+    def test_nullable(self):
+        schema = {'a': {'nullable': True, 'maxlength': 2}, 'b': {'maxlength': 2}}
+        validator = CompiledSingleFieldValidator(schema, allow_unknown=True)
+        self.assertEqual(validator.get_errors({'a': None, 'b': None}), {'b': ['null value not allowed']})
+
+    def test_type_error_stops_field_checks(self):
+        schema = {'altitude': {'type': 'numeric', 'maxlength': 3, 'valid_precision': True}}
+        validator = CompiledSingleFieldValidator(schema, allow_unknown=True)
+        self.assertEqual(validator.get_errors({'altitude': '12.345a'}), {'altitude': ['must be of numeric type']})
+        self.assertEqual(validator.get_errors({'altitude': '12.345'}), {
+            'altitude': ['Invalid Value, decimal precision error', 'max length is 3']
+        })
+
+    def test_fail_fast(self):
+        schema = _load_schema('error_schema.yml')
+        validator = CompiledSingleFieldValidator(schema, reference_dir=REFERENCE_FILE_DIR, allow_unknown=True)
+
+        rand = random.Random(10)
+        fields = sorted(schema) + ['unknownField']
+        for _ in range(200):
+            document = dict((field, self._sample_value(rand, field)) for field in fields if rand.random() < 0.6)
+            update = rand.random() < 0.5
+
+            expected = validator.get_errors(document, update=update)
+            actual = validator.get_errors(document, update=update, fail_fast=True)
+            self.assertEqual(bool(actual), bool(expected), msg=document)
+            self.assertLessEqual(len(actual), 1)
+            # A field's checks of a lower rank can find errors before those of a higher rank are run
+            for field, messages in actual.items():
+                self.assertLessEqual(set(messages), set(expected[field]), msg=document)
+
+    def test_fail_fast_checks_required_fields_first(self):
+        validator = CompiledSingleFieldValidator({'a': {'maxlength': 2}, 'b': {'required': True}}, allow_unknown=True)
+        self.assertEqual(validator.get_errors({'a': 'abc'}, fail_fast=True), {'b': ['required field']})
+        self.assertEqual(validator.get_errors({'a': 'abc'}, update=True, fail_fast=True), {'a': ['max length is 2']})
+
+    def test_fail_fast_checks_lower_ranks_first(self):
+        validator = CompiledSingleFieldValidator({'a': {'regex': '[0-9]*'}, 'b': {'maxlength': 2}}, allow_unknown=True)
+        document = {'a': 'x', 'b': 'abc'}
+        self.assertEqual(validator.get_errors(document, fail_fast=True), {'b': ['max length is 2']})
+        self.assertEqual(validator.get_errors(document, fail_fast=True, rank=VALUE_RANK), {'b': ['max length is 2']})
+        self.assertEqual(validator.get_errors(document, fail_fast=True, rank=PARSE_RANK),
+                         {'a': ["value does not match regex '[0-9]*'"]})
+
+    def test_fail_fast_checks_typed_field_at_type_rank(self):
+        validator = CompiledSingleFieldValidator({'a': {'type': 'numeric', 'maxlength': 2}}, allow_unknown=True)
+        self.assertEqual(validator.get_errors({'a': '123'}, fail_fast=True, rank=VALUE_RANK), {})
+        self.assertEqual(validator.get_errors({'a': '123'}, fail_fast=True, rank=PARSE_RANK),
+                         {'a': ['max length is 2']})
+        self.assertEqual(validator.get_errors({'a': '1x'}, fail_fast=True), {'a': ['must be of numeric type']})
+
+    def test_fail_fast_uses_cerberus_once(self):
+        validator = CompiledSingleFieldValidator({'a': {'maxlength': 2}}, allow_unknown=True)
+        self.assertEqual(validator.get_errors({'a': [1, 2, 3]}, fail_fast=True, rank=VALUE_RANK), {})
+        self.assertEqual(validator.get_errors({'a': [1, 2, 3]}, fail_fast=True, rank=PARSE_RANK),
+                         {'a': ['max length is 2']})
+        self.assertEqual(validator.get_errors({'a': [1, 2, 3]}, fail_fast=True), {'a': ['max length is 2']})
+
+    def test_non_string_values_use_cerberus(self):
+        schema = {'a': {'maxlength': 2}}
+        validator = CompiledSingleFieldValidator(schema, allow_unknown=True)
+        self.assertEqual(validator.get_errors({'a': [1, 2, 3]}), {'a': ['max length is 2']})
+        self.assertEqual(validator.get_errors({'a': 'abc', 'unknown': 3}), {'a': ['max length is 2']})
+
+    def test_unsupported_rule_uses_cerberus(self):
+        schema = {'a': {'minlength': 2}}
+        validator = CompiledSingleFieldValidator(schema, allow_unknown=True)
+        self.assertIsNone(validator.plan)
+        self.assertEqual(validator.get_errors({'a': 'b'}), {'a': ['min length is 2']})
+
+
+class CombinedSingleFieldValidatorTestCase(TestCase):
+
+    def setUp(self):
+        self.error_validator = CompiledSingleFieldValidator(_load_schema('error_schema.yml'),
+                                                            reference_dir=REFERENCE_FILE_DIR, allow_unknown=False)
+        self.warning_validator = CompiledSingleFieldValidator(_load_schema('warning_schema.yml'),
+                                                              reference_dir=REFERENCE_FILE_DIR, allow_unknown=True)
+        self.validator = CombinedSingleFieldValidator([self.error_validator, self.warning_validator])
+
+    def test_same_as_separate_validators(self):
+        rand = random.Random(10)
+        fields = sorted(set(self.error_validator.plan) | set(self.warning_validator.plan)) + ['unknownField']
+        for _ in range(200):
+            document = dict((field, rand.choice(SAMPLE_VALUES)) for field in fields if rand.random() < 0.6)
+            update = rand.random() < 0.5
+
+            errors, warnings = self.validator.get_errors(document, update=update)
+            self.assertEqual(list(errors.items()),
+                             list(self.error_validator.get_errors(document, update=update).items()), msg=document)
+            self.assertEqual(list(warnings.items()),
+                             list(self.warning_validator.get_errors(document, update=update).items()), msg=document)
+
+    def test_non_string_values_use_each_validator(self):
+        validator = CombinedSingleFieldValidator([
+            CompiledSingleFieldValidator({'a': {'maxlength': 2}}, allow_unknown=True),
+            CompiledSingleFieldValidator({'a': {'maxlength': 1}}, allow_unknown=True)
+        ])
+        self.assertEqual(validator.get_errors({'a': [1, 2, 3]}), [{'a': ['max length is 2']}, {'a': ['max length is 1']}])
+
+    def test_unsupported_rule_uses_each_validator(self):
+        validator = CombinedSingleFieldValidator([
+            CompiledSingleFieldValidator({'a': {'minlength': 2}}, allow_unknown=True),
+            CompiledSingleFieldValidator({'a': {'maxlength': 1}}, allow_unknown=True)
+        ])
+        self.assertIsNone(validator.plan)
+        self.assertEqual(validator.get_errors({'a': 'bc'}), [{}, {'a': ['max length is 1']}])
@@ -0,0 +1,102 @@
+from unittest import TestCase
+
+from ..coordinates import in_range, parse_dms, parse_latitude, parse_longitude, parse_range, parse_reference_dms
+
+
+class ParseDmsTestCase(TestCase):
+
+    def test_latitude(self):
+        self.assertEqual(parse_latitude(' 453015'), ((45 * 60 + 30) * 60 + 15) * 100)
+        self.assertEqual(parse_latitude('-453015'), -((45 * 60 + 30) * 60 + 15) * 100)
+        self.assertEqual(parse_latitude(' 000000'), 0)
+        self.assertEqual(parse_latitude(' 900000'), 90 * 3600 * 100)
+
+    def test_longitude(self):
+        self.assertEqual(parse_longitude(' 1453015'), ((145 * 60 + 30) * 60 + 15) * 100)
+        self.assertEqual(parse_longitude('-1800000'), -180 * 3600 * 100)
+
+    def test_decimal_seconds(self):
+        self.assertEqual(parse_latitude(' 000001.5'), 150)
+        self.assertEqual(parse_latitude(' 000001.25'), 125)
+        self.assertEqual(parse_latitude(' 000001.259'), 125)
+
+    def test_trailing_spaces(self):
+        self.assertEqual(parse_latitude(' 000001  '), 100)
+
+    def test_blank(self):
+        self.assertIsNone(parse_latitude(''))
+        self.assertIsNone(parse_latitude('   '))
+
+    def test_invalid(self):
+        self.assertIsNone(parse_latitude('453015'))
+        self.assertIsNone(parse_latitude('+453015'))
+        self.assertIsNone(parse_latitude(' 913015'))
+        self.assertIsNone(parse_latitude(' 456015'))
+        self.assertIsNone(parse_latitude(' 453060'))
+        self.assertIsNone(parse_latitude(' 4530'))
+        self.assertIsNone(parse_latitude(' 4530A5'))
+        self.assertIsNone(parse_latitude(' 453015.'))
+        self.assertIsNone(parse_latitude(' 453015,5'))
+        self.assertIsNone(parse_latitude(' 453015.5A'))
+        self.assertIsNone(parse_longitude(' 1810000'))
+
+    def test_degree_digits(self):
+        self.assertEqual(parse_dms(' 1000000', 3, 180), 100 * 3600 * 100)
+        self.assertIsNone(parse_dms(' 1000000', 3, 90))
+
+
+class ParseReferenceDmsTestCase(TestCase):
+
+    def test_valid(self):
+        self.assertEqual(parse_reference_dms('453015', 2), ((45 * 60 + 30) * 60 + 15) * 100)
+        self.assertEqual(parse_reference_dms('-0745800', 3), -(74 * 60 + 58) * 60 * 100)
+        self.assertEqual(parse_reference_dms(' 0745800 ', 3), (74 * 60 + 58) * 60 * 100)
+
+    def test_invalid(self):
+        self.assertIsNone(parse_reference_dms(None, 2))
+        self.assertIsNone(parse_reference_dms('', 2))
+        self.assertIsNone(parse_reference_dms('45301', 2))
+        self.assertIsNone(parse_reference_dms('0745800', 2))
+        self.assertIsNone(parse_reference_dms('45301A', 2))
+
+
+class ParseRangeTestCase(TestCase):
+
+    def test_range(self):
+        attributes = {'min': '-0745800', 'max': '-0605000'}
+        self.assertEqual(parse_range(attributes, 'min', 'max', 3),
+                         (parse_reference_dms('-0745800', 3), parse_reference_dms('-0605000', 3)))
+
+    def test_swapped_bounds(self):
+        self.assertEqual(parse_range({'min': '-600000', 'max': '-900000'}, 'min', 'max', 2),
+                         (parse_reference_dms('-900000', 2), parse_reference_dms('-600000', 2)))
+        self.assertEqual(parse_range({'min': '344045', 'max': '343515'}, 'min', 'max', 2),
+                         (parse_reference_dms('343515', 2), parse_reference_dms('344045', 2)))
+
+    def test_range_crossing_180th_meridian(self):
+        self.assertEqual(parse_range({'min': '1295846', 'max': '-1722655'}, 'min', 'max', 3),
+                         (parse_reference_dms('1295846', 3), parse_reference_dms('-1722655', 3)))
+
+    def test_missing_bound(self):
+        self.assertIsNone(parse_range({'min': '453015'}, 'min', 'max', 2))
+        self.assertIsNone(parse_range({'min': '453015', 'max': ''}, 'min', 'max', 2))
+
+    def test_in_range(self):
+        value_range = parse_range({'min': '-0745800', 'max': '-0605000'}, 'min', 'max', 3)
+        self.assertTrue(in_range(parse_longitude('-0745800'), value_range))
+        self.assertTrue(in_range(parse_longitude('-0700000'), value_range))
+        self.assertFalse(in_range(parse_longitude('-0605000'), value_range))
+        self.assertFalse(in_range(parse_longitude('-0800000'), value_range))
+        self.assertFalse(in_range(parse_longitude(' 07000'), value_range))
+
+    def test_in_swapped_range(self):
+        value_range = parse_range({'min': '-600000', 'max': '-900000'}, 'min', 'max', 2)
+        self.assertTrue(in_range(parse_latitude('-750000'), value_range))
+        self.assertFalse(in_range(parse_latitude('-500000'), value_range))
+
+    def test_in_range_crossing_180th_meridian(self):
+        value_range = parse_range({'min': '1295846', 'max': '-1722655'}, 'min', 'max', 3)
+        self.assertTrue(in_range(parse_longitude(' 1500000'), value_range))
+        self.assertTrue(in_range(parse_longitude('-1750000'), value_range))
+        self.assertFalse(in_range(parse_longitude('-1700000'), value_range))
+        self.assertFalse(in_range(parse_longitude(' 1000000'), value_range))
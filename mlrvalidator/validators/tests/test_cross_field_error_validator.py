@@ -199,6 +199,7 @@ class DepthsTestCase(TestCase):
         self.assertTrue(self.validator.validate({'holeDepth': '11234'}, {}))
         self.assertTrue(self.validator.validate({'holeDepth': ' '}, {'wellDepth': ' ', }))
         self.assertTrue(self.validator.validate({'wellDepth': '1234'}, {'holeDepth': 'A'}))
+        self.assertTrue(self.validator.validate({'wellDepth': '1234'}, {'holeDepth': None}))
 
     def test_invalid_depths(self):
         self.assertFalse(self.validator.validate({'wellDepth': '11234', 'holeDepth': '1234'}, {}))
@@ -3,37 +3,41 @@ import json
 import unittest
 from unittest import TestCase, mock, skip
 
+from app import application
 from ..cross_field_ref_error_validator import CrossFieldRefErrorValidator
 
 
 class CrossFieldRefValidatorAllValidatorsTestCase(TestCase):
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.CountryStateReferenceValidator')
+    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.GeographyIndex')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.NationalWaterUseCodes')
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.States')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.SiteTypesCrossField')
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.Counties')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.LandNetCrossField')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.SiteNumberFormat')
-    def setUp(self, mcounties_ref, msite_type_ref, mstates_ref, mwater_use_ref, mland_net_ref, msite_number_ref, mref_validator_class):
-        mref_validator = mref_validator_class.return_value
-        mref_validator.validate.return_value = False
-        mref_validator.errors = {'field1' : ['Error message']}
+    def setUp(self, msite_number_ref, mland_net_ref, msite_type_ref, mwater_use_ref, mgeography_ref):
+        mgeography = mgeography_ref.return_value
+        mgeography.get_state_code_set.return_value = frozenset(['01'])
+        mgeography.get_state.return_value.aquifer_codes = frozenset()
+        mgeography.get_state.return_value.hydrologic_unit_codes = frozenset()
+        mgeography.get_state.return_value.national_aquifer_codes = frozenset()
         self.validator = CrossFieldRefErrorValidator('ref_dir')
 
     def test_multiple_error(self):
-        self.assertFalse(self.validator.validate({'dummyfield': 'A'}, {}))
-        self.assertEqual(len(self.validator.errors), 1)
+        self.assertFalse(self.validator.validate({'countryCode': 'US', 'stateFipsCode': '01', 'aquiferCode': 'A',
+                                                  'hydrologicUnitCode': 'B', 'nationalAquiferCode': 'C'}, {}))
+        self.assertEqual(list(self.validator.errors), ['aquiferCode', 'hydrologicUnitCode', 'nationalAquiferCode'])
+
+    def test_huc_99999999_is_allowed(self):
+        self.assertTrue(self.validator.validate({'countryCode': 'US', 'stateFipsCode': '01',
+                                                 'hydrologicUnitCode': '99999999'}, {}))
 
 
 class CrossFieldRefValidatorForCountiesTestCase(TestCase):
 
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.CountryStateReferenceValidator')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.NationalWaterUseCodes')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.SiteTypesCrossField')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.LandNetCrossField')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.SiteNumberFormat')
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.States')
-    def setUp(self, mstates_ref, msite_type_ref, mland_net_ref, msite_number_ref, mwater_use_ref, mref_validator_class):
+    def setUp(self, msite_number_ref, mland_net_ref, msite_type_ref, mwater_use_ref):
         ref_list = {
             "countries": [
                 {
@@ -97,13 +101,11 @@ class CrossFieldRefValidatorForCountiesTestCase(TestCase):
             ]
         }
 
-        mref_validator = mref_validator_class.return_value
-        mref_validator.validate.return_value = True
-        mref_validator.errors = []
-
         with mock.patch('mlrvalidator.validators.reference.open',
                         mock.mock_open(read_data=json.dumps(ref_list))):
             self.validator = CrossFieldRefErrorValidator('ref_dir')
+        # None of the states in these tests are in the state reference list
+        self.validator.geography_ref.get_state_code_set = mock.Mock(return_value=frozenset(['01']))
 
     def test_county_not_in_list(self):
         self.assertFalse(self.validator.validate({'countryCode': 'CA', 'stateFipsCode' : '90', 'countyCode': '002'}, {}))
@@ -131,12 +133,10 @@ class CrossFieldRefValidatorForCountiesTestCase(TestCase):
 
 class CrossFieldRefValidatorForMCDsTestCase(TestCase):
 
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.CountryStateReferenceValidator')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.NationalWaterUseCodes')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.SiteTypesCrossField')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.LandNetCrossField')
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.States')
-    def setUp(self, mstates_ref, msite_type_ref, mland_net_ref, mwater_use_ref, mref_validator_class):
+    def setUp(self, mland_net_ref, msite_type_ref, mwater_use_ref):
         ref_list = {
             "countries": [
                 {
@@ -174,10 +174,6 @@ class CrossFieldRefValidatorForMCDsTestCase(TestCase):
             ]
         }
 
-        mref_validator = mref_validator_class.return_value
-        mref_validator.validate.return_value = True
-        mref_validator.errors = []
-
         with mock.patch('mlrvalidator.validators.reference.open',
                         mock.mock_open(read_data=json.dumps(ref_list))):
             self.validator = CrossFieldRefErrorValidator('ref_dir')
@@ -225,12 +221,10 @@ class CrossFieldRefValidatorForMCDsTestCase(TestCase):
 
 
 class CrossFieldRefValidatorForCountiesTestCase(TestCase):
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.CountryStateReferenceValidator')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.NationalWaterUseCodes')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.SiteTypesCrossField')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.LandNetCrossField')
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.States')
-    def setUp(self, mstates_ref, msite_type_ref, mland_net_ref, mwater_use_ref, mref_validator_class):
+    def setUp(self, mland_net_ref, msite_type_ref, mwater_use_ref):
         ref_list = {
             "countries": [
                 {
@@ -294,13 +288,11 @@ class CrossFieldRefValidatorForCountiesTestCase(TestCase):
             ]
         }
 
-        mref_validator = mref_validator_class.return_value
-        mref_validator.validate.return_value = True
-        mref_validator.errors = []
-
         with mock.patch('mlrvalidator.validators.reference.open',
                         mock.mock_open(read_data=json.dumps(ref_list))):
             self.validator = CrossFieldRefErrorValidator('ref_dir')
+        # None of the states in these tests are in the state reference list
+        self.validator.geography_ref.get_state_code_set = mock.Mock(return_value=frozenset(['01']))
 
     def test_county_not_in_list(self):
         self.assertFalse(self.validator.validate({'countryCode': 'CA', 'stateFipsCode' : '90', 'countyCode': '002'}, {}))
@@ -328,12 +320,10 @@ class CrossFieldRefValidatorForCountiesTestCase(TestCase):
 
 class CrossFieldRefValidatorForStatesTestCase(TestCase):
 
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.CountryStateReferenceValidator')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.NationalWaterUseCodes')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.SiteTypesCrossField')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.LandNetCrossField')
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.Counties')
-    def setUp(self, mcounties_ref, msite_type_ref, mland_net_ref, mwater_use_ref, mref_validator_class):
+    def setUp(self, mland_net_ref, msite_type_ref, mwater_use_ref):
         ref_list = {
             "countries": [
                 {
@@ -375,9 +365,6 @@ class CrossFieldRefValidatorForStatesTestCase(TestCase):
                 }
             ]
         }
-        mref_validator = mref_validator_class.return_value
-        mref_validator.validate.return_value = True
-        mref_validator.errors = []
 
         with mock.patch('mlrvalidator.validators.reference.open',
                         mock.mock_open(read_data=json.dumps(ref_list))):
@@ -435,6 +422,15 @@ class CrossFieldRefValidatorForStatesTestCase(TestCase):
     def test_missing_reference_latitude_range(self):
         self.assertTrue(self.validator.validate({'latitude': ' 310000'}, {'stateFipsCode': '01', 'countryCode': 'CN'}))
 
+    def test_invalid_existing_latitude_is_out_of_range(self):
+        for latitude in (' 995960', ' 4330'):
+            self.assertFalse(self.validator.validate({'countryCode': 'US', 'stateFipsCode': '01'},
+                                                     {'countryCode': 'US', 'stateFipsCode': '00', 'latitude': latitude}))
+            self.assertEqual(self.validator.errors, {'latitude': ['Latitude is out of range for state 01']})
+
+    def test_blank_latitude_is_not_range_checked(self):
+        self.assertTrue(self.validator.validate({'stateFipsCode': '01'}, {'countryCode': 'US', 'latitude': '  '}))
+
     def test_valid_longitude_range(self):
         self.assertTrue(self.validator.validate({'longitude': ' 0850000'}, {'stateFipsCode': '01', 'countryCode': 'US'}))
 
@@ -448,14 +444,18 @@ class CrossFieldRefValidatorForStatesTestCase(TestCase):
     def test_missing_reference_for_longitude_range(self):
         self.assertTrue(self.validator.validate({'longitude': ' 0850000'}, {'stateFipsCode': '01', 'countryCode': 'CN'}))
 
+    def test_invalid_existing_longitude_is_out_of_range(self):
+        for longitude in (' 0995960', ' 04330'):
+            self.assertFalse(self.validator.validate({'countryCode': 'US', 'stateFipsCode': '01'},
+                                                     {'countryCode': 'US', 'stateFipsCode': '00', 'longitude': longitude}))
+            self.assertEqual(self.validator.errors, {'longitude': ['Longitude is out of range for state 01']})
+
 
 
 class CrossFieldRefValidatorForNationalWaterUseTestCase(TestCase):
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.CountryStateReferenceValidator')
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.States')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.LandNetCrossField')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.SiteTypesCrossField')
-    def setUp(self, m_site_type_ref, mland_net_ref, mstates_ref, mref_validator_class):
+    def setUp(self, msite_type_ref, mland_net_ref):
         ref_list = {
             "siteTypeCodes": [
                 {
@@ -467,9 +467,6 @@ class CrossFieldRefValidatorForNationalWaterUseTestCase(TestCase):
                 }
             ]
         }
-        mref_validator = mref_validator_class.return_value
-        mref_validator.validate.return_value = True
-        mref_validator.errors = []
 
         with mock.patch('mlrvalidator.validators.reference.open',
                         mock.mock_open(read_data=json.dumps(ref_list))):
@@ -499,11 +496,9 @@ class CrossFieldRefValidatorForNationalWaterUseTestCase(TestCase):
 
 
 class CrossFieldValidatorSiteTypeFieldTestCase(TestCase):
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.CountryStateReferenceValidator')
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.States')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.LandNetCrossField')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.NationalWaterUseCodes')
-    def setUp(self, mwater_use_ref, mland_net_ref, mstates_ref, mref_validator_class):
+    def setUp(self, mwater_use_ref, mland_net_ref):
         ref_list = {
             "siteTypeCodes": [
                 {
@@ -517,9 +512,6 @@ class CrossFieldValidatorSiteTypeFieldTestCase(TestCase):
                 }
             ]
         }
-        mref_validator = mref_validator_class.return_value
-        mref_validator.validate.return_value = True
-        mref_validator.errors = []
 
         with mock.patch('mlrvalidator.validators.reference.open',
                         mock.mock_open(read_data=json.dumps(ref_list))):
@@ -543,15 +535,18 @@ class CrossFieldValidatorSiteTypeFieldTestCase(TestCase):
         self.assertTrue(self.validator.validate({'siteTypeCode': 'A', 'field1' : 'A'}, {}))
         self.assertTrue(self.validator.validate({'siteTypeCode': 'A', 'field1': '   '}, {}))
 
+    def test_update_of_attribute_only(self):
+        self.assertFalse(self.validator.validate({'field1': 'B'}, {'siteTypeCode': 'AS'}))
+        self.assertEqual(self.validator.errors,
+                         {'siteTypeCode': ['Site type AS must have the following attributes null: field1']})
+        self.assertTrue(self.validator.validate({'field4': 'B'}, {'siteTypeCode': 'AS'}))
+
 
 @unittest.skip("not validating land net")
 class CrossFieldValidatorLandNetTestCase(TestCase):
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.CountryStateReferenceValidator')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.NationalWaterUseCodes')
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.States')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.SiteTypesCrossField')
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.Counties')
-    def setUp(self, mcounties_ref, msite_type_ref, mstates_ref, mwater_use_ref, mref_validator_class):
+    def setUp(self, msite_type_ref, mwater_use_ref):
         ref_list = {
                 "landNetTemplates": [
                     {
@@ -560,9 +555,6 @@ class CrossFieldValidatorLandNetTestCase(TestCase):
                     }
                     ]
                 }
-        mref_validator = mref_validator_class.return_value
-        mref_validator.validate.return_value = True
-        mref_validator.errors = []
 
         with mock.patch('mlrvalidator.validators.reference.open',
                         mock.mock_open(read_data=json.dumps(ref_list))):
@@ -606,12 +598,10 @@ class CrossFieldValidatorLandNetTestCase(TestCase):
 
 
 class CrossFieldValidatorSiteNumberFieldTestCase(TestCase):
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.CountryStateReferenceValidator')
-    @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.States')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.LandNetCrossField')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.SiteTypesCrossField')
     @mock.patch('mlrvalidator.validators.cross_field_ref_error_validator.NationalWaterUseCodes')
-    def setUp(self, mwater_use_ref, mland_net_ref, msite_type_ref, mstates_ref, mref_validator_class):
+    def setUp(self, mwater_use_ref, msite_type_ref, mland_net_ref):
         ref_list = {
             "siteNumberFormatCodes": [
             {
@@ -640,9 +630,6 @@ class CrossFieldValidatorSiteNumberFieldTestCase(TestCase):
             }
             ]
         }
-        mref_validator = mref_validator_class.return_value
-        mref_validator.validate.return_value = True
-        mref_validator.errors = []
 
         with mock.patch('mlrvalidator.validators.reference.open',
                         mock.mock_open(read_data=json.dumps(ref_list))):
@@ -705,3 +692,22 @@ class CrossFieldValidatorSiteNumberFieldTestCase(TestCase):
     def test_site_number_llwu_wrong_first_digit_invalid(self):
         self.assertFalse(self.validator.validate({'siteTypeCode': 'FA-CI', 'siteNumber': '087654321098'}, {}))
 
+
+class CrossFieldRefValidatorReferenceRangesTestCase(TestCase):
+    '''
+    Range checks against the bounds in the bundled reference files, some of which are listed in the wrong order
+    '''
+
+    def setUp(self):
+        self.validator = CrossFieldRefErrorValidator(application.config['REFERENCE_FILE_DIR'])
+
+    def test_swapped_latitude_bounds(self):
+        self.assertTrue(self.validator.validate({'countryCode': 'AY', 'stateFipsCode': '00', 'latitude': '-750000'}, {}))
+        self.assertTrue(self.validator.validate({'countryCode': 'CI', 'stateFipsCode': '00', 'latitude': '-600000'}, {}))
+        self.assertFalse(self.validator.validate({'countryCode': 'CI', 'stateFipsCode': '00', 'latitude': '-500000'}, {}))
+        self.assertEqual(self.validator.errors, {'latitude': ['Latitude is out of range for state 00']})
+
+    def test_longitude_bounds_crossing_180th_meridian(self):
+        self.assertTrue(self.validator.validate({'countryCode': 'US', 'stateFipsCode': '02', 'longitude': ' 1500000'}, {}))
+        self.assertTrue(self.validator.validate({'countryCode': 'US', 'stateFipsCode': '02', 'longitude': '-1750000'}, {}))
+        self.assertFalse(self.validator.validate({'countryCode': 'US', 'stateFipsCode': '02', 'longitude': ' 1000000'}, {}))
@@ -3,12 +3,12 @@ import json
 
 from unittest import TestCase, mock
 
+from app import application
 from ..cross_field_ref_warning_validator import CrossFieldRefWarningValidator
 
 
 class CrossFieldRefWarningCountyLatitudeTestCase(TestCase):
-    @mock.patch('mlrvalidator.validators.cross_field_ref_warning_validator.States')
-    def setUp(self, mstates_ref):
+    def setUp(self):
         ref_list = ref_list = {
             "countries": [
                 {
@@ -88,10 +88,19 @@ class CrossFieldRefWarningCountyLatitudeTestCase(TestCase):
     def test_missing_reference(self):
             self.assertTrue(self.validator.validate({'countryCode': 'CA', 'stateFipsCode': '90', 'countyCode': '010', 'latitude': ' 300000'}, {}))
 
+    def test_invalid_existing_latitude_is_out_of_range(self):
+        for latitude in (' 995960', ' 4330'):
+            self.assertFalse(self.validator.validate({'countryCode': 'CA', 'stateFipsCode': '90', 'countyCode': '001'},
+                                                     {'latitude': latitude}))
+            self.assertEqual(self.validator.errors, {'latitude': ['Latitude is out of range for county 001']})
+
+    def test_blank_latitude_is_not_range_checked(self):
+        self.assertTrue(self.validator.validate({'countryCode': 'CA', 'stateFipsCode': '90', 'countyCode': '001'},
+                                                {'latitude': '   '}))
+
 
 class CrossFieldRefWarningCountyLongitudeTestCase(TestCase):
-    @mock.patch('mlrvalidator.validators.cross_field_ref_warning_validator.States')
-    def setUp(self, mstates_ref):
+    def setUp(self):
         ref_list = ref_list = {
             "countries": [
                 {
@@ -171,6 +180,26 @@ class CrossFieldRefWarningCountyLongitudeTestCase(TestCase):
     def test_invalid_latitude_range(self):
         self.assertFalse(self.validator.validate({'countryCode': 'CA', 'stateFipsCode': '90', 'countyCode': '001', 'longitude': ' 0100000'}, {}))
 
+    def test_negative_longitude_range(self):
+        self.assertTrue(self.validator.validate({'countryCode': 'AF', 'stateFipsCode': '00', 'countyCode': '000', 'longitude': '-0700000'}, {}))
+        self.assertTrue(self.validator.validate({'countryCode': 'AF', 'stateFipsCode': '00', 'countyCode': '000', 'longitude': '-0745800'}, {}))
+        self.assertFalse(self.validator.validate({'countryCode': 'AF', 'stateFipsCode': '00', 'countyCode': '000', 'longitude': '-0800000'}, {}))
+        self.assertFalse(self.validator.validate({'countryCode': 'AF', 'stateFipsCode': '00', 'countyCode': '000', 'longitude': '-0605000'}, {}))
+
+    def test_decimal_seconds_longitude_range(self):
+        self.assertTrue(self.validator.validate({'countryCode': 'CA', 'stateFipsCode': '90', 'countyCode': '001', 'longitude': ' 0553000.5'}, {}))
+        self.assertFalse(self.validator.validate({'countryCode': 'CA', 'stateFipsCode': '90', 'countyCode': '001', 'longitude': ' 0552959.99'}, {}))
+
+    def test_invalid_dms_longitude_is_out_of_range(self):
+        self.assertFalse(self.validator.validate({'countryCode': 'CA', 'stateFipsCode': '90', 'countyCode': '001', 'longitude': ' 0105960'}, {}))
+        self.assertEqual(self.validator.errors, {'longitude': ['Longitude is out of range for county 001']})
+
+    def test_invalid_existing_longitude_is_out_of_range(self):
+        for longitude in (' 0995960', ' 04330'):
+            self.assertFalse(self.validator.validate({'countryCode': 'CA', 'stateFipsCode': '90', 'countyCode': '001'},
+                                                     {'longitude': longitude}))
+            self.assertEqual(self.validator.errors, {'longitude': ['Longitude is out of range for county 001']})
+
 
 
 class CrossFieldRefWarningAltitudeTestCase(TestCase):
@@ -273,3 +302,21 @@ class CrossFieldRefWarningUseCodeTestCase(TestCase):
             self.assertFalse(self.validator.validate({sites[0]: 'A', sites[1]: 'A', sites[2]: 'C'}, {}))
             self.assertFalse(self.validator.validate({sites[0]: 'A', sites[1]: 'B', sites[2]: 'A'}, {}))
             self.assertFalse(self.validator.validate({sites[0]: 'A', sites[1]: 'B', sites[2]: 'B'}, {}))
+
+
+class CrossFieldRefWarningReferenceRangesTestCase(TestCase):
+    '''
+    Range checks against the bounds in the bundled reference files, some of which are listed in the wrong order
+    '''
+
+    def setUp(self):
+        self.validator = CrossFieldRefWarningValidator(application.config['REFERENCE_FILE_DIR'])
+
+    def test_swapped_latitude_bounds(self):
+        self.assertTrue(self.validator.validate(
+            {'countryCode': 'AY', 'stateFipsCode': '00', 'countyCode': '000', 'latitude': '-750000'}, {}))
+        self.assertTrue(self.validator.validate(
+            {'countryCode': 'CI', 'stateFipsCode': '00', 'countyCode': '000', 'latitude': '-600000'}, {}))
+        self.assertFalse(self.validator.validate(
+            {'countryCode': 'CI', 'stateFipsCode': '00', 'countyCode': '000', 'latitude': '-500000'}, {}))
+        self.assertEqual(self.validator.errors, {'latitude': ['Latitude is out of range for county 000']})
@@ -15,13 +15,9 @@ class ErrorValidatorErrorsTestCase(TestCase):
         mref = mref_class.return_value
         mcross = mcross_class.return_value
         msingle_field = msingle_field_class.return_value
-
-        mtran.validate.return_value = True
-        mtran.errors = {}
-        mref.validate.return_value = True
-        mref.errors = {}
-        mcross.validate.return_value = True
-        mcross.errors = {}
+        mtran.get_errors.return_value = {}
+        mref.get_errors.return_value = {}
+        mcross.get_errors.return_value = {}
         msingle_field.validate.return_value = True
         msingle_field.errors = {}
 
@@ -39,13 +35,9 @@ class ErrorValidatorErrorsTestCase(TestCase):
         mref = mref_class.return_value
         mcross = mcross_class.return_value
         msingle_field = msingle_field_class.return_value
-
-        mtran.validate.return_value = True
-        mtran.errors = {}
-        mref.validate.return_value = True
-        mref.errors = {}
-        mcross.validate.return_value = True
-        mcross.errors = {}
+        mtran.get_errors.return_value = {}
+        mref.get_errors.return_value = {}
+        mcross.get_errors.return_value = {}
         msingle_field.validate.return_value = False
         msingle_field.errors = {'A' : ['Invalid']}
 
@@ -65,13 +57,9 @@ class ErrorValidatorErrorsTestCase(TestCase):
         mref = mref_class.return_value
         mcross = mcross_class.return_value
         msingle_field = msingle_field_class.return_value
-
-        mtran.validate.return_value = True
-        mtran.errors = {}
-        mref.validate.return_value = True
-        mref.errors = {}
-        mcross.validate.return_value = False
-        mcross.errors = {'B': ['Invalid']}
+        mtran.get_errors.return_value = {}
+        mref.get_errors.return_value = {}
+        mcross.get_errors.return_value = {'B': ['Invalid']}
         msingle_field.validate.return_value = True
         msingle_field.errors = {}
 
@@ -91,13 +79,9 @@ class ErrorValidatorErrorsTestCase(TestCase):
         mref = mref_class.return_value
         mcross = mcross_class.return_value
         msingle_field = msingle_field_class.return_value
-
-        mtran.validate.return_value = True
-        mtran.errors = {}
-        mref.validate.return_value = False
-        mref.errors = {'B': ['Bad']}
-        mcross.validate.return_value = True
-        mcross.errors = {}
+        mtran.get_errors.return_value = {}
+        mref.get_errors.return_value = {'B': ['Bad']}
+        mcross.get_errors.return_value = {}
         msingle_field.validate.return_value = True
         msingle_field.errors = {}
 
@@ -117,13 +101,9 @@ class ErrorValidatorErrorsTestCase(TestCase):
         mref = mref_class.return_value
         mcross = mcross_class.return_value
         msingle_field = msingle_field_class.return_value
-
-        mtran.validate.return_value = False
-        mtran.errors = {'B': ['Bad transition']}
-        mref.validate.return_value = True
-        mref.errors = {}
-        mcross.validate.return_value = True
-        mcross.errors = {}
+        mtran.get_errors.return_value = {'B': ['Bad transition']}
+        mref.get_errors.return_value = {}
+        mcross.get_errors.return_value = {}
         msingle_field.validate.return_value = True
         msingle_field.errors = {}
 
@@ -142,13 +122,9 @@ class ErrorValidatorErrorsTestCase(TestCase):
         mref = mref_class.return_value
         mcross = mcross_class.return_value
         msingle_field = msingle_field_class.return_value
-
-        mtran.validate.return_value = False
-        mtran.errors = {'B': ['Bad transition']}
-        mref.validate.return_value = False
-        mref.errors = {'B': ['Bad ref']}
-        mcross.validate.return_value = False
-        mcross.errors = {'A': ['Invalid cross']}
+        mtran.get_errors.return_value = {'B': ['Bad transition']}
+        mref.get_errors.return_value = {'B': ['Bad ref']}
+        mcross.get_errors.return_value = {'A': ['Invalid cross']}
         msingle_field.validate.return_value = False
         msingle_field.errors = {'B': ['Missing']}
         validator = ErrorValidator('schema_dir', 'ref_dir')
@@ -169,13 +145,9 @@ class ErrorValidatorErrorsTestCase(TestCase):
         mref = mref_class.return_value
         mcross = mcross_class.return_value
         msingle_field = msingle_field_class.return_value
-
-        mtran.validate.return_value = True
-        mtran.errors = {}
-        mref.validate.return_value = True
-        mref.errors = {}
-        mcross.validate.return_value = True
-        mcross.errors = {}
+        mtran.get_errors.return_value = {}
+        mref.get_errors.return_value = {}
+        mcross.get_errors.return_value = {}
         msingle_field.validate.return_value = True
         msingle_field.errors = {}
 
@@ -0,0 +1,181 @@
+import os
+import random
+import tempfile
+from unittest import TestCase, mock
+
+from app import application
+from ..check_rank import VALUE_RANK, PARSE_RANK
+from ..generated_single_field_validator import CombinedGeneratedSingleFieldValidator, GeneratedSingleFieldValidator
+from ..reference import ReferenceInfo
+from ..single_field_validator import SingleFieldValidator
+from .test_compiled_single_field_validator import SAMPLE_VALUES, _load_schema
+
+REFERENCE_FILE_DIR = application.config['REFERENCE_FILE_DIR']
+
+
+class GeneratedSingleFieldValidatorTestCase(TestCase):
+
+    def setUp(self):
+        self.reference_info = ReferenceInfo(os.path.join(REFERENCE_FILE_DIR, 'reference_lists.json')).get_reference_info()
+
+    def _sample_value(self, rand, field):
+        ref_list = self.reference_info.get(field)
+        if ref_list and rand.random() < 0.3:
+            return rand.choice(ref_list)
+        return rand.choice(SAMPLE_VALUES)
+
+    def _assert_same_errors(self, schema, allow_unknown=True, documents=400):
+        cerberus_validator = SingleFieldValidator(schema, reference_dir=REFERENCE_FILE_DIR, allow_unknown=allow_unknown)
+        generated_validator = GeneratedSingleFieldValidator(schema, reference_dir=REFERENCE_FILE_DIR,
+                                                            allow_unknown=allow_unknown)
+        self.assertIsNotNone(generated_validator.source)
+
+        rand = random.Random(9)
+        fields = sorted(schema) + ['unknownField']
+        for _ in range(documents):
+            document = dict((field, self._sample_value(rand, field)) for field in fields if rand.random() < 0.6)
+            update = rand.random() < 0.5
+
+            cerberus_validator.validate(document, update=update)
+            expected = cerberus_validator.errors
+            actual = generated_validator.get_errors(document, update=update)
+            self.assertEqual(list(actual.items()), list(expected.items()), msg=document)
+
+    def test_error_schema(self):
+        self._assert_same_errors(_load_schema('error_schema.yml'))
+
+    def test_warning_schema(self):
+        self._assert_same_errors(_load_schema('warning_schema.yml'))
+
+    def test_unknown_fields_not_allowed(self):
+        self._assert_same_errors(_load_schema('error_schema.yml'), allow_unknown=False, documents=50)
+
+    def test_fail_fast(self):
+        schema = _load_schema('error_schema.yml')
+        validator = GeneratedSingleFieldValidator(schema, reference_dir=REFERENCE_FILE_DIR, allow_unknown=True)
+
+        rand = random.Random(11)
+        fields = sorted(schema) + ['unknownField']
+        for _ in range(200):
+            document = dict((field, self._sample_value(rand, field)) for field in fields if rand.random() < 0.6)
+            update = rand.random() < 0.5
+
+            expected = validator.get_errors(document, update=update)
+            actual = validator.get_errors(document, update=update, fail_fast=True)
+            self.assertEqual(bool(actual), bool(expected), msg=document)
+            self.assertLessEqual(len(actual), 1)
+            # A field's checks of a lower rank can find errors before those of a higher rank are run
+            for field, messages in actual.items():
+                self.assertLessEqual(set(messages), set(expected[field]), msg=document)
+
+    def test_fail_fast_checks_required_fields_first(self):
+        validator = GeneratedSingleFieldValidator({'a': {'maxlength': 2}, 'b': {'required': True}}, allow_unknown=True)
+        self.assertEqual(validator.get_errors({'a': 'abc'}, fail_fast=True), {'b': ['required field']})
+        self.assertEqual(validator.get_errors({'a': 'abc'}, update=True, fail_fast=True), {'a': ['max length is 2']})
+
+    def test_fail_fast_checks_lower_ranks_first(self):
+        validator = GeneratedSingleFieldValidator({'a': {'regex': '[0-9]*'}, 'b': {'maxlength': 2}}, allow_unknown=True)
+        document = {'a': 'x', 'b': 'abc'}
+        self.assertEqual(validator.get_errors(document, fail_fast=True), {'b': ['max length is 2']})
+        self.assertEqual(validator.get_errors(document, fail_fast=True, rank=VALUE_RANK), {'b': ['max length is 2']})
+        self.assertEqual(validator.get_errors(document, fail_fast=True, rank=PARSE_RANK),
+                         {'a': ["value does not match regex '[0-9]*'"]})
+
+    def test_fail_fast_checks_typed_field_at_type_rank(self):
+        validator = GeneratedSingleFieldValidator({'a': {'type': 'numeric', 'maxlength': 2}}, allow_unknown=True)
+        self.assertEqual(validator.get_errors({'a': '123'}, fail_fast=True, rank=VALUE_RANK), {})
+        self.assertEqual(validator.get_errors({'a': '123'}, fail_fast=True, rank=PARSE_RANK),
+                         {'a': ['max length is 2']})
+        self.assertEqual(validator.get_errors({'a': '1x'}, fail_fast=True), {'a': ['must be of numeric type']})
+
+    def test_fail_fast_uses_cerberus_once(self):
+        validator = GeneratedSingleFieldValidator({'a': {'maxlength': 2}}, allow_unknown=True)
+        self.assertEqual(validator.get_errors({'a': [1, 2, 3]}, fail_fast=True, rank=VALUE_RANK), {})
+        self.assertEqual(validator.get_errors({'a': [1, 2, 3]}, fail_fast=True, rank=PARSE_RANK),
+                         {'a': ['max length is 2']})
+        self.assertEqual(validator.get_errors({'a': [1, 2, 3]}, fail_fast=True), {'a': ['max length is 2']})
+
+    def test_non_string_values_use_cerberus(self):
+        validator = GeneratedSingleFieldValidator({'a': {'maxlength': 2}}, allow_unknown=True)
+        self.assertEqual(validator.get_errors({'a': [1, 2, 3]}), {'a': ['max length is 2']})
+        self.assertEqual(validator.get_errors({'a': 'abc', 'unknown': 3}), {'a': ['max length is 2']})
+
+    def test_unsupported_rule_uses_cerberus(self):
+        validator = GeneratedSingleFieldValidator({'a': {'minlength': 2}}, allow_unknown=True)
+        self.assertIsNone(validator.source)
+        self.assertEqual(validator.get_errors({'a': 'b'}), {'a': ['min length is 2']})
+
+
+class CombinedGeneratedSingleFieldValidatorTestCase(TestCase):
+
+    def setUp(self):
+        self.error_validator = GeneratedSingleFieldValidator(_load_schema('error_schema.yml'),
+                                                             reference_dir=REFERENCE_FILE_DIR, allow_unknown=False)
+        self.warning_validator = GeneratedSingleFieldValidator(_load_schema('warning_schema.yml'),
+                                                               reference_dir=REFERENCE_FILE_DIR, allow_unknown=True)
+        self.validator = CombinedGeneratedSingleFieldValidator([self.error_validator, self.warning_validator])
+
+    def test_same_as_separate_validators(self):
+        self.assertIsNotNone(self.validator.source)
+        rand = random.Random(11)
+        fields = sorted(set(self.error_validator.schema) | set(self.warning_validator.schema)) + ['unknownField']
+        for _ in range(200):
+            document = dict((field, rand.choice(SAMPLE_VALUES)) for field in fields if rand.random() < 0.6)
+            update = rand.random() < 0.5
+
+            errors, warnings = self.validator.get_errors(document, update=update)
+            self.assertEqual(list(errors.items()),
+                             list(self.error_validator.get_errors(document, update=update).items()), msg=document)
+            self.assertEqual(list(warnings.items()),
+                             list(self.warning_validator.get_errors(document, update=update).items()), msg=document)
+
+    def test_non_string_values_use_each_validator(self):
+        validator = CombinedGeneratedSingleFieldValidator([
+            GeneratedSingleFieldValidator({'a': {'maxlength': 2}}, allow_unknown=True),
+            GeneratedSingleFieldValidator({'a': {'maxlength': 1}}, allow_unknown=True)
+        ])
+        self.assertEqual(validator.get_errors({'a': [1, 2, 3]}), [{'a': ['max length is 2']}, {'a': ['max length is 1']}])
+
+    def test_unsupported_rule_uses_each_validator(self):
+        validator = CombinedGeneratedSingleFieldValidator([
+            GeneratedSingleFieldValidator({'a': {'minlength': 2}}, allow_unknown=True),
+            GeneratedSingleFieldValidator({'a': {'maxlength': 1}}, allow_unknown=True)
+        ])
+        self.assertIsNone(validator.source)
+        self.assertEqual(validator.get_errors({'a': 'bc'}), [{}, {'a': ['max length is 1']}])
+
+
+class GeneratedCodeCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.schema = {'a': {'maxlength': 2, 'allowed': ['ab', 'abc']}}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_code_is_cached(self):
+        GeneratedSingleFieldValidator(self.schema, cache_dir=self.temp_dir.name)
+        self.assertEqual(len(os.listdir(self.temp_dir.name)), 1)
+
+        with mock.patch('mlrvalidator.validators.generated_single_field_validator.compile') as mock_compile:
+            validator = GeneratedSingleFieldValidator(self.schema, cache_dir=self.temp_dir.name)
+            mock_compile.assert_not_called()
+        self.assertEqual(validator.get_errors({'a': 'abc'}), {'a': ['max length is 2']})
+
+    def test_corrupt_cache_is_replaced(self):
+        GeneratedSingleFieldValidator(self.schema, cache_dir=self.temp_dir.name)
+        cache_path = os.path.join(self.temp_dir.name, os.listdir(self.temp_dir.name)[0])
+        with open(cache_path, 'wb') as fd:
+            fd.write(b'not code')
+
+        validator = GeneratedSingleFieldValidator(self.schema, cache_dir=self.temp_dir.name)
+        self.assertEqual(validator.get_errors({'a': 'b'}), {'a': ['unallowed value b']})
+
+    def test_unwritable_cache_dir(self):
+        cache_dir = os.path.join(self.temp_dir.name, 'file')
+        with open(cache_dir, 'w') as fd:
+            fd.write('')
+
+        validator = GeneratedSingleFieldValidator(self.schema, cache_dir=cache_dir)
+        self.assertEqual(validator.get_errors({'a': 'ab'}), {})
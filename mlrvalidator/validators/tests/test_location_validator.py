@@ -0,0 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+
+from app import application
+from ..compiled_single_field_validator import COMPILED_ENGINE, GENERATED_ENGINE
+from ..location_validator import LocationValidator
+
+validator = LocationValidator(application.config['SCHEMA_DIR'], application.config['REFERENCE_FILE_DIR'])
+
+
+class LocationValidatorTestCase(TestCase):
+
+    def test_valid_location(self):
+        result = validator.validate({'agencyCode': 'USGS ', 'siteNumber': '12345678'}, {}, update=True)
+        self.assertTrue(result.passed)
+        self.assertEqual(dict(result.errors), {})
+        self.assertEqual(dict(result.warnings), {})
+
+    def test_errors_and_warnings(self):
+        result = validator.validate({'agencyCode': 'XYZ', 'stationName': "'Station"}, {}, update=True)
+        self.assertFalse(result.passed)
+        self.assertIn('agencyCode', result.errors)
+        self.assertIn('stationName', result.warnings)
+
+    def test_duplicate_site_on_add(self):
+        result = validator.validate({'agencyCode': 'USGS '}, {'agencyCode': 'USGS ', 'siteNumber': '12345678'})
+        self.assertIn('duplicate_site', result.errors)
+
+    def test_reference_lookups_are_made_once(self):
+        geography = mock.Mock(wraps=validator.error_validator.cross_field_ref_validator.geography_ref)
+        ddot_location = {'countryCode': 'US', 'stateFipsCode': '01', 'countyCode': '001', 'latitude': ' 323000',
+                         'longitude': ' 0863000', 'altitude': '100', 'aquiferCode': 'ABC'}
+        with mock.patch.object(validator.error_validator.cross_field_ref_validator, 'geography_ref', geography), \
+                mock.patch.object(validator.warning_validator.cross_field_ref_validator, 'geography_ref', geography):
+            validator.validate(ddot_location, {}, update=True)
+
+        geography.get_state.assert_called_once_with('US', '01')
+        geography.get_county.assert_called_once_with('US', '01', '001')
+
+    def test_result_is_read_only(self):
+        result = validator.validate({'agencyCode': 'XYZ'}, {}, update=True)
+        with self.assertRaises(TypeError):
+            result.errors['agencyCode'] = []
+        with self.assertRaises(AttributeError):
+            result.errors = {}
+
+    def test_engines_match_cerberus(self):
+        for engine in (COMPILED_ENGINE, GENERATED_ENGINE):
+            engine_validator = LocationValidator(application.config['SCHEMA_DIR'],
+                                                 application.config['REFERENCE_FILE_DIR'], single_field_engine=engine)
+            self.assertIsNotNone(engine_validator.single_field_validator)
+            self._assert_engine_matches_cerberus(engine_validator)
+
+    def test_cerberus_single_field_validators_are_not_combined(self):
+        self.assertIsNone(validator.single_field_validator)
+
+    def _assert_engine_matches_cerberus(self, engine_validator):
+        locations = [
+            {'agencyCode': 'USGS ', 'siteNumber': '12345678'},
+            {'agencyCode': 'XYZ', 'siteNumber': '1234567a', 'stationName': "'Station", 'altitude': '12.345'},
+            {'agencyCode': '   ', 'latitude': ' 9930001', 'firstConstructionDate': '20010230'}
+        ]
+        for location in locations:
+            for update in (True, False):
+                expected = validator.validate(location, {}, update=update)
+                actual = engine_validator.validate(location, {}, update=update)
+                self.assertEqual(dict(actual.errors), dict(expected.errors))
+                self.assertEqual(dict(actual.warnings), dict(expected.warnings))
+
+    def test_fail_fast(self):
+        locations = [
+            ({'agencyCode': 'USGS ', 'siteNumber': '12345678', 'stationName': "'Station"}, {}),
+            ({'agencyCode': 'XYZ', 'siteNumber': '1234567a', 'stationName': "'Station", 'altitude': '12.345'}, {}),
+            ({'agencyCode': 'USGS ', 'siteNumber': '12345678'}, {'agencyCode': 'USGS ', 'siteNumber': '12345678'})
+        ]
+        for engine_validator in (validator, LocationValidator(application.config['SCHEMA_DIR'],
+                                                              application.config['REFERENCE_FILE_DIR'],
+                                                              single_field_engine=COMPILED_ENGINE)):
+            for ddot_location, existing_location in locations:
+                expected = engine_validator.validate(ddot_location, existing_location, update=True)
+                actual = engine_validator.validate(ddot_location, existing_location, update=True, fail_fast=True)
+                self.assertEqual(bool(actual.errors), bool(expected.errors))
+                if not expected.errors:
+                    self.assertEqual(dict(actual.warnings), dict(expected.warnings))
+                else:
+                    self.assertEqual(dict(actual.warnings), {})
+                    for field, messages in actual.errors.items():
+                        self.assertLessEqual(set(messages), set(expected.errors[field]))
+
+    def test_fail_fast_stops_at_duplicate_site(self):
+        result = validator.validate({'agencyCode': 'XYZ'}, {'agencyCode': 'USGS ', 'siteNumber': '12345678'},
+                                    fail_fast=True)
+        self.assertEqual(list(result.errors), ['duplicate_site'])
+
+    def test_fail_fast_runs_lower_ranks_first(self):
+        compiled_validator = LocationValidator(application.config['SCHEMA_DIR'],
+                                               application.config['REFERENCE_FILE_DIR'],
+                                               single_field_engine=COMPILED_ENGINE)
+        # agencyCode is not in the reference list but districtCode is also too long
+        result = compiled_validator.validate({'agencyCode': 'XYZ', 'districtCode': '1234'}, {}, update=True,
+                                             fail_fast=True)
+        self.assertEqual(dict(result.errors), {'districtCode': ['max length is 3']})
+
+    def test_fail_fast_runs_cerberus_last(self):
+        result = validator.validate({'agencyCode': 'XYZ', 'primaryUseOfSiteCode': '', 'secondaryUseOfSiteCode': 'A'},
+                                    {}, update=True, fail_fast=True)
+        self.assertEqual(dict(result.errors),
+                         {'secondaryUseOfSiteCode': ['Primary must be non null if secondary is non null']})
+
+    def test_new_pool_validators_do_not_reload_references(self):
+        compiled_validator = LocationValidator(application.config['SCHEMA_DIR'],
+                                               application.config['REFERENCE_FILE_DIR'],
+                                               single_field_engine=COMPILED_ENGINE)
+        pools = [validator.error_validator.single_field_validator,
+                 validator.warning_validator.single_field_validator,
+                 compiled_validator.error_validator.single_field_validator.fallback]
+        for pool in pools:
+            in_use = pool._idle.pop()
+            with mock.patch('mlrvalidator.validators.single_field_validator.reference_registry') as mregistry:
+                errors = pool.get_errors({'agencyCode': 'XYZ'})
+            pool._idle.append(in_use)
+            mregistry.get.assert_not_called()
+            in_use.validate({'agencyCode': 'XYZ'})
+            self.assertEqual(errors, in_use.errors)
+
+    def test_concurrent_calls_do_not_share_results(self):
+        good_location = {'agencyCode': 'USGS ', 'siteNumber': '12345678'}
+        bad_location = {'agencyCode': 'XYZ', 'siteNumber': '1234567a'}
+
+        def validate(location):
+            return validator.validate(location, {}, update=True)
+
+        locations = [good_location, bad_location] * 50
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(validate, locations))
+
+        for location, result in zip(locations, results):
+            if location is good_location:
+                self.assertEqual(dict(result.errors), {})
+            else:
+                self.assertEqual(set(result.errors), {'agencyCode', 'siteNumber'})
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from app import application
+from mlrvalidator.benchmarks.workload import WorkloadGenerator
+from ..location_validator import LocationValidator
+from ..mapped_reference import MappedGeographyIndex, MappedStore, MappedStoreError, build_mapped_store, \
+    load_mapped_store
+from ..reference import GeographyIndex, ReferenceRegistry, reference_registry
+
+SCHEMA_DIR = application.config['SCHEMA_DIR']
+REFERENCE_FILE_DIR = application.config['REFERENCE_FILE_DIR']
+
+
+class MappedReferenceTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.store_path = os.path.join(cls.temp_dir.name, 'reference_store.map')
+        build_mapped_store(REFERENCE_FILE_DIR, cls.store_path)
+        cls.geography = GeographyIndex(REFERENCE_FILE_DIR)
+        cls.mapped_geography = MappedGeographyIndex(MappedStore(cls.store_path))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def _write(self, data):
+        handle, path = tempfile.mkstemp(dir=self.temp_dir.name)
+        with os.fdopen(handle, 'wb') as fd:
+            fd.write(data)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_same_as_geography_index(self):
+        for country_code, state_codes in self.geography.get_states_by_country().items():
+            self.assertEqual(set(self.mapped_geography.get_state_code_set(country_code)), state_codes)
+
+        for country_code, state_code, state in self.geography.iter_states():
+            mapped_state = self.mapped_geography.get_state(country_code, state_code)
+            self.assertEqual(mapped_state.attributes, state.attributes)
+            self.assertEqual(mapped_state.latitude_range, state.latitude_range)
+            self.assertEqual(mapped_state.longitude_range, state.longitude_range)
+            for attribute in ('county_codes', 'aquifer_codes', 'hydrologic_unit_codes', 'national_aquifer_codes'):
+                self.assertEqual(set(getattr(mapped_state, attribute)), getattr(state, attribute))
+                self.assertEqual(bool(getattr(mapped_state, attribute)), bool(getattr(state, attribute)))
+
+            for county_code, county in state.counties.items():
+                mapped_county = self.mapped_geography.get_county(country_code, state_code, county_code)
+                self.assertEqual(mapped_county.attributes, county.attributes)
+                self.assertEqual(mapped_county.latitude_range, county.latitude_range)
+                self.assertEqual(mapped_county.longitude_range, county.longitude_range)
+                self.assertEqual(set(mapped_county.minor_civil_division_codes), county.minor_civil_division_codes)
+
+    def test_membership(self):
+        state = self.mapped_geography.get_state('US', '01')
+        huc = sorted(self.geography.get_state('US', '01').hydrologic_unit_codes)[0]
+
+        self.assertIn(huc, state.hydrologic_unit_codes)
+        self.assertNotIn(huc[:-1], state.hydrologic_unit_codes)
+        self.assertNotIn('', state.hydrologic_unit_codes)
+        self.assertNotIn(huc + '\x1f', state.hydrologic_unit_codes)
+        self.assertIn('01', self.mapped_geography.get_state_code_set('US'))
+        self.assertNotIn('0', self.mapped_geography.get_state_code_set('US'))
+
+    def test_missing_state_and_county(self):
+        state = self.mapped_geography.get_state('ZZ', '99')
+        self.assertEqual(state.attributes, {})
+        self.assertFalse(state.county_codes)
+        self.assertEqual(len(state.aquifer_codes), 0)
+        self.assertFalse(self.mapped_geography.get_state_code_set('ZZ'))
+
+        county = self.mapped_geography.get_county('US', '01', '999')
+        self.assertEqual(county.attributes, {})
+        self.assertNotIn('00001', county.minor_civil_division_codes)
+
+    def test_validators_give_same_results(self):
+        generator = WorkloadGenerator(REFERENCE_FILE_DIR, seed=3, invalid_rate=0.5)
+        transactions = generator.transactions(300)
+
+        reference_registry.clear()
+        self.addCleanup(reference_registry.clear)
+        validator = LocationValidator(SCHEMA_DIR, REFERENCE_FILE_DIR)
+        self.assertTrue(load_mapped_store(self.store_path, REFERENCE_FILE_DIR))
+        mapped_validator = LocationValidator(SCHEMA_DIR, REFERENCE_FILE_DIR)
+        self.assertIsInstance(mapped_validator.error_validator.cross_field_ref_validator.geography_ref,
+                              MappedGeographyIndex)
+
+        for ddot, existing, update in transactions:
+            expected = validator.validate(ddot, existing, update=update)
+            actual = mapped_validator.validate(ddot, existing, update=update)
+            self.assertEqual(dict(actual.errors), dict(expected.errors))
+            self.assertEqual(dict(actual.warnings), dict(expected.warnings))
+
+    def test_invalid_store(self):
+        with open(self.store_path, 'rb') as fd:
+            data = fd.read()
+        for invalid_data in (b'', b'not a store', data[:-1]):
+            with self.assertRaises(MappedStoreError):
+                MappedStore(self._write(invalid_data))
+
+            registry = ReferenceRegistry()
+            with self.assertLogs('mlrvalidator.validators.mapped_reference', level='WARNING'):
+                self.assertFalse(load_mapped_store(self._write(invalid_data), REFERENCE_FILE_DIR, registry=registry))
+            self.assertEqual(registry.get_references(), [])
+
+    def test_stale_store(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            reference_dir = os.path.join(temp_dir, 'references')
+            shutil.copytree(REFERENCE_FILE_DIR, reference_dir)
+            with open(os.path.join(reference_dir, 'huc.json'), 'a') as fd:
+                fd.write('\n')
+
+            with self.assertLogs('mlrvalidator.validators.mapped_reference', level='WARNING'):
+                self.assertFalse(load_mapped_store(self.store_path, reference_dir, registry=ReferenceRegistry()))
+
+    def test_missing_store(self):
+        self.assertFalse(load_mapped_store(os.path.join(self.temp_dir.name, 'missing.map'), REFERENCE_FILE_DIR,
+                                           registry=ReferenceRegistry()))
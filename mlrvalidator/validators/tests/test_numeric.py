@@ -0,0 +1,22 @@
+from unittest import TestCase
+
+from ..numeric import parse_number
+
+
+class ParseNumberTestCase(TestCase):
+
+    def test_numbers(self):
+        self.assertEqual(parse_number('12'), 12.0)
+        self.assertEqual(parse_number(' -1.25 '), -1.25)
+        self.assertEqual(parse_number('1e3'), 1000.0)
+        self.assertEqual(parse_number(7), 7.0)
+
+    def test_blank(self):
+        self.assertIsNone(parse_number(''))
+        self.assertIsNone(parse_number('   '))
+
+    def test_invalid(self):
+        self.assertIsNone(parse_number('12A'))
+        self.assertIsNone(parse_number('1.2.3'))
+        self.assertIsNone(parse_number(None))
+        self.assertIsNone(parse_number(['1']))
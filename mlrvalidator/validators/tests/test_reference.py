@@ -1,58 +1,14 @@
 import json
 import os
+import sys
+import tempfile
+import threading
 from unittest import TestCase, mock
 
 from app import application
-from ..reference import CountryStateReference, NationalWaterUseCodes, States, FieldTransitions, SiteTypesCrossField, Counties, \
-    LandNetCrossField, SiteNumberFormat
-
-
-class CountryStateReferenceTestCase(TestCase):
-    def setUp(self):
-        ref_list = {
-            "countries": [
-                {
-                    "countryCode": "BG",
-                    "states": [
-                        {
-                            "stateFipsCode": "00",
-                            "aquiferCodes": [
-                                "200CRSL"
-                            ]
-                        }
-                    ]
-                }, {
-                    "countryCode": "US",
-                    "states": [
-                        {
-                            "stateFipsCode": "01",
-                            "aquiferCodes": [
-                                "100CNZC",
-                                "110QRNR"
-                            ]
-                        }, {
-
-                            "stateFipsCode": "02",
-                            "aquiferCodes": [
-                                "000MCRL",
-                                "000SELS"
-                            ]
-                        }
-                    ]
-                }
-            ]
-        }
-        with mock.patch('mlrvalidator.validators.reference.open', mock.mock_open(read_data=json.dumps(ref_list)), create=True):
-            self.aquifer_ref = CountryStateReference('fake_file', 'aquiferCodes')
-
-    def test_list_that_exists(self):
-        self.assertEqual(self.aquifer_ref.get_list_by_country_state('US', '02'), ['000MCRL', '000SELS'])
-
-    def test_missing_country(self):
-        self.assertEqual(self.aquifer_ref.get_list_by_country_state('CN', '02'), [])
-
-    def test_missing_state(self):
-        self.assertEqual(self.aquifer_ref.get_list_by_country_state('US', '03'), [])
+from ..coordinates import parse_range
+from ..reference import NationalWaterUseCodes, FieldTransitions, SiteTypesCrossField, LandNetCrossField, \
+    SiteNumberFormat, ReferenceInfo, ReferenceLists, ReferenceRegistry, GeographyIndex
 
 
 class ValidateGetNationalWaterUseCase(TestCase):
@@ -84,110 +40,6 @@ class ValidateGetNationalWaterUseCase(TestCase):
         self.assertEqual(test_national_water_use, bad_national_water_use)
 
 
-class ValidateGetCountyCodeCase(TestCase):
-    def setUp(self):
-        self.county = Counties(os.path.join(application.config['REFERENCE_FILE_DIR'], 'county.json'))
-
-    def test_validate_ok(self):
-        good_county = ["000", "005", "040", "050", "060"]
-        test_county = self.county.get_county_codes('FM', '64')
-
-        self.assertEqual(test_county, good_county)
-
-    def test_validate_not_ok(self):
-        bad_county = []
-        test_county = self.county.get_county_codes('FM', 'XY')
-
-        self.assertEqual(test_county, bad_county)
-
-        bad_county = []
-        test_county = self.county.get_county_codes('XY', '64')
-
-        self.assertEqual(test_county, bad_county)
-
-
-class ValidateGetCountyAttributesCase(TestCase):
-    def setUp(self):
-        self.county = Counties(os.path.join(application.config['REFERENCE_FILE_DIR'], 'county.json'))
-
-    def test_validate_ok(self):
-        good_county = {
-              "countyCode": "000",
-              "county_min_lat_va": "010400",
-              "county_max_lat_va": "100700",
-              "county_min_long_va": "-1630200",
-              "county_max_long_va": "-1380000",
-              "county_min_alt_va": "00000",
-              "county_max_alt_va": "02600"
-            }
-        test_county = self.county.get_county_attributes('FM', '64', '000')
-
-        self.assertEqual(test_county, good_county)
-
-    def test_validate_not_ok(self):
-        bad_county = {}
-        test_county = self.county.get_county_attributes('FM', '64', '999')
-
-        self.assertEqual(test_county, bad_county)
-
-        bad_county = {}
-        test_county = self.county.get_county_attributes('XY', '64', '000')
-
-        self.assertEqual(test_county, bad_county)
-
-        bad_county = {}
-        test_county = self.county.get_county_attributes('FM', 'XY', '000')
-
-        self.assertEqual(test_county, bad_county)
-
-
-class ValidateGetStateCodeCase(TestCase):
-    def setUp(self):
-        self.state = States(os.path.join(application.config['REFERENCE_FILE_DIR'], 'state.json'))
-
-    def test_validate_ok(self):
-        good_state = ["00", "90", "91", "92", "93", "94", "95", "96", "97", "98"]
-        test_state = self.state.get_state_codes('CA')
-
-        self.assertEqual(test_state, good_state)
-
-    def test_validate_not_ok(self):
-        bad_state = []
-        test_state = self.state.get_state_codes('XY')
-
-        self.assertEqual(test_state, bad_state)
-
-
-class ValidateGetStateAttributesCase(TestCase):
-    def setUp(self):
-        self.state = States(os.path.join(application.config['REFERENCE_FILE_DIR'], 'state.json'))
-
-    def test_validate_ok(self):
-        good_state = {
-          "stateFipsCode": "00",
-          "state_min_lat_va": "414036",
-          "state_max_lat_va": "694000",
-          "state_min_long_va": "0553000",
-          "state_max_long_va": "1410000",
-          "state_min_alt_va": "00000",
-          "state_max_alt_va": "30000"
-        }
-        test_state = self.state.get_state_attributes('CA', '00')
-
-        self.assertEqual(test_state, good_state)
-
-    def test_validate_not_ok(self):
-        bad_state = {}
-        test_state = self.state.get_state_attributes('CA', 'XY')
-
-        self.assertEqual(test_state, bad_state)
-
-        bad_state = {}
-        test_state = self.state.get_state_attributes('XY', '00')
-
-        self.assertEqual(test_state, bad_state)
-
-
 class ValidateGetFieldTransitionsCase(TestCase):
     def setUp(self):
         self.site_type = FieldTransitions(os.path.join(application.config['REFERENCE_FILE_DIR'], 'site_type_transition.json'))
@@ -219,6 +71,12 @@ class ValidateGetSiteTypesCrossFieldCase(TestCase):
     def setUp(self):
         self.site_type_cf = SiteTypesCrossField(os.path.join(application.config['REFERENCE_FILE_DIR'], 'site_type_cross_field.json'))
 
+    def test_attribute_fields(self):
+        result = self.site_type_cf.get_attribute_fields()
+        self.assertIn('latitude', result)
+        self.assertIn('wellDepth', result)
+        self.assertNotIn('siteTypeCode', result)
+
     def test_real_site_type_code(self):
         result = self.site_type_cf.get_site_type_field_dependencies('ST-DCH')
         expected = {
@@ -306,4 +164,252 @@ class ValidateGetSiteNumberFormatCase(TestCase):
     def test_bad_site_type(self):
         result = self.site_format.get_site_number_template('XY')
         expected = ''
-        self.assertEqual(result, expected)
\ No newline at end of file
+        self.assertEqual(result, expected)
+
+
+class ValidateGetReferenceSetCase(TestCase):
+    def setUp(self):
+        self.reference_lists = ReferenceLists(os.path.join(application.config['REFERENCE_FILE_DIR'], 'reference_lists.json'))
+
+    def test_reference_set(self):
+        result = self.reference_lists.get_reference_set('agencyCode')
+        self.assertIsInstance(result, frozenset)
+        self.assertEqual(result, frozenset(self.reference_lists.get_reference_info()['agencyCode']))
+
+    def test_missing_field(self):
+        self.assertEqual(self.reference_lists.get_reference_set('noField'), frozenset())
+
+    def test_reference_sets(self):
+        result = self.reference_lists.get_reference_sets(['agencyCode', 'noField'])
+        self.assertEqual(set(result), {'agencyCode', 'noField'})
+        self.assertIn('USGS', result['agencyCode'])
+        self.assertEqual(result['noField'], frozenset())
+
+
+class GeographyIndexTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ref_dir = application.config['REFERENCE_FILE_DIR']
+        cls.geography = GeographyIndex(cls.ref_dir)
+
+    def _path(self, filename):
+        return os.path.join(self.ref_dir, filename)
+
+    def _load(self, filename):
+        with open(self._path(filename)) as fd:
+            return json.load(fd)
+
+    def _iter_states(self, filename):
+        for country in self._load(filename)['countries']:
+            for state in country.get('states', []):
+                yield (country['countryCode'], state['stateFipsCode']), state
+
+    def test_states_match_state_file(self):
+        for country in self._load('state.json')['countries']:
+            country_code = country['countryCode']
+            self.assertEqual(self.geography.get_state_code_set(country_code),
+                             frozenset(state['stateFipsCode'] for state in country['states']))
+            for state in country['states']:
+                self.assertEqual(self.geography.get_state(country_code, state['stateFipsCode']).attributes, state)
+
+    def test_counties_match_county_files(self):
+        for key, state in self._iter_states('county.json'):
+            counties = state.get('counties', [])
+            self.assertEqual(self.geography.get_state(*key).county_codes,
+                             frozenset(county['countyCode'] for county in counties))
+            for county in counties:
+                self.assertEqual(self.geography.get_county(*(key + (county['countyCode'],))).attributes, county)
+
+        for key, state in self._iter_states('mcd.json'):
+            for county in state.get('counties', []):
+                self.assertEqual(self.geography.get_county(*(key + (county['countyCode'],))).minor_civil_division_codes,
+                                 frozenset(county.get('minorCivilDivisionCodes', [])))
+
+    def test_state_codes_match_country_state_files(self):
+        for filename, (attribute, list_key) in GeographyIndex.STATE_CODE_FILES.items():
+            for key, state in self._iter_states(filename):
+                self.assertEqual(getattr(self.geography.get_state(*key), attribute), frozenset(state.get(list_key, [])))
+
+    def test_state(self):
+        self.assertEqual(self.geography.get_state_code_set('CA'),
+                         frozenset(["00", "90", "91", "92", "93", "94", "95", "96", "97", "98"]))
+        self.assertEqual(self.geography.get_state('CA', '00').attributes, {
+            "stateFipsCode": "00",
+            "state_min_lat_va": "414036",
+            "state_max_lat_va": "694000",
+            "state_min_long_va": "0553000",
+            "state_max_long_va": "1410000",
+            "state_min_alt_va": "00000",
+            "state_max_alt_va": "30000"
+        })
+
+    def test_county(self):
+        self.assertEqual(self.geography.get_state('FM', '64').county_codes,
+                         frozenset(["000", "005", "040", "050", "060"]))
+        self.assertEqual(self.geography.get_county('FM', '64', '000').attributes, {
+            "countyCode": "000",
+            "county_min_lat_va": "010400",
+            "county_max_lat_va": "100700",
+            "county_min_long_va": "-1630200",
+            "county_max_long_va": "-1380000",
+            "county_min_alt_va": "00000",
+            "county_max_alt_va": "02600"
+        })
+
+    def test_ranges_are_parsed(self):
+        state = self.geography.get_state('US', '01')
+        self.assertEqual(state.latitude_range, parse_range(state.attributes, 'state_min_lat_va', 'state_max_lat_va', 2))
+        self.assertEqual(state.longitude_range,
+                         parse_range(state.attributes, 'state_min_long_va', 'state_max_long_va', 3))
+        self.assertIsNotNone(state.latitude_range)
+
+        county = self.geography.get_county('US', '01', sorted(state.county_codes)[0])
+        self.assertEqual(county.latitude_range,
+                         parse_range(county.attributes, 'county_min_lat_va', 'county_max_lat_va', 2))
+        self.assertEqual(county.longitude_range,
+                         parse_range(county.attributes, 'county_min_long_va', 'county_max_long_va', 3))
+        self.assertIsNotNone(county.longitude_range)
+
+    def test_missing_bounds_are_logged(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for filename in GeographyIndex.FILES:
+                with open(os.path.join(temp_dir, filename), 'w') as fd:
+                    fd.write(json.dumps({'countries': []}))
+            with open(os.path.join(temp_dir, 'state.json'), 'w') as fd:
+                fd.write(json.dumps({'countries': [{'countryCode': 'US', 'states': [
+                    {'stateFipsCode': '01', 'state_min_lat_va': '300840', 'state_max_lat_va': '350029',
+                     'state_min_long_va': '0845318', 'state_max_long_va': '0882824'},
+                    {'stateFipsCode': '73', 'state_min_lat_va': '', 'state_max_lat_va': '',
+                     'state_min_long_va': '0845318', 'state_max_long_va': '0882824'}
+                ]}]}))
+
+            with self.assertLogs('mlrvalidator.validators.reference', level='WARNING') as logs:
+                geography = GeographyIndex(temp_dir)
+
+        self.assertIsNone(geography.get_state('US', '73').latitude_range)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('1 entries in', logs.output[0])
+        self.assertIn('US/73', logs.output[0])
+        self.assertNotIn('US/01', logs.output[0])
+
+    def test_missing_state_and_county(self):
+        state = self.geography.get_state('ZZ', '99')
+        self.assertEqual(state.attributes, {})
+        self.assertIsNone(state.latitude_range)
+        self.assertEqual(state.county_codes, frozenset())
+        self.assertEqual(state.aquifer_codes, frozenset())
+        self.assertEqual(self.geography.get_state_code_set('ZZ'), frozenset())
+
+        county = self.geography.get_county('US', '01', '999')
+        self.assertEqual(county.attributes, {})
+        self.assertEqual(county.minor_civil_division_codes, frozenset())
+
+    def test_strings_are_interned(self):
+        state = self.geography.get_state('US', '01')
+        county_code = sorted(state.county_codes)[0]
+
+        self.assertIs(state.attributes['stateFipsCode'], sys.intern('01'))
+        self.assertIs(state.counties[county_code].attributes['countyCode'], sys.intern(county_code))
+
+
+class ReferenceRegistryTestCase(TestCase):
+
+    def setUp(self):
+        self.registry = ReferenceRegistry()
+        self.ref_dir = application.config['REFERENCE_FILE_DIR']
+
+    def test_same_file_is_shared(self):
+        path = os.path.join(self.ref_dir, 'national_water_use.json')
+        codes = self.registry.get(NationalWaterUseCodes, path)
+
+        self.assertIs(self.registry.get(NationalWaterUseCodes, path), codes)
+        self.assertIs(self.registry.get(NationalWaterUseCodes, os.path.join(self.ref_dir, '.', 'national_water_use.json')),
+                      codes)
+
+    def test_different_arguments_are_not_shared(self):
+        geography = self.registry.get(GeographyIndex, self.ref_dir, True)
+
+        self.assertIsNot(self.registry.get(GeographyIndex, self.ref_dir, False), geography)
+        self.assertIs(self.registry.get(GeographyIndex, self.ref_dir, True), geography)
+        path = os.path.join(self.ref_dir, 'national_water_use.json')
+        self.assertIsNot(self.registry.get(ReferenceInfo, path), self.registry.get(NationalWaterUseCodes, path))
+
+    def test_modified_file_is_reloaded(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'reference_lists.json')
+            with open(path, 'w') as fd:
+                fd.write(json.dumps({'field1': ['A']}))
+            os.utime(path, (1000, 1000))
+            first = self.registry.get(ReferenceInfo, path)
+
+            with open(path, 'w') as fd:
+                fd.write(json.dumps({'field1': ['B']}))
+            os.utime(path, (2000, 2000))
+            second = self.registry.get(ReferenceInfo, path)
+
+            self.assertIsNot(first, second)
+            self.assertEqual(second.get_reference_info(), {'field1': ['B']})
+            self.assertIs(self.registry.get(ReferenceInfo, path), second)
+
+    def test_building_does_not_block_other_references(self):
+        building = threading.Event()
+        release = threading.Event()
+
+        class SlowReference(ReferenceInfo):
+            def __init__(self, *args):
+                building.set()
+                release.wait(5)
+                super().__init__(*args)
+
+        thread = threading.Thread(target=self.registry.get,
+                                  args=(SlowReference, os.path.join(self.ref_dir, 'reference_lists.json')))
+        thread.start()
+        try:
+            self.assertTrue(building.wait(5))
+            self.assertIsInstance(self.registry.get(ReferenceInfo, os.path.join(self.ref_dir, 'state.json')),
+                                  ReferenceInfo)
+        finally:
+            release.set()
+            thread.join()
+
+    def test_concurrent_requests_build_once(self):
+        path = os.path.join(self.ref_dir, 'reference_lists.json')
+        calls = []
+
+        class CountedReference(ReferenceInfo):
+            def __init__(self, *args):
+                calls.append(args)
+                super().__init__(*args)
+
+        threads = [threading.Thread(target=self.registry.get, args=(CountedReference, path)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+
+    def test_missing_file_is_not_shared(self):
+        with mock.patch('mlrvalidator.validators.reference.open', mock.mock_open(read_data=json.dumps({'field1': ['A']})), create=True):
+            first = self.registry.get(ReferenceInfo, 'fake_file')
+            second = self.registry.get(ReferenceInfo, 'fake_file')
+
+        self.assertIsNot(first, second)
+
+    def test_modified_directory_is_reloaded(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for filename in GeographyIndex.FILES:
+                with open(os.path.join(temp_dir, filename), 'w') as fd:
+                    fd.write(json.dumps({'countries': []}))
+            first = self.registry.get(GeographyIndex, temp_dir)
+            self.assertIs(self.registry.get(GeographyIndex, temp_dir), first)
+
+            path = os.path.join(temp_dir, 'state.json')
+            with open(path, 'w') as fd:
+                fd.write(json.dumps({'countries': [{'countryCode': 'US', 'states': [{'stateFipsCode': '01'}]}]}))
+            os.utime(path, (2000, 2000))
+            second = self.registry.get(GeographyIndex, temp_dir)
+
+            self.assertIsNot(second, first)
+            self.assertEqual(second.get_state_code_set('US'), frozenset(['01']))
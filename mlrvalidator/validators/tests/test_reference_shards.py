@@ -0,0 +1,136 @@
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from unittest import TestCase
+
+from app import application
+from mlrvalidator import metrics
+from ..reference import GeographyIndex
+from ..reference_shards import SHARD_DIR_NAME, ShardCache, build_shards, read_manifest
+
+REFERENCE_FILE_DIR = application.config['REFERENCE_FILE_DIR']
+
+
+class ReferenceShardsTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.reference_dir = os.path.join(cls.temp_dir.name, 'references')
+        shutil.copytree(REFERENCE_FILE_DIR, cls.reference_dir)
+        cls.shard_count = build_shards(cls.reference_dir)
+        cls.geography = GeographyIndex(cls.reference_dir, use_shards=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.clear()
+
+    def test_manifest(self):
+        shard_paths = read_manifest(self.reference_dir)
+        self.assertEqual(len(shard_paths), self.shard_count)
+        self.assertIn(('US', '01'), shard_paths)
+        for path in shard_paths.values():
+            self.assertEqual(os.path.dirname(path), os.path.join(self.reference_dir, SHARD_DIR_NAME))
+
+    def test_same_as_unsharded_index(self):
+        sharded = GeographyIndex(self.reference_dir)
+        self.assertIsNotNone(sharded.shards)
+
+        for country_code, state_code, state in self.geography.iter_states():
+            sharded_state = sharded.get_state(country_code, state_code)
+            for attribute in ('attributes', 'county_codes', 'aquifer_codes', 'hydrologic_unit_codes',
+                              'national_aquifer_codes'):
+                self.assertEqual(getattr(sharded_state, attribute), getattr(state, attribute))
+            self.assertEqual(set(sharded_state.counties), set(state.counties))
+            for county_code, county in state.counties.items():
+                sharded_county = sharded.get_county(country_code, state_code, county_code)
+                self.assertEqual(sharded_county.attributes, county.attributes)
+                self.assertEqual(sharded_county.minor_civil_division_codes, county.minor_civil_division_codes)
+
+    def test_missing_state(self):
+        sharded = GeographyIndex(self.reference_dir)
+        self.assertEqual(sharded.get_state('ZZ', '99').attributes, {})
+        self.assertFalse(sharded.get_county('US', '01', '999').minor_civil_division_codes)
+        self.assertEqual(sharded.shards.loads, 1)
+
+    def test_shards_are_loaded_once_and_evicted(self):
+        metrics.enable()
+        sharded = GeographyIndex(self.reference_dir)
+        sharded.shards.max_shards = 2
+
+        first_state = sharded.get_state('US', '01')
+        self.assertIs(sharded.get_state('US', '01'), first_state)
+        sharded.get_state('US', '02')
+        sharded.get_state('US', '01')
+        sharded.get_state('US', '04')
+
+        self.assertEqual(len(sharded.shards), 2)
+        self.assertEqual(sharded.shards.loads, 3)
+        self.assertEqual(sharded.shards.evictions, 1)
+        self.assertIs(sharded.get_state('US', '01'), first_state)
+        sharded.get_state('US', '02')
+        self.assertEqual(sharded.shards.loads, 4)
+        self.assertEqual(metrics.REFERENCE_SHARDS.get(('load',)), 4)
+        self.assertEqual(metrics.REFERENCE_SHARDS.get(('eviction',)), 2)
+
+    def test_pickled_index_loads_shards(self):
+        sharded = GeographyIndex(self.reference_dir)
+        sharded.get_state('US', '01')
+
+        unpickled = pickle.loads(pickle.dumps(sharded))
+        self.assertEqual(len(unpickled.shards), 0)
+        self.assertEqual(unpickled.get_state('US', '01').hydrologic_unit_codes,
+                         self.geography.get_state('US', '01').hydrologic_unit_codes)
+
+    def test_use_shards_false(self):
+        self.assertIsNone(GeographyIndex(self.reference_dir, use_shards=False).shards)
+
+
+class StaleShardsTestCase(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.reference_dir = os.path.join(self.temp_dir.name, 'references')
+        shutil.copytree(REFERENCE_FILE_DIR, self.reference_dir)
+        build_shards(self.reference_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_changed_source(self):
+        path = os.path.join(self.reference_dir, 'mcd.json')
+        with open(path) as fd:
+            reference_info = json.load(fd)
+        reference_info['countries'][0]['states'] = []
+        with open(path, 'w') as fd:
+            json.dump(reference_info, fd)
+
+        self.assertIsNone(read_manifest(self.reference_dir))
+        self.assertIsNone(GeographyIndex(self.reference_dir).shards)
+
+    def test_rebuild(self):
+        build_shards(self.reference_dir)
+        self.assertIsNotNone(read_manifest(self.reference_dir))
+        self.assertEqual(os.listdir(self.temp_dir.name), ['references'])
+
+    def test_no_shards(self):
+        shutil.rmtree(os.path.join(self.reference_dir, SHARD_DIR_NAME))
+        self.assertIsNone(read_manifest(self.reference_dir))
+
+
+class ShardCacheTestCase(TestCase):
+
+    def test_build_is_called_with_shard(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as fd:
+            json.dump({'hydrologicUnitCodes': ['01']}, fd)
+            fd.flush()
+            cache = ShardCache({('US', '01'): fd.name}, 1, lambda country, state, shard: (country, state, shard))
+
+            self.assertEqual(cache.get('US', '01'), ('US', '01', {'hydrologicUnitCodes': ['01']}))
+            self.assertEqual(cache.get('US', '02', default='missing'), 'missing')
@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import types
+from unittest import TestCase, mock
+
+from app import application
+from ..reference import GeographyIndex, ReferenceInfo, ReferenceLists, ReferenceRegistry
+from .. import coordinates, reference_stream
+from ..reference_snapshot import MAGIC, _builder_modules, build_snapshot, load_snapshot
+
+SCHEMA_DIR = application.config['SCHEMA_DIR']
+REFERENCE_FILE_DIR = application.config['REFERENCE_FILE_DIR']
+
+
+class ReferenceSnapshotTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.reference_dir = os.path.join(cls.temp_dir.name, 'references')
+        shutil.copytree(REFERENCE_FILE_DIR, cls.reference_dir)
+        cls.snapshot_path = os.path.join(cls.temp_dir.name, 'reference_snapshot.pickle')
+        cls.count = build_snapshot(SCHEMA_DIR, cls.reference_dir, cls.snapshot_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def setUp(self):
+        self.registry = ReferenceRegistry()
+
+    def _copy_snapshot(self, data=None):
+        path = os.path.join(self.temp_dir.name, 'copy.pickle')
+        with open(self.snapshot_path, 'rb') as fd:
+            snapshot = fd.read()
+        with open(path, 'wb') as fd:
+            fd.write(snapshot if data is None else data(snapshot))
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_snapshot_references_are_used(self):
+        self.assertTrue(load_snapshot(self.snapshot_path, self.reference_dir, registry=self.registry))
+        self.assertEqual(len(self.registry.get_references()), self.count)
+
+        geography = self.registry.get(GeographyIndex, self.reference_dir)
+        self.assertIs(self.registry.get(GeographyIndex, self.reference_dir), geography)
+        self.assertEqual(geography.get_state_code_set('US'), GeographyIndex(self.reference_dir).get_state_code_set('US'))
+
+        reference_lists = self.registry.get(ReferenceLists, os.path.join(self.reference_dir, 'reference_lists.json'))
+        self.assertEqual(reference_lists.get_reference_info(),
+                         ReferenceInfo(os.path.join(self.reference_dir, 'reference_lists.json')).get_reference_info())
+        self.assertEqual(len(self.registry.get_references()), self.count)
+
+    def test_missing_snapshot(self):
+        self.assertFalse(load_snapshot(os.path.join(self.temp_dir.name, 'missing.pickle'), self.reference_dir,
+                                       registry=self.registry))
+        self.assertFalse(load_snapshot(None, self.reference_dir, registry=self.registry))
+
+    def test_corrupt_snapshot(self):
+        path = self._copy_snapshot(lambda snapshot: snapshot[:-1] + bytes([snapshot[-1] ^ 1]))
+        with self.assertLogs('mlrvalidator.validators.reference_snapshot', level='WARNING'):
+            self.assertFalse(load_snapshot(path, self.reference_dir, registry=self.registry))
+        self.assertEqual(self.registry.get_references(), [])
+
+    def test_not_a_snapshot(self):
+        path = self._copy_snapshot(lambda snapshot: b'{}')
+        with self.assertLogs('mlrvalidator.validators.reference_snapshot', level='WARNING'):
+            self.assertFalse(load_snapshot(path, self.reference_dir, registry=self.registry))
+
+    def test_modified_reference_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            reference_dir = os.path.join(temp_dir, 'references')
+            shutil.copytree(self.reference_dir, reference_dir)
+            with open(os.path.join(reference_dir, 'land_net.json'), 'a') as fd:
+                fd.write('\n')
+
+            with self.assertLogs('mlrvalidator.validators.reference_snapshot', level='WARNING'):
+                self.assertFalse(load_snapshot(self.snapshot_path, reference_dir, registry=self.registry))
+
+    def test_touched_reference_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            reference_dir = os.path.join(temp_dir, 'references')
+            shutil.copytree(self.reference_dir, reference_dir)
+            os.utime(os.path.join(reference_dir, 'land_net.json'), (1000, 1000))
+
+            self.assertTrue(load_snapshot(self.snapshot_path, reference_dir, registry=self.registry))
+
+    def test_builder_modules(self):
+        modules = _builder_modules()
+        self.assertIs(modules['mlrvalidator.validators.coordinates'], coordinates)
+        self.assertIs(modules['mlrvalidator.validators.reference_stream'], reference_stream)
+        self.assertIn('mlrvalidator.utils', modules)
+
+    def test_modified_builder_module(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            module_path = os.path.join(temp_dir, 'coordinates.py')
+            shutil.copy(coordinates.__file__, module_path)
+            modules = dict(_builder_modules())
+            modules['mlrvalidator.validators.coordinates'] = types.SimpleNamespace(__file__=module_path)
+            snapshot_path = os.path.join(temp_dir, 'reference_snapshot.pickle')
+
+            with mock.patch('mlrvalidator.validators.reference_snapshot._builder_modules', return_value=modules):
+                build_snapshot(SCHEMA_DIR, self.reference_dir, snapshot_path)
+                self.assertTrue(load_snapshot(snapshot_path, self.reference_dir, registry=ReferenceRegistry()))
+
+                with open(module_path, 'a') as fd:
+                    fd.write('\n')
+                with self.assertLogs('mlrvalidator.validators.reference_snapshot', level='WARNING'):
+                    self.assertFalse(load_snapshot(snapshot_path, self.reference_dir, registry=self.registry))
+
+    def test_snapshot_format(self):
+        with open(self.snapshot_path, 'rb') as fd:
+            self.assertEqual(fd.read(len(MAGIC)), MAGIC)
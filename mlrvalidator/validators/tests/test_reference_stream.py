@@ -0,0 +1,69 @@
+import io
+import json
+import os
+from unittest import TestCase
+
+from app import application
+from mlrvalidator.utils import index_dicts
+from ..reference_stream import iter_country_states
+
+REFERENCE_FILE_DIR = application.config['REFERENCE_FILE_DIR']
+
+
+def _indexed_states(reference_info):
+    return [(country_code, state_code, state)
+            for country_code, country in index_dicts(reference_info.get('countries', []), 'countryCode').items()
+            for state_code, state in index_dicts(country.get('states', []), 'stateFipsCode').items()]
+
+
+class IterCountryStatesTestCase(TestCase):
+
+    def _iter(self, reference_info, chunk_size=3):
+        return list(iter_country_states(io.StringIO(json.dumps(reference_info, indent=2)), chunk_size=chunk_size))
+
+    def test_states(self):
+        reference_info = {
+            'countries': [
+                {'countryCode': 'US', 'countryName': 'United States', 'states': [
+                    {'stateFipsCode': '01', 'counties': [{'countyCode': '001', 'count': 123456789}]},
+                    {'stateFipsCode': '02', 'hydrologicUnitCodes': ['01010101', '01010102'], 'flag': True}
+                ]},
+                {'countryCode': 'CN', 'states': []}
+            ]
+        }
+        for chunk_size in (1, 2, 7, 1 << 16):
+            self.assertEqual(self._iter(reference_info, chunk_size=chunk_size), _indexed_states(reference_info))
+
+    def test_first_country_and_state_win(self):
+        reference_info = {
+            'countries': [
+                {'countryCode': 'US', 'states': [{'stateFipsCode': '01', 'a': 1}, {'stateFipsCode': '01', 'a': 2},
+                                                 {'name': 'No code'}]},
+                {'countryCode': 'US', 'states': [{'stateFipsCode': '02'}]},
+                {'states': [{'stateFipsCode': '03'}]}
+            ]
+        }
+        self.assertEqual(self._iter(reference_info), [('US', '01', {'stateFipsCode': '01', 'a': 1})])
+        self.assertEqual(self._iter(reference_info), _indexed_states(reference_info))
+
+    def test_country_code_after_states(self):
+        text = '{"other": [1, 2], "countries": [{"states": [{"stateFipsCode": "01"}], "countryCode": "CA"}]}'
+        self.assertEqual(list(iter_country_states(io.StringIO(text), chunk_size=4)),
+                         [('CA', '01', {'stateFipsCode': '01'})])
+
+    def test_empty(self):
+        self.assertEqual(self._iter({}), [])
+        self.assertEqual(self._iter({'countries': []}), [])
+
+    def test_invalid_json(self):
+        for text in ('', '[]', '{"countries": [{"countryCode": "US", "states": [{]}]}', '{"countries": [}',
+                     '{"countries": []} {}', '{"countries": [{"countryCode": "US"'):
+            with self.assertRaises(ValueError):
+                list(iter_country_states(io.StringIO(text), chunk_size=5))
+
+    def test_reference_files(self):
+        for filename in ('county.json', 'huc.json'):
+            with open(os.path.join(REFERENCE_FILE_DIR, filename)) as fd:
+                states = list(iter_country_states(fd))
+            with open(os.path.join(REFERENCE_FILE_DIR, filename)) as fd:
+                self.assertEqual(states, _indexed_states(json.load(fd)))
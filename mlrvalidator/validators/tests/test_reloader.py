@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase, mock
+
+from app import application
+from ..location_validator import LocationValidator
+from ..reloader import ReloadingLocationValidator
+
+SCHEMA_DIR = application.config['SCHEMA_DIR']
+REFERENCE_FILE_DIR = application.config['REFERENCE_FILE_DIR']
+
+
+class ReloadingLocationValidatorTestCase(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'reference_lists.json')
+        self._write_reference(1000)
+        self.validators = []
+
+        def factory():
+            self.validators.append(mock.Mock(version=len(self.validators)))
+            return self.validators[-1]
+        self.factory = mock.Mock(side_effect=factory)
+        self.validator = ReloadingLocationValidator(self.factory, self.temp_dir.name, interval=0.01)
+
+    def tearDown(self):
+        self.validator.stop()
+        self.temp_dir.cleanup()
+
+    def _write_reference(self, mtime):
+        with open(self.path, 'w') as fd:
+            fd.write(json.dumps({'agencyCode': [str(mtime)]}))
+        os.utime(self.path, (mtime, mtime))
+
+    def test_validate_uses_current_validator(self):
+        self.validator.validate({'agencyCode': 'USGS'}, {}, update=True)
+
+        self.validators[0].validate.assert_called_once_with({'agencyCode': 'USGS'}, {}, update=True, fail_fast=False)
+        self.assertEqual(self.validator.version, 0)
+
+    def test_unchanged_files_are_not_reloaded(self):
+        self.assertFalse(self.validator.poll())
+        self.assertFalse(self.validator.poll())
+        self.assertEqual(self.factory.call_count, 1)
+
+    def test_changed_files_are_reloaded_once_they_stop_changing(self):
+        self._write_reference(2000)
+        self.assertFalse(self.validator.poll())
+        self._write_reference(3000)
+        self.assertFalse(self.validator.poll())
+
+        self.assertTrue(self.validator.poll())
+        self.assertIs(self.validator.location_validator, self.validators[1])
+        self.assertEqual(self.validator.reloads, 1)
+        self.assertFalse(self.validator.poll())
+
+    def test_failed_reload_keeps_validator(self):
+        self.factory.side_effect = ValueError('Bad JSON')
+        self._write_reference(2000)
+        self.validator.poll()
+
+        with self.assertLogs('mlrvalidator.validators.reloader', level='ERROR'):
+            self.assertFalse(self.validator.poll())
+        self.assertIs(self.validator.location_validator, self.validators[0])
+        self.assertFalse(self.validator.poll())
+        self.assertEqual(self.factory.call_count, 2)
+
+    def test_background_thread(self):
+        reloaded = threading.Event()
+        poll = self.validator.poll
+
+        def poll_and_signal():
+            if poll():
+                reloaded.set()
+        self.validator.poll = poll_and_signal
+
+        self.validator.start()
+        self._write_reference(2000)
+        self.assertTrue(reloaded.wait(5))
+        self.assertIs(self.validator.location_validator, self.validators[1])
+
+    def test_start_on_first_use(self):
+        validator = ReloadingLocationValidator(self.factory, self.temp_dir.name, interval=0.01, start_on_first_use=True)
+        self.addCleanup(validator.stop)
+        self.assertIsNone(validator._thread)
+
+        validator.validate({'agencyCode': 'USGS'}, {})
+        thread = validator._thread
+        self.assertTrue(thread.is_alive())
+        validator.validate({'agencyCode': 'USGS'}, {})
+        self.assertIs(validator._thread, thread)
+
+    def test_forked_process_starts_its_own_thread(self):
+        validator = ReloadingLocationValidator(self.factory, self.temp_dir.name, interval=0.01, start_on_first_use=True)
+        self.addCleanup(validator.stop)
+        validator.start()
+        parent_thread, parent_stop = validator._thread, validator._stop
+
+        with mock.patch('mlrvalidator.validators.reloader.os.getpid', return_value=os.getpid() + 1):
+            validator.validate({'agencyCode': 'USGS'}, {})
+            self.assertIsNot(validator._thread, parent_thread)
+            self.assertTrue(validator._thread.is_alive())
+            validator.stop()
+        parent_stop.set()
+        parent_thread.join()
+
+
+class ReloadReferenceFilesTestCase(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.reference_dir = os.path.join(self.temp_dir.name, 'references')
+        shutil.copytree(REFERENCE_FILE_DIR, self.reference_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_new_reference_values_are_used(self):
+        validator = ReloadingLocationValidator(lambda: LocationValidator(SCHEMA_DIR, self.reference_dir),
+                                               self.reference_dir)
+        ddot_location = {'agencyCode': 'NEWCD', 'siteNumber': '12345678'}
+        old_validator = validator.location_validator
+        self.assertIn('agencyCode', validator.validate(ddot_location, {}, update=True).errors)
+
+        path = os.path.join(self.reference_dir, 'reference_lists.json')
+        with open(path) as fd:
+            reference_lists = json.load(fd)
+        reference_lists['agencyCode'].append('NEWCD')
+        with open(path, 'w') as fd:
+            json.dump(reference_lists, fd)
+        os.utime(path, (2000, 2000))
+
+        validator.poll()
+        self.assertTrue(validator.poll())
+        self.assertNotIn('agencyCode', validator.validate(ddot_location, {}, update=True).errors)
+        self.assertIn('agencyCode', old_validator.validate(ddot_location, {}, update=True).errors)
@@ -0,0 +1,134 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from mlrvalidator import metrics
+from ..result_cache import CachedLocationValidator, ValidationResultCache, fingerprint, version_stamp
+
+
+class VersionStampTestCase(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'reference.json')
+        with open(self.path, 'w') as fd:
+            fd.write('{}')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_unchanged_files(self):
+        self.assertEqual(version_stamp(self.temp_dir.name), version_stamp(self.temp_dir.name))
+
+    def test_modified_file(self):
+        stamp = version_stamp(self.temp_dir.name)
+        with open(self.path, 'w') as fd:
+            fd.write('{"a": 1}')
+        self.assertNotEqual(version_stamp(self.temp_dir.name), stamp)
+
+    def test_added_file(self):
+        stamp = version_stamp(self.temp_dir.name)
+        with open(os.path.join(self.temp_dir.name, 'other.json'), 'w') as fd:
+            fd.write('{}')
+        self.assertNotEqual(version_stamp(self.temp_dir.name), stamp)
+
+
+class FingerprintTestCase(TestCase):
+
+    def test_key_order_ignored(self):
+        self.assertEqual(fingerprint({'a': '1', 'b': '2'}, {}, False, 'v1'),
+                         fingerprint({'b': '2', 'a': '1'}, {}, False, 'v1'))
+
+    def test_arguments_distinguished(self):
+        key = fingerprint({'a': '1'}, {}, False, 'v1')
+        self.assertNotEqual(fingerprint({'a': '2'}, {}, False, 'v1'), key)
+        self.assertNotEqual(fingerprint({'a': '1'}, {'a': '1'}, False, 'v1'), key)
+        self.assertNotEqual(fingerprint({'a': '1'}, {}, True, 'v1'), key)
+        self.assertNotEqual(fingerprint({'a': '1'}, {}, False, 'v2'), key)
+        self.assertNotEqual(fingerprint({'a': '1'}, {}, False, 'v1', fail_fast=True), key)
+
+
+class ValidationResultCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.cache = ValidationResultCache(max_size=2, ttl=10, clock=lambda: self.now)
+
+    def test_hit_and_miss(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.put('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.stats(), {'size': 1, 'hits': 1, 'misses': 1, 'evictions': 0})
+
+    def test_least_recently_used_evicted(self):
+        self.cache.put('a', 1)
+        self.cache.put('b', 2)
+        self.cache.get('a')
+        self.cache.put('c', 3)
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('c'), 3)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_expired_entry(self):
+        self.cache.put('a', 1)
+        self.now = 9
+        self.assertEqual(self.cache.get('a'), 1)
+        self.now = 10
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_no_ttl(self):
+        cache = ValidationResultCache(ttl=None, clock=lambda: self.now)
+        cache.put('a', 1)
+        self.now = 10 ** 9
+        self.assertEqual(cache.get('a'), 1)
+
+
+class CachedLocationValidatorTestCase(TestCase):
+
+    def setUp(self):
+        self.location_validator = mock.Mock(version='v1')
+        self.location_validator.validate.side_effect = lambda ddot, existing, update=False, fail_fast=False: object()
+        self.validator = CachedLocationValidator(self.location_validator, max_size=10, ttl=None)
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.clear()
+
+    def test_repeated_location_is_not_revalidated(self):
+        result = self.validator.validate({'agencyCode': 'USGS'}, {}, update=False)
+
+        self.assertIs(self.validator.validate({'agencyCode': 'USGS'}, {}, update=False), result)
+        self.location_validator.validate.assert_called_once_with({'agencyCode': 'USGS'}, {}, update=False,
+                                                                 fail_fast=False)
+
+    def test_update_flag_is_part_of_key(self):
+        add_result = self.validator.validate({'agencyCode': 'USGS'}, {})
+        update_result = self.validator.validate({'agencyCode': 'USGS'}, {}, update=True)
+
+        self.assertIsNot(add_result, update_result)
+        self.assertEqual(self.location_validator.validate.call_count, 2)
+
+    def test_fail_fast_flag_is_part_of_key(self):
+        result = self.validator.validate({'agencyCode': 'USGS'}, {})
+        fail_fast_result = self.validator.validate({'agencyCode': 'USGS'}, {}, fail_fast=True)
+
+        self.assertIsNot(result, fail_fast_result)
+        self.location_validator.validate.assert_called_with({'agencyCode': 'USGS'}, {}, update=False, fail_fast=True)
+
+    def test_new_version_is_revalidated(self):
+        result = self.validator.validate({'agencyCode': 'USGS'}, {})
+        self.location_validator.version = 'v2'
+
+        self.assertIsNot(self.validator.validate({'agencyCode': 'USGS'}, {}), result)
+
+    def test_metrics(self):
+        metrics.enable()
+        self.validator.validate({'agencyCode': 'USGS'}, {})
+        self.validator.validate({'agencyCode': 'USGS'}, {})
+        self.validator.validate({'agencyCode': 'USGS '}, {})
+
+        self.assertEqual(metrics.RESULT_CACHE.get(('hit',)), 1)
+        self.assertEqual(metrics.RESULT_CACHE.get(('miss',)), 2)
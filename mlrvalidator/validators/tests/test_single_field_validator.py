@@ -6,7 +6,7 @@ from unittest import TestCase, mock
 from app import application
 
 from ..reference import ReferenceInfo
-from ..single_field_validator import SingleFieldValidator
+from ..single_field_validator import SingleFieldValidator, SingleFieldValidatorPool
 
 
 class ValidateIsEmptyTestCase(TestCase):
@@ -780,6 +780,23 @@ class ValidateReferenceTestCase(TestCase):
     def test_invalid_field(self):
         self.assertFalse(self.validator.validate({'field2': 'A'}))
 
+    def test_reference_sets(self):
+        self.assertEqual(self.validator.reference_sets, {'field1': frozenset(['A', 'B', 'C']),
+                                                         'field2': frozenset(['AA', 'BB', 'CC'])})
+
+    def test_error_message(self):
+        self.validator.validate({'field1': ' D '})
+        self.assertEqual(self.validator.errors, {'field1': [' D  is not in reference list']})
+
+    @mock.patch('mlrvalidator.validators.single_field_validator.reference_registry')
+    def test_loaded_reference_list(self, mregistry):
+        validator = SingleFieldValidator(schema={'field1': {'valid_reference': True}},
+                                         reference_list=self.validator.reference_list)
+        mregistry.get.assert_not_called()
+        self.assertIs(validator.reference_list, self.validator.reference_list)
+        self.assertEqual(validator.reference_sets, {'field1': frozenset(['A', 'B', 'C'])})
+        self.assertFalse(validator.validate({'field1': 'D'}))
+
 
 class ValidateSingleQuoteTestCase(TestCase):
     def setUp(self):
@@ -797,3 +814,47 @@ class ValidateSingleQuoteTestCase(TestCase):
         self.assertFalse(self.validator.validate({'field1': "'AAAA"}))
 
 
+class SingleFieldValidatorPoolTestCase(TestCase):
+
+    def setUp(self):
+        self.created = []
+
+        def factory():
+            validator = SingleFieldValidator(schema={'field1': {'is_empty': False}}, reference_dir='')
+            self.created.append(validator)
+            return validator
+
+        self.pool = SingleFieldValidatorPool(factory)
+
+    def test_get_errors(self):
+        self.assertEqual(self.pool.get_errors({'field1': 'A'}), {})
+        self.assertEqual(self.pool.get_errors({'field1': ' '}), {'field1': ['Field must contain non whitespace characters']})
+
+    def test_fail_fast(self):
+        document = {'field1': ' ', 'field2': 'B'}
+        self.assertEqual(self.pool.get_errors(document), {
+            'field1': ['Field must contain non whitespace characters'],
+            'field2': ['unknown field']
+        })
+        self.assertEqual(self.pool.get_errors(document, fail_fast=True),
+                         {'field1': ['Field must contain non whitespace characters']})
+        self.assertEqual(self.pool.get_errors({'field1': 'A'}, fail_fast=True), {})
+
+    def test_idle_validator_is_reused(self):
+        self.pool.get_errors({'field1': 'A'})
+        self.pool.get_errors({'field1': 'B'})
+        self.assertEqual(len(self.created), 1)
+
+    def test_idle_validators(self):
+        validator = SingleFieldValidator(schema={'field1': {'is_empty': False}}, reference_dir='')
+        factory = mock.Mock()
+        pool = SingleFieldValidatorPool(factory, idle=[validator])
+        factory.assert_not_called()
+        self.assertEqual(pool.get_errors({'field1': ' '}), {'field1': ['Field must contain non whitespace characters']})
+        factory.assert_not_called()
+
+    def test_validator_in_use_is_not_shared(self):
+        in_use = self.pool._idle.pop()
+        self.pool.get_errors({'field1': 'A'})
+        self.assertEqual(len(self.created), 2)
+        self.assertNotIn(in_use, self.pool._idle)
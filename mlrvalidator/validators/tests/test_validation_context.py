@@ -0,0 +1,128 @@
+from unittest import TestCase, mock
+
+from mlrvalidator import metrics
+from ..validation_context import DMS_PARSERS, ValidationContext
+
+class TestAnyFieldsInDocument(TestCase):
+
+    def test_any_fields(self):
+        context = ValidationContext({'field1': 'a', 'field2': 'b', 'field3': 'c'}, {})
+        self.assertTrue(context.any_fields_in_document(['field1', 'field3']))
+
+        context = ValidationContext({'field1': 'a'}, {})
+        self.assertTrue(context.any_fields_in_document(['field1', 'field3']))
+
+        context = ValidationContext({'field2': 'a', 'field3': 'c'}, {})
+        self.assertTrue(context.any_fields_in_document(['field1', 'field3']))
+
+    def test_all_fields_missing_in_document(self):
+        context = ValidationContext({'field2': 'b'}, {'field1': 'a', 'field3': 'b'})
+        self.assertFalse(context.any_fields_in_document(['field1', 'field3']))
+
+
+class TestMergedDocument(TestCase):
+
+    def test_document_overrides_existing_document(self):
+        existing_document = {'field1': 'a', 'field2': 'b'}
+        context = ValidationContext({'field2': 'c', 'field3': 'd'}, existing_document)
+
+        self.assertEqual(context.merged_document, {'field1': 'a', 'field2': 'c', 'field3': 'd'})
+        self.assertEqual(existing_document, {'field1': 'a', 'field2': 'b'})
+
+
+class TestStrippedValues(TestCase):
+
+    def setUp(self):
+        self.context = ValidationContext({'field1': ' a ', 'field2': None}, {'field1': 'b', 'field3': '  c'})
+
+    def test_get_value(self):
+        self.assertEqual(self.context.get_value('field1'), 'a')
+        self.assertEqual(self.context.get_value('field3'), 'c')
+        self.assertIsNone(self.context.get_value('field2'))
+
+    def test_get_value_missing_field(self):
+        self.assertEqual(self.context.get_value('field4'), '')
+
+    def test_get_values(self):
+        self.assertEqual(self.context.get_values(['field3', 'field4', 'field1']), ['c', '', 'a'])
+
+    def test_merged_document_is_not_stripped(self):
+        self.assertEqual(self.context.merged_document['field1'], ' a ')
+
+
+class TestGetDms(TestCase):
+
+    def test_get_dms(self):
+        context = ValidationContext({'latitude': ' 000001.5 '}, {'longitude': '-0000100'})
+        self.assertEqual(context.get_dms('latitude'), 150)
+        self.assertEqual(context.get_dms('longitude'), -6000)
+
+    def test_missing_or_invalid(self):
+        context = ValidationContext({'latitude': None}, {'longitude': '0000100'})
+        self.assertIsNone(context.get_dms('latitude'))
+        self.assertIsNone(context.get_dms('longitude'))
+        self.assertIsNone(ValidationContext({}, {}).get_dms('latitude'))
+
+    @mock.patch.dict('mlrvalidator.validators.validation_context.DMS_PARSERS', {'latitude': mock.Mock(return_value=1)})
+    def test_value_is_parsed_once(self):
+        context = ValidationContext({'latitude': ' 000001'}, {})
+        context.get_dms('latitude')
+        context.get_dms('latitude')
+        DMS_PARSERS['latitude'].assert_called_once_with(' 000001')
+
+
+class TestGetNumber(TestCase):
+
+    def setUp(self):
+        self.context = ValidationContext({'altitude': ' 12.5 ', 'wellDepth': '1A', 'holeDepth': '  '},
+                                         {'drainageArea': 3})
+
+    def test_get_number(self):
+        self.assertEqual(self.context.get_number('altitude'), 12.5)
+        self.assertEqual(self.context.get_number('drainageArea'), 3.0)
+
+    def test_missing_blank_or_invalid(self):
+        self.assertIsNone(self.context.get_number('wellDepth'))
+        self.assertIsNone(self.context.get_number('holeDepth'))
+        self.assertIsNone(self.context.get_number('contributingDrainageArea'))
+
+    def test_get_numbers(self):
+        self.assertEqual(self.context.get_numbers(['wellDepth', 'altitude']), [None, 12.5])
+
+    @mock.patch('mlrvalidator.validators.validation_context.parse_number', return_value=1.0)
+    def test_value_is_parsed_once(self, mock_parse):
+        self.context.get_number('altitude')
+        self.context.get_number('altitude')
+        mock_parse.assert_called_once_with(' 12.5 ')
+
+
+class TestLookup(TestCase):
+
+    def setUp(self):
+        self.context = ValidationContext({'field1': 'a'}, {})
+        self.function = mock.Mock(side_effect=lambda *args: '-'.join(args))
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.clear()
+
+    def test_lookup_is_made_once(self):
+        self.assertEqual(self.context.lookup(self.function, 'US', '01'), 'US-01')
+        self.assertEqual(self.context.lookup(self.function, 'US', '01'), 'US-01')
+        self.assertEqual(self.context.lookup(self.function, 'US', '02'), 'US-02')
+
+        self.assertEqual(self.function.call_count, 2)
+        self.assertEqual(self.context.lookup_hits, 1)
+        self.assertEqual(self.context.lookup_misses, 2)
+
+    def test_lookups_are_not_shared_between_contexts(self):
+        self.context.lookup(self.function, 'US')
+        ValidationContext({}, {}).lookup(self.function, 'US')
+        self.assertEqual(self.function.call_count, 2)
+
+    def test_metrics(self):
+        metrics.enable()
+        self.context.lookup(self.function, 'US')
+        self.context.lookup(self.function, 'US')
+        self.assertEqual(metrics.REFERENCE_LOOKUPS.get(('hit',)), 1)
+        self.assertEqual(metrics.REFERENCE_LOOKUPS.get(('miss',)), 1)
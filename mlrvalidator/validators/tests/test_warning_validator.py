@@ -15,10 +15,8 @@ class ErrorValidatorErrorsTestCase(TestCase):
 
         msingle_field.validate.return_value = True
         msingle_field.errors = {}
-        mcross_ref.validate.return_value = True
-        mcross_ref.errors = {}
-        mcross.validate.return_value = True
-        mcross.errors = {}
+        mcross_ref.get_errors.return_value = {}
+        mcross.get_errors.return_value = {}
 
         validator = WarningValidator('schema_dir', 'ref_dir')
 
@@ -32,10 +30,8 @@ class ErrorValidatorErrorsTestCase(TestCase):
 
         msingle_field.validate.return_value = False
         msingle_field.errors = {'A' : ['Invalid']}
-        mcross_ref.validate.return_value = True
-        mcross_ref.errors = {}
-        mcross.validate.return_value = True
-        mcross.errors = {}
+        mcross_ref.get_errors.return_value = {}
+        mcross.get_errors.return_value = {}
 
         validator = WarningValidator('schema_dir', 'ref_dir')
 
@@ -50,10 +46,8 @@ class ErrorValidatorErrorsTestCase(TestCase):
 
         msingle_field.validate.return_value = True
         msingle_field.errors = {}
-        mcross_ref.validate.return_value = False
-        mcross_ref.errors = {'A': ['Not good'], 'B': ['No match']}
-        mcross.validate.return_value = True
-        mcross.errors = {}
+        mcross_ref.get_errors.return_value = {'A': ['Not good'], 'B': ['No match']}
+        mcross.get_errors.return_value = {}
 
         validator = WarningValidator('schema_dir', 'ref_dir')
 
@@ -69,10 +63,8 @@ class ErrorValidatorErrorsTestCase(TestCase):
 
         msingle_field.validate.return_value = True
         msingle_field.errors = {}
-        mcross_ref.validate.return_value = True
-        mcross_ref.errors = {}
-        mcross.validate.return_value = False
-        mcross.errors = {'A': ['Not good'], 'B': ['No match']}
+        mcross_ref.get_errors.return_value = {}
+        mcross.get_errors.return_value = {'A': ['Not good'], 'B': ['No match']}
 
         validator = WarningValidator('schema_dir', 'ref_dir')
 
@@ -88,10 +80,8 @@ class ErrorValidatorErrorsTestCase(TestCase):
 
         msingle_field.validate.return_value = False
         msingle_field.errors = {'A': ['Missing info']}
-        mcross_ref.validate.return_value = False
-        mcross_ref.errors = {'A': ['Not good'], 'B': ['No match']}
-        mcross.validate.return_value = False
-        mcross.errors = {'A': ['Bad']}
+        mcross_ref.get_errors.return_value = {'A': ['Not good'], 'B': ['No match']}
+        mcross.get_errors.return_value = {'A': ['Bad']}
 
         validator = WarningValidator('schema_dir', 'ref_dir')
 
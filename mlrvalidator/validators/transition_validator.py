@@ -1,26 +1,34 @@
-
 import os
 
-from .reference import FieldTransitions
+from .reference import FieldTransitions, reference_registry
 
 class TransitionValidator:
 
     def __init__(self, reference_dir):
         self._errors = {}
-        self.site_type_transition_ref = FieldTransitions(os.path.join(reference_dir, 'site_type_transition.json'))
+        self.site_type_transition_ref = reference_registry.get(FieldTransitions, os.path.join(reference_dir, 'site_type_transition.json'))
 
     def validate(self, document, existing_document):
-        self._errors = {}
+        self._errors = self.get_errors(document, existing_document)
+        return self._errors == {}
+
+    def get_errors(self, document, existing_document):
+        '''
+        :param dict document:
+        :param dict existing_document:
+        :return: dict - error messages keyed by field. The dictionary will be empty if the transition is allowed.
+        '''
+        errors = {}
         existing_value = existing_document.get('siteTypeCode', '').strip()
         new_value = document.get('siteTypeCode', '').strip()
 
         if existing_value and new_value and (existing_value != new_value):
             transitions = self.site_type_transition_ref.get_allowed_transitions(existing_value)
             if transitions and transitions.count(new_value) == 0:
-                self._errors['siteTypeCode'] = ['Can\'t change a siteTypeCode with existing value {0} to {1}'.format(existing_value, new_value)]
+                errors['siteTypeCode'] = ['Can\'t change a siteTypeCode with existing value {0} to {1}'.format(existing_value, new_value)]
 
-        return self._errors == {}
+        return errors
 
     @property
     def errors(self):
-        return self._errors
\ No newline at end of file
+        return self._errors
@@ -0,0 +1,113 @@
+from mlrvalidator import metrics
+from .coordinates import parse_latitude, parse_longitude
+from .numeric import parse_number
+
+# Parses the DMS value of each coordinate key into hundredths of a second
+DMS_PARSERS = {
+    'latitude': parse_latitude,
+    'longitude': parse_longitude
+}
+
+
+class ValidationContext:
+    '''
+    Holds the state of a single validation call. Validators create a context for each call rather than storing
+    the documents on themselves so that one validator instance can be used by concurrent requests. A context is
+    created once per request and shared by all of the cross field validators, so the merged document is built and
+    its values stripped only once, and each distinct reference lookup is done once.
+    '''
+
+    def __init__(self, document, existing_document):
+        '''
+        :param dict document: the fields being added or updated
+        :param dict existing_document: the location as it currently exists. Typically for an add this will be empty.
+        '''
+        self.document = document
+        self.existing_document = existing_document
+        self.merged_document = existing_document.copy()
+        self.merged_document.update(document)
+        self.submitted_fields = frozenset(document)
+        self.stripped_document = dict(
+            (key, value.strip() if isinstance(value, str) else value) for key, value in self.merged_document.items())
+        self._lookups = {}
+        self._dms_values = {}
+        self._numbers = {}
+        self.lookup_hits = 0
+        self.lookup_misses = 0
+
+    def lookup(self, function, *args):
+        '''
+        Calls function with args the first time they are looked up in this context and returns the same result for
+        later lookups. The result must not be modified.
+        :param function function: a reference lookup, such as GeographyIndex.get_state bound to the index
+        :param args: hashable arguments of function
+        :return: the result of function(*args)
+        '''
+        key = (function, args)
+        try:
+            result = self._lookups[key]
+        except KeyError:
+            result = self._lookups[key] = function(*args)
+            self.lookup_misses += 1
+            if metrics.is_enabled():
+                metrics.REFERENCE_LOOKUPS.inc(('miss',))
+        else:
+            self.lookup_hits += 1
+            if metrics.is_enabled():
+                metrics.REFERENCE_LOOKUPS.inc(('hit',))
+        return result
+
+    def get_dms(self, key):
+        '''
+        :param str key: 'latitude' or 'longitude'
+        :return: int - the value of key in the merged document in hundredths of a second. None if the value is
+            missing, blank or is not a valid DMS value.
+        '''
+        try:
+            return self._dms_values[key]
+        except KeyError:
+            value = self.merged_document.get(key)
+            result = self._dms_values[key] = DMS_PARSERS[key](value) if isinstance(value, str) else None
+            return result
+
+    def get_number(self, key):
+        '''
+        :param str key: a numeric field, such as 'altitude'
+        :return: float - the value of key in the merged document. None if the value is missing, blank or is not a
+            number.
+        '''
+        try:
+            return self._numbers[key]
+        except KeyError:
+            result = self._numbers[key] = parse_number(self.merged_document.get(key, ''))
+            return result
+
+    def get_numbers(self, keys):
+        '''
+        :param list of str keys:
+        :return: list of the numeric values of keys. See get_number.
+        '''
+        return [self.get_number(key) for key in keys]
+
+    def any_fields_in_document(self, keys):
+        '''
+        :param list of str keys:
+        :return: boolean - True if any of keys are in document
+        '''
+        return not self.submitted_fields.isdisjoint(keys)
+
+    def get_value(self, key):
+        '''
+        :param str key:
+        :return: the value of key in the merged document with surrounding whitespace removed. An empty string
+            if key is not in the merged document.
+        '''
+        return self.stripped_document.get(key, '')
+
+    def get_values(self, keys):
+        '''
+        :param list of str keys:
+        :return: list of the stripped values of keys in the merged document. See get_value.
+        '''
+        stripped_document = self.stripped_document
+        return [stripped_document.get(key, '') for key in keys]
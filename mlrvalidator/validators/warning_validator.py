@@ -3,36 +3,82 @@ from itertools import chain
 import os
 import yaml
 
+from .compiled_single_field_validator import CompiledSingleFieldValidator, CERBERUS_ENGINE, COMPILED_ENGINE, \
+    GENERATED_ENGINE
 from .cross_field_ref_warning_validator import CrossFieldRefWarningValidator
 from .cross_field_warning_validator import CrossFieldWarningValidator
-from .single_field_validator import SingleFieldValidator
+from .generated_single_field_validator import GeneratedSingleFieldValidator
+from .single_field_validator import SingleFieldValidator, SingleFieldValidatorPool
+from .validation_context import ValidationContext
 
 class WarningValidator:
 
-    def __init__(self, schema_dir, reference_file_dir):
+    def __init__(self, schema_dir, reference_file_dir, single_field_engine=CERBERUS_ENGINE, code_cache_dir=None):
+        '''
+        :param str schema_dir:
+        :param str reference_file_dir:
+        :param str single_field_engine: CERBERUS_ENGINE, COMPILED_ENGINE or GENERATED_ENGINE
+        :param str code_cache_dir: directory where the GENERATED_ENGINE caches its compiled code
+        '''
         with open(os.path.join(schema_dir, 'warning_schema.yml')) as fd:
             warning_schema = yaml.load(fd.read())
 
-        self.single_field_validator = SingleFieldValidator(warning_schema, reference_dir=reference_file_dir, allow_unknown=True)
+        if single_field_engine == COMPILED_ENGINE:
+            self.single_field_validator = CompiledSingleFieldValidator(
+                warning_schema, reference_dir=reference_file_dir, allow_unknown=True)
+        elif single_field_engine == GENERATED_ENGINE:
+            self.single_field_validator = GeneratedSingleFieldValidator(
+                warning_schema, reference_dir=reference_file_dir, allow_unknown=True, cache_dir=code_cache_dir)
+        else:
+            # Validators added to the pool share the reference lists loaded by the first one, so that a reload
+            # of the reference files is never started while a request is being handled
+            validator = SingleFieldValidator(warning_schema, reference_dir=reference_file_dir, allow_unknown=True)
+            self.single_field_validator = SingleFieldValidatorPool(
+                lambda: SingleFieldValidator(warning_schema, reference_list=validator.reference_list, allow_unknown=True),
+                idle=[validator])
         self.cross_field_ref_validator = CrossFieldRefWarningValidator(reference_file_dir)
         self.cross_field_validator = CrossFieldWarningValidator()
         self._warnings = defaultdict(list)
 
     def validate(self, ddot_location, existing_location, update=False):
-        self.single_field_validator.validate(ddot_location, update=update)
-        self.cross_field_ref_validator.validate(ddot_location, existing_location)
-        self.cross_field_validator.validate(ddot_location, existing_location)
+        '''
+        After validate is called the warnings property will reflect the warnings generated by the last call to
+        validate. Use get_warnings when the validator is shared by concurrent requests.
+        '''
+        self._warnings = self.get_warnings(ddot_location, existing_location, update=update)
+        return self._warnings == {}
 
-        self._warnings = defaultdict(list)
-        all_warnings = chain(self.single_field_validator.errors.items(),
-                             self.cross_field_ref_validator.errors.items(),
-                             self.cross_field_validator.errors.items())
+    def get_warnings(self, ddot_location, existing_location, update=False, context=None,
+                     single_field_warnings=None):
+        '''
+        :param dict ddot_location:
+        :param dict existing_location:
+        :param boolean update:
+        :param ValidationContext context: context for ddot_location and existing_location if one has already been
+            created for this request. If None, one is created.
+        :param dict single_field_warnings: the single field warnings of ddot_location if they have already been
+            found, for example by a combined single field validator. If None, they are found by
+            single_field_validator.
+        :return: defaultdict(list) - warning messages keyed by field. Empty if there are no warnings.
+        '''
+        if context is None:
+            context = ValidationContext(ddot_location, existing_location)
+
+        if single_field_warnings is None:
+            single_field_warnings = self.single_field_validator.get_errors(ddot_location, update=update)
+        cross_field_ref_warnings = self.cross_field_ref_validator.get_errors(context)
+        cross_field_warnings = self.cross_field_validator.get_errors(context)
+
+        warnings = defaultdict(list)
+        all_warnings = chain(single_field_warnings.items(),
+                             cross_field_ref_warnings.items(),
+                             cross_field_warnings.items())
 
         for k, v in chain(all_warnings):
-            self._warnings[k].extend(v)
+            warnings[k].extend(v)
 
-        return self._warnings == {}
+        return warnings
 
     @property
     def warnings(self):
-        return self._warnings
\ No newline at end of file
+        return self._warnings
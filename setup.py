@@ -41,5 +41,13 @@ setup(name='usgs_wma_mlr_validator',
       platforms='any',
       zip_safe=False,
       py_modules=['config', 'app'],
-      packages=find_packages()
+      packages=find_packages(),
+      entry_points={
+          'console_scripts': [
+              'mlr-validate = mlrvalidator.bulk_validator:main',
+              'mlr-build-reference-snapshot = mlrvalidator.validators.reference_snapshot:main',
+              'mlr-build-mapped-reference-store = mlrvalidator.validators.mapped_reference:main',
+              'mlr-build-reference-shards = mlrvalidator.validators.reference_shards:main'
+          ]
+      }
       )